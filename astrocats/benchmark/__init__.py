@@ -0,0 +1,4 @@
+"""Benchmarks of catalog operations using synthetic data.
+"""
+
+from . import main
@@ -0,0 +1,110 @@
+"""Entry point for the AstroCats benchmarks.
+
+Generates a synthetic catalog of configurable size and times the main
+catalog operations on it, e.g.
+
+    python -m astrocats benchmark --entries 2000 --photometry 500
+
+"""
+import os
+
+
+def main(args, clargs, log):
+    log.debug("benchmark.main.main()")
+    import argparse
+    import shutil
+    import tempfile
+
+    from .suite import NUM_ITEMS, RETURN_CODE, THROUGHPUT, run_benchmarks
+    from .synthetic import generate_catalog
+
+    parser = argparse.ArgumentParser(
+        prog='benchmark',
+        description='Benchmark catalog operations on synthetic data.')
+    parser.add_argument(
+        '--path', dest='bench_path', default=None,
+        help=('directory in which to generate the synthetic catalog '
+              '(default: a temporary directory, deleted afterwards).'))
+    parser.add_argument(
+        '--entries', dest='num_entries', type=int, default=1000,
+        help='number of entries.')
+    parser.add_argument(
+        '--aliases', dest='num_aliases', type=int, default=2,
+        help='number of aliases per entry.')
+    parser.add_argument(
+        '--sources', dest='num_sources', type=int, default=3,
+        help='number of sources per entry.')
+    parser.add_argument(
+        '--photometry', dest='num_photometry', type=int, default=100,
+        help='number of photometric points per entry.')
+    parser.add_argument(
+        '--spectra', dest='num_spectra', type=int, default=2,
+        help='number of spectra per entry.')
+    parser.add_argument(
+        '--spectrum-points', dest='num_spectrum_points', type=int,
+        default=500, help='number of rows per spectrum.')
+    parser.add_argument(
+        '--gz-fraction', dest='gz_fraction', type=float, default=0.0,
+        help='fraction of entry files which are gzipped.')
+    parser.add_argument(
+        '--dupe-fraction', dest='dupe_fraction', type=float, default=0.0,
+        help='fraction of entries which duplicate another entry.')
+    parser.add_argument(
+        '--seed', dest='seed', type=int, default=0,
+        help='seed for the random number generator.')
+    parser.add_argument(
+        '--no-webcat', dest='webcat', default=True, action='store_false',
+        help='do not benchmark the `webcat` script.')
+    parser.add_argument(
+        '--report', dest='report', default=None,
+        help=('json file to which to write results (default: '
+              '`benchmark_report.json` in the current directory).'))
+    bargs = parser.parse_args(args=clargs)
+
+    bench_path = bargs.bench_path
+    cleanup = bench_path is None
+    if cleanup:
+        bench_path = tempfile.mkdtemp(prefix='astrocats-benchmark-')
+    bench_path = os.path.abspath(bench_path)
+
+    try:
+        log.warning("Generating synthetic catalog in '{}'".format(bench_path))
+        fnames = generate_catalog(
+            bench_path,
+            num_entries=bargs.num_entries,
+            num_aliases=bargs.num_aliases,
+            num_sources=bargs.num_sources,
+            num_photometry=bargs.num_photometry,
+            num_spectra=bargs.num_spectra,
+            num_spectrum_points=bargs.num_spectrum_points,
+            gz_fraction=bargs.gz_fraction,
+            dupe_fraction=bargs.dupe_fraction,
+            seed=bargs.seed)
+        log.warning("Wrote {} entry files".format(len(fnames)))
+
+        profiler = run_benchmarks(bench_path, log, webcat=bargs.webcat)
+    finally:
+        if cleanup:
+            shutil.rmtree(bench_path, ignore_errors=True)
+
+    report = bargs.report
+    if report is None:
+        report = 'benchmark_report.json'
+    profiler.write_report(report)
+
+    # Print a summary
+    lines = ["{:20s} {:>10s} {:>10s} {:>12s} {:>12s}".format(
+        'Stage', 'Wall [s]', 'CPU [s]', 'Items/s', 'dPeak [MB]')]
+    for stage, stats in profiler.tasks.items():
+        rate = stats.get(THROUGHPUT)
+        rate = '-' if rate is None else '{:.1f}'.format(rate)
+        if stats.get(RETURN_CODE):
+            rate = 'failed'
+        peak = stats['peak_rss_delta']
+        lines.append("{:20s} {:10.3f} {:10.3f} {:>12s} {:>12s}".format(
+            stage, stats['wall_time'], stats['cpu_time'], rate,
+            '-' if peak is None else '{:.1f}'.format(peak)))
+        log.debug("{}: {} items".format(stage, stats.get(NUM_ITEMS)))
+    log.warning("\n" + "\n".join(lines))
+
+    return
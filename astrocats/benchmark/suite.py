@@ -0,0 +1,250 @@
+"""Time catalog operations on a synthetic catalog.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from collections import OrderedDict
+
+from astrocats.benchmark.synthetic import OUTPUT_REPO
+from astrocats.catalog.catalog import Catalog
+from astrocats.catalog.profiler import TaskProfiler
+from astrocats.catalog.task import Task
+from astrocats.catalog.utils import read_json_dict
+
+__all__ = ['BenchmarkCatalog', 'run_benchmarks', 'time_imports']
+
+# Additional statistics stored for each benchmark stage
+NUM_ITEMS = 'num_items'
+THROUGHPUT = 'throughput'
+RETURN_CODE = 'return_code'
+IMPORT_TIMES = 'import_times'
+
+# Modules whose (cumulative) import time is measured
+IMPORT_MODULES = ['astrocats.main', 'astrocats.catalog.catalog',
+                  'astrocats.catalog.utils.plotting']
+
+
+class BenchmarkCatalog(Catalog):
+    """`Catalog` whose data is located in an arbitrary directory.
+
+    The directory is given by `args.base_path`, and must contain the
+    'input/repos.json' file and the 'output' repositories (see
+    `astrocats.benchmark.synthetic.generate_catalog`).
+    """
+
+    class PATHS(Catalog.PATHS):
+
+        def __init__(self, catalog):
+            self.catalog = catalog
+            self.catalog_dir = os.path.abspath(catalog.args.base_path)
+            self.tasks_dir = os.path.join(self.catalog_dir, 'tasks')
+            self.PATH_BASE = os.path.join(self.catalog_dir, '')
+            self.PATH_INPUT = os.path.join(self.PATH_BASE, 'input', '')
+            self.PATH_OUTPUT = os.path.join(self.PATH_BASE, 'output', '')
+            self.REPOS_LIST = os.path.join(self.PATH_INPUT, 'repos.json')
+            self.TASK_LIST = os.path.join(self.PATH_INPUT, 'tasks.json')
+            self.CHECKPOINT = self.get_checkpoint_file(
+                getattr(catalog.args, 'shard', None))
+            self.repos_dict = read_json_dict(self.REPOS_LIST)
+            return
+
+
+def benchmark_args(path):
+    """Construct the settings used by a `BenchmarkCatalog` in `path`."""
+    args = argparse.Namespace(
+        base_path=path,
+        write_entries=True,
+        delete_old=False,
+        update=False,
+        load_stubs=False,
+        archived=False,
+        resume=False,
+        travis=False,
+        private=False,
+        profile_dir=None,
+        cprofile=False,
+        entry_cache_mb=0.0,
+        memory_limit_mb=None,
+        shards=None,
+        shard=None,
+        merge_shards=False)
+    return args
+
+
+def run_benchmarks(path, log, webcat=True):
+    """Run all benchmarks on the synthetic catalog in `path`.
+
+    Each stage is run in order, as the later stages operate on the entries
+    (and files) produced by earlier ones:
+        `import_time` (see `time_imports`), `load_stubs`, `merge_duplicates`,
+        `add_entry` (hydrating each stub), `Entry.save`, `journal_entries`,
+        and the `webcat` script.
+
+    Returns
+    -------
+    profiler : `astrocats.catalog.profiler.TaskProfiler`
+        Statistics of each stage are stored in `profiler.tasks`.
+
+    """
+    catalog = BenchmarkCatalog(benchmark_args(path), log)
+    profiler = TaskProfiler(log)
+    catalog.profiler = profiler
+
+    def _stage(stage_name, func, *args):
+        log.warning("Benchmark: '{}'".format(stage_name))
+        catalog.current_task = Task(name=stage_name, nice_name=stage_name)
+        profiler.start_task(stage_name)
+        retval = func(*args)
+        profiler.end_task()
+        return retval
+
+    def _set_num(stage_name, num):
+        stats = profiler.tasks[stage_name]
+        stats[NUM_ITEMS] = num
+        wall = stats['wall_time']
+        stats[THROUGHPUT] = num / wall if wall > 0.0 else None
+        return
+
+    # Import time of the modules loaded at startup, each in a new interpreter
+    import_times = _stage('import_time', time_imports, IMPORT_MODULES)
+    _set_num('import_time', len(import_times))
+    profiler.tasks['import_time'][IMPORT_TIMES] = import_times
+    for mod_name, import_time in import_times.items():
+        log.info("Import of '{}': {:.3f} s".format(mod_name, import_time))
+
+    # Load stubs of all entries
+    _stage('load_stubs', catalog.load_stubs)
+    _set_num('load_stubs', len(catalog.entries))
+
+    # Merge entries with common aliases
+    num_stubs = len(catalog.entries)
+    _stage('merge_duplicates', catalog.merge_duplicates)
+    _set_num('merge_duplicates', num_stubs)
+
+    # Load full entries from their stubs
+    names = list(catalog.entries.keys())
+
+    def _hydrate():
+        for name in names:
+            catalog.add_entry(name, delete=False)
+
+    _stage('add_entry', _hydrate)
+    _set_num('add_entry', len(names))
+
+    # Write each entry to file
+    def _save():
+        for entry in catalog.entries.values():
+            entry.save()
+
+    _stage('entry_save', _save)
+    _set_num('entry_save', len(catalog.entries))
+
+    # Write entries and convert them to stubs
+    num_entries = len(catalog.entries)
+    _stage('journal_entries', catalog.journal_entries)
+    _set_num('journal_entries', num_entries)
+
+    if webcat:
+        retcode = _stage('webcat', _run_webcat, path, log)
+        profiler.tasks['webcat'][RETURN_CODE] = retcode
+        # The throughput of a failed run would be meaningless
+        if retcode == 0:
+            _set_num('webcat', num_entries)
+
+    return profiler
+
+
+def time_imports(modules):
+    """Measure the time taken to import each of `modules`.
+
+    Each module is imported in a new interpreter, run with
+    `python -X importtime`, so that nothing is already loaded.
+
+    Returns
+    -------
+    import_times : dict
+        Cumulative import time [s] of each module, or `None` if the import
+        failed.
+
+    """
+    import_times = OrderedDict()
+    for mod_name in modules:
+        proc = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c',
+             'import {}'.format(mod_name)],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            universal_newlines=True)
+        import_times[mod_name] = None
+        if proc.returncode != 0:
+            continue
+        # Lines are 'import time: self [us] | cumulative [us] | package'
+        for line in proc.stderr.splitlines():
+            fields = [ff.strip() for ff in line.split('|')]
+            if len(fields) == 3 and fields[2] == mod_name:
+                import_times[mod_name] = int(fields[1]) * 1e-6
+
+    return import_times
+
+
+def _run_webcat(path, log):
+    """Run the `webcat` script on the synthetic catalog.
+
+    `webcat` works with paths relative to the current directory, in the
+    layout 'astrocats/`moduledir`/...', so that layout is constructed in
+    '`path`/webcat', linking to the synthetic output repository.
+
+    Returns
+    -------
+    retcode : int
+        Return code of the `webcat` process.
+
+    """
+    moduledir = 'supernovae'
+    work_dir = os.path.join(path, 'webcat')
+    module_path = os.path.join(work_dir, 'astrocats', moduledir)
+    output_path = os.path.join(module_path, 'output')
+    for dd in [os.path.join(module_path, 'input'),
+               os.path.join(module_path, 'html'),
+               os.path.join(output_path, 'cache'),
+               os.path.join(output_path, 'json'),
+               os.path.join(output_path, 'html', 'info-snippets'),
+               os.path.join(output_path, 'html', 'table-templates')]:
+        if not os.path.isdir(dd):
+            os.makedirs(dd)
+
+    with open(os.path.join(module_path, 'input', 'rep-folders.txt'),
+              'w') as ff:
+        ff.write(OUTPUT_REPO + '\n')
+    with open(os.path.join(module_path, 'html', 'sitemap-template.xml'),
+              'w') as ff:
+        ff.write('<urlset>\n{0}</urlset>\n')
+
+    repo_link = os.path.join(output_path, OUTPUT_REPO)
+    if not os.path.exists(repo_link):
+        os.symlink(
+            os.path.abspath(os.path.join(path, 'output', OUTPUT_REPO)),
+            repo_link)
+
+    # Make sure this `astrocats` package is importable from `work_dir`
+    package_dir = os.path.dirname(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [package_dir] + [pp for pp in [env.get('PYTHONPATH')] if pp])
+
+    cmd = [sys.executable, '-m', 'astrocats.scripts.webcat', '-c', 'sne',
+           '--no-collect-hosts']
+    beg = time.time()
+    proc = subprocess.run(
+        cmd, cwd=work_dir, env=env,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        universal_newlines=True)
+    log.info("`webcat` finished after {:.2f} s".format(time.time() - beg))
+    if proc.returncode != 0:
+        err_lines = proc.stderr.strip().splitlines()
+        log.error("`webcat` failed with return code {}:\n{}".format(
+            proc.returncode, '\n'.join(err_lines[-5:])))
+
+    return proc.returncode
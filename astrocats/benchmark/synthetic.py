@@ -0,0 +1,181 @@
+"""Generate synthetic catalog data repositories for benchmarking.
+"""
+import codecs
+import gzip
+import json
+import os
+import random
+from collections import OrderedDict
+
+__all__ = ['OUTPUT_REPO', 'generate_catalog', 'entry_name']
+
+OUTPUT_REPO = 'synthetic-output'
+
+_BANDS = ['U', 'B', 'V', 'R', 'I', 'g', 'r', 'i', 'z']
+
+
+def entry_name(num):
+    """Name of the `num`-th synthetic entry."""
+    return 'SYN{:06d}'.format(num)
+
+
+def generate_catalog(path,
+                     num_entries=1000,
+                     num_aliases=2,
+                     num_sources=3,
+                     num_photometry=100,
+                     num_spectra=2,
+                     num_spectrum_points=500,
+                     gz_fraction=0.0,
+                     dupe_fraction=0.0,
+                     seed=0):
+    """Write a synthetic catalog into the directory `path`.
+
+    The structure mirrors that of a real catalog: the repository list is
+    written to '`path`/input/repos.json' and one json file per entry is
+    written to the '`path`/output/`OUTPUT_REPO`' repository.
+
+    Arguments
+    ---------
+    path : str
+        Base directory of the synthetic catalog.
+    num_entries : int
+        Number of entry files to write.
+    num_aliases : int
+        Number of aliases of each entry (including its name).
+    num_sources : int
+        Number of sources of each entry.
+    num_photometry : int
+        Number of photometric points of each entry.
+    num_spectra : int
+        Number of spectra of each entry.
+    num_spectrum_points : int
+        Number of (wavelength, flux) rows in each spectrum.
+    gz_fraction : float
+        Fraction of entry files to write gzipped.
+    dupe_fraction : float
+        Fraction of entries which share an alias with the following entry,
+        so that the pair are duplicates to be merged.
+    seed : int
+        Seed for the random number generator.
+
+    Returns
+    -------
+    fnames : list of str
+        Filenames of all entry files written.
+
+    """
+    rand = random.Random(seed)
+
+    input_path = os.path.join(path, 'input')
+    output_path = os.path.join(path, 'output', OUTPUT_REPO)
+    for dd in [input_path, output_path]:
+        if not os.path.isdir(dd):
+            os.makedirs(dd)
+
+    repos = OrderedDict([('output', [OUTPUT_REPO]), ('boneyard', ['']),
+                         ('external', ['']), ('internal', [''])])
+    with open(os.path.join(input_path, 'repos.json'), 'w') as ff:
+        json.dump(repos, ff, indent=4)
+
+    fnames = []
+    dupe_alias = None
+    for num in range(num_entries):
+        name = entry_name(num)
+        # Either finish the previous pair of duplicates, or start a new one
+        if dupe_alias is not None:
+            shared = [dupe_alias]
+            dupe_alias = None
+        elif num < num_entries - 1 and rand.random() < dupe_fraction:
+            dupe_alias = 'DUP{:06d}'.format(num)
+            shared = [dupe_alias]
+        else:
+            shared = []
+        data = _generate_entry(rand, num, num_aliases, num_sources,
+                               num_photometry, num_spectra,
+                               num_spectrum_points, shared)
+        jsonstring = json.dumps(
+            {name: data}, indent='\t', separators=(',', ':'),
+            ensure_ascii=False)
+
+        fname = os.path.join(output_path, name + '.json')
+        if rand.random() < gz_fraction:
+            fname += '.gz'
+            with gzip.open(fname, 'wt', encoding='utf8') as ff:
+                ff.write(jsonstring)
+        else:
+            with codecs.open(fname, 'w', encoding='utf8') as ff:
+                ff.write(jsonstring)
+        fnames.append(fname)
+
+    return fnames
+
+
+def _generate_entry(rand, num, num_aliases, num_sources, num_photometry,
+                    num_spectra, num_spectrum_points, shared_aliases):
+    """Construct the data of a single synthetic entry as an `OrderedDict`.
+
+    `shared_aliases` are added to the entry's own aliases.
+    """
+    name = entry_name(num)
+
+    sources = []
+    for ss in range(num_sources):
+        sources.append(OrderedDict([
+            ('name', 'Synthetic Survey {}'.format(ss)),
+            ('bibcode', '2017Synth.{:04d}..{:04d}S'.format(num % 10000, ss)),
+            ('alias', str(ss + 1))]))
+    all_src = ','.join(src['alias'] for src in sources)
+
+    def _quantity(value, source='1'):
+        return OrderedDict([('value', value), ('source', source)])
+
+    aliases = [_quantity(name, all_src)]
+    for aa in range(1, num_aliases):
+        aliases.append(_quantity('SYN{:06d}-{}'.format(num, aa)))
+    for alias in shared_aliases:
+        aliases.append(_quantity(alias))
+
+    t0 = 50000.0 + 3000.0 * rand.random()
+    photometry = []
+    for pp in range(num_photometry):
+        photometry.append(OrderedDict([
+            ('time', '{:.3f}'.format(t0 + 0.5 * pp)),
+            ('band', _BANDS[pp % len(_BANDS)]),
+            ('magnitude', '{:.3f}'.format(16.0 + 4.0 * rand.random())),
+            ('e_magnitude', '{:.3f}'.format(0.01 + 0.1 * rand.random())),
+            ('u_time', 'MJD'),
+            ('source', str(pp % num_sources + 1))]))
+
+    spectra = []
+    for sp in range(num_spectra):
+        data = [['{:.2f}'.format(3000.0 + 10.0 * ww),
+                 '{:.6e}'.format(1.0e-15 * (1.0 + rand.random()))]
+                for ww in range(num_spectrum_points)]
+        spectra.append(OrderedDict([
+            ('time', '{:.3f}'.format(t0 + 5.0 * sp)),
+            ('u_time', 'MJD'),
+            ('u_wavelengths', 'Angstrom'),
+            ('u_fluxes', 'erg/s/cm^2/Angstrom'),
+            ('data', data),
+            ('source', str(sp % num_sources + 1))]))
+
+    ra = '{:02d}:{:02d}:{:05.2f}'.format(
+        rand.randrange(24), rand.randrange(60), 60.0 * rand.random())
+    dec = '{:+03d}:{:02d}:{:04.1f}'.format(
+        rand.randrange(-89, 90), rand.randrange(60), 60.0 * rand.random())
+
+    data = OrderedDict()
+    data['name'] = name
+    data['sources'] = sources
+    data['alias'] = aliases
+    data['ra'] = [_quantity(ra)]
+    data['dec'] = [_quantity(dec)]
+    data['discoverdate'] = [_quantity('{}/01/01'.format(
+        1990 + rand.randrange(30)))]
+    data['redshift'] = [_quantity('{:.4f}'.format(rand.random()))]
+    if photometry:
+        data['photometry'] = photometry
+    if spectra:
+        data['spectra'] = spectra
+    return data
@@ -1,5 +1,8 @@
 """General Catalog Classes and Functions, used and subclassed by each catalog.
+
+NOTE: the `catalog` submodule pulls in the whole entry/quantity machinery (and
+      `astropy`), so it is not imported here; import it explicitly, e.g.
+      ``from astrocats.catalog.catalog import Catalog``.
 """
 
 from . import main
-from . import catalog
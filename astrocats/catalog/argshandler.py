@@ -110,6 +110,11 @@ class ArgsHandler:
             '--archived', '-a', dest='archived',
             default=False, action='store_true',
             help='Always use task caches.')
+        import_pars.add_argument(
+            '--resume', dest='resume',
+            default=False, action='store_true',
+            help=('continue a previous import which did not finish, skipping '
+                  'the tasks it completed.'))
 
         # Control which 'tasks' are executed
         # ----------------------------------
@@ -135,6 +140,55 @@ class ArgsHandler:
             default=None,
             help='predefined group(s) of tasks to run.')
 
+        # Profiling
+        # ---------
+        import_pars.add_argument(
+            '--profile-dir', dest='profile_dir',
+            default=None,
+            help=('directory in which to write a json report of time, memory '
+                  'and I/O statistics for each task.'))
+        import_pars.add_argument(
+            '--cprofile', dest='cprofile',
+            default=False, action='store_true',
+            help=('run each task under `cProfile`, saving stats to '
+                  '`--profile-dir` (which must be given).'))
+
+        # Memory
+        # ------
+        import_pars.add_argument(
+            '--entry-cache-mb', dest='entry_cache_mb',
+            default=0.0, type=float,
+            help=('keep full entries in memory between tasks, instead of '
+                  'reloading them from file, up to this total size [MB] of '
+                  'their json files (default: 0, disabled).'))
+        import_pars.add_argument(
+            '--memory-limit-mb', dest='memory_limit_mb',
+            default=None, type=float,
+            help=('when memory use exceeds this many MB, save the least '
+                  'recently used entries and convert them to stubs '
+                  '(default: no limit).'))
+
+        # Sharding
+        # --------
+        import_pars.add_argument(
+            '--shards', dest='shards',
+            default=None, type=int,
+            help=('split the entries between this many processes, by a hash '
+                  'of their names, for the leading tasks declared '
+                  '`shard_safe`; the other tasks are then run in a single '
+                  'process.'))
+        import_pars.add_argument(
+            '--shard', dest='shard',
+            default=None, type=int,
+            help=('only run the tasks for this shard (from 0 to `--shards` - '
+                  '1), e.g. on one of several machines sharing the output '
+                  'repositories; old entry files are not deleted.'))
+        import_pars.add_argument(
+            '--merge-shards', dest='merge_shards',
+            default=False, action='store_true',
+            help=('only run the tasks which are not sharded, once every '
+                  '`--shard` has finished.'))
+
         return import_pars
 
     def _add_parser_arguments_git(self, subparsers):
@@ -1,5 +1,6 @@
 """Overarching catalog object for all open catalogs."""
 import codecs
+import gc
 import importlib
 import json
 import logging
@@ -16,12 +17,18 @@ from tqdm import tqdm
 from astrocats import __version__
 from astrocats.catalog import gitter
 from astrocats.catalog.entry import ENTRY, Entry
+from astrocats.catalog.entrycache import EntryCache
+from astrocats.catalog.governor import MemoryGovernor
 from astrocats.catalog.model import MODEL
+from astrocats.catalog.profiler import TASK_STATS, TaskProfiler
+from astrocats.catalog.shard import (Shard, can_fork, run_shards,
+                                     shard_tasks)
 from astrocats.catalog.source import SOURCE
+from astrocats.catalog.stub import make_stub
 from astrocats.catalog.task import Task
 from astrocats.catalog.utils import (compress_gz, is_integer, log_memory, pbar,
-                                     read_json_dict, repo_priority,
-                                     uncompress_gz, uniq_cdl)
+                                     read_json_dict, replace_file,
+                                     repo_priority, uncompress_gz, uniq_cdl)
 
 
 class Catalog(object):
@@ -94,9 +101,20 @@ class Catalog(object):
             # critical datafiles
             self.REPOS_LIST = os.path.join(self.PATH_INPUT, 'repos.json')
             self.TASK_LIST = os.path.join(self.PATH_INPUT, 'tasks.json')
+            # state of an unfinished `import`, used to `--resume` it
+            self.CHECKPOINT = self.get_checkpoint_file(
+                getattr(catalog.args, 'shard', None))
             self.repos_dict = read_json_dict(self.REPOS_LIST)
             return
 
+        def get_checkpoint_file(self, shard=None):
+            """Get the path of the checkpoint of an `import` (or a shard).
+            """
+            fname = 'import_checkpoint.json'
+            if shard is not None:
+                fname = 'import_checkpoint-shard{}.json'.format(shard)
+            return os.path.join(self.PATH_OUTPUT, fname)
+
         def _get_repo_file_list(self, repo_folders, normal=True, bones=True):
             """Get filenames for files in each repository.
 
@@ -198,19 +216,40 @@ class Catalog(object):
         # unless updating.
         self.min_journal_priority = 0
 
+        # Collects per-task statistics during `import_data`
+        self.profiler = TaskProfiler(self.log)
+
+        # Limits the memory used, by converting entries to stubs (disabled
+        # by default)
+        self.memory = MemoryGovernor(
+            self.log, getattr(args, 'memory_limit_mb', None))
+
+        # Full entries kept in memory between tasks (disabled by default)
+        self.entry_cache = EntryCache(
+            getattr(args, 'entry_cache_mb', 0.0), track=self.memory.enabled)
+
+        # Part of the entries handled by this process, in a sharded import
+        # (see `astrocats.catalog.shard`), and names of the entries owned by
+        # other shards
+        self.shard = None
+        if getattr(args, 'shard', None) is not None:
+            self.shard = Shard(args.shard, args.shards)
+        self.foreign_entries = set()
+
         # Store version information
         # -------------------------
         # git `SHA` of this directory (i.e. a sub-catalog)
         my_path = self.PATHS.catalog_dir
         catalog_sha = 'N/A'
         if os.path.exists(os.path.join(my_path, '.git')):
-            catalog_sha = gitter.get_sha(path=my_path, log=self.log)
+            catalog_sha = gitter.get_sha_cached(path=my_path, log=self.log)
         # Git SHA of `astrocats`
         parent_path = os.path.abspath(
             os.path.join(my_path, os.pardir, os.pardir))
         astrocats_sha = 'N/A'
         if os.path.exists(os.path.join(parent_path, '.git')):
-            astrocats_sha = gitter.get_sha(path=parent_path, log=self.log)
+            astrocats_sha = gitter.get_sha_cached(
+                path=parent_path, log=self.log)
         # Name of this class (if subclassed)
         my_name = type(self).__name__
         self._version_long = "Astrocats v'{}' SHA'{}' - {} SHA'{}'".format(
@@ -232,31 +271,97 @@ class Catalog(object):
         # FIX
         warnings.filterwarnings('ignore', category=DeprecationWarning)
 
+        # In a sharded import, the leading shard-safe tasks are run by a
+        # process for each shard, then the other tasks by this one
+        sharded_tasks = shard_tasks(tasks_list)
+        coordinate = (bool(getattr(self.args, 'shards', None)) and
+                      self.shard is None)
+        merge_shards = coordinate and getattr(self.args, 'merge_shards', False)
+        if coordinate and not merge_shards:
+            if not len(sharded_tasks):
+                self.log.warning("No shard-safe tasks to run, importing in a "
+                                 "single process.")
+                coordinate = False
+            elif not can_fork():
+                self.log.warning("Processes cannot be forked, importing in a "
+                                 "single process.")
+                coordinate = False
+        if self.shard is not None:
+            self.log.warning("Running shard {} of {}, tasks: {}".format(
+                self.shard.index, self.shard.count,
+                ', '.join(sharded_tasks)))
+        # Old files are deleted before the shards start
+        if self.shard is not None or merge_shards:
+            self.args.delete_old = False
+
+        # Continue from the last task completed by a previous (failed) run
+        checkpoint = None
+        if getattr(self.args, 'resume', False):
+            checkpoint = self.load_checkpoint()
+            shards_started = coordinate and any(
+                os.path.exists(self.PATHS.get_checkpoint_file(index))
+                for index in range(self.args.shards))
+            if checkpoint is not None or shards_started:
+                self.log.info("Disabling `pre-delete` to resume.")
+                self.args.delete_old = False
+
         # Delete all old (previously constructed) output files
         if self.args.delete_old:
             self.log.warning("Deleting all old entry files.")
             self.delete_old_entry_files()
 
-        # In update mode, load all entry stubs.
-        if self.args.load_stubs or self.args.update:
+        # Run all shards, unless only their final tasks are left
+        if coordinate and checkpoint is None and not merge_shards:
+            run_shards(self)
+
+        # In update mode (or when resuming, or combining shards), load all
+        # entry stubs.
+        if (self.args.load_stubs or self.args.update or
+                checkpoint is not None or coordinate):
             self.load_stubs()
+        completed_tasks = []
+        if checkpoint is not None:
+            completed_tasks = self.restore_checkpoint(checkpoint)
 
         if self.args.travis:
             self.log.warning("Running in `travis` mode.")
 
+        # Setup per-task profiling
+        profile_dir = getattr(self.args, 'profile_dir', None)
+        cprofile = getattr(self.args, 'cprofile', False)
+        if cprofile and profile_dir is None:
+            raise ValueError("`cprofile` requires a `profile_dir` to save to.")
+        if profile_dir is not None and self.shard is not None:
+            profile_dir = os.path.join(
+                profile_dir, 'shard-{}'.format(self.shard.index))
+        if profile_dir is not None and not os.path.isdir(profile_dir):
+            os.makedirs(profile_dir)
+        self.profiler = TaskProfiler(
+            self.log, outdir=profile_dir, cprofile=cprofile)
+
         prev_priority = 0
         prev_task_name = ''
         # for task, task_obj in tasks_list.items():
         for task_name, task_obj in tasks_list.items():
             if not task_obj.active:
                 continue
-            self.log.warning("Task: '{}'".format(task_name))
+            if task_name in completed_tasks:
+                self.log.warning(
+                    "Task: '{}' completed before, skipping".format(task_name))
+                continue
 
             nice_name = task_obj.nice_name
             mod_name = task_obj.module
             func_name = task_obj.function
             priority = task_obj.priority
 
+            # Other tasks (e.g. merging duplicates) need all entries
+            if self.shard is not None and task_name not in sharded_tasks:
+                continue
+            if coordinate and task_name in sharded_tasks:
+                continue
+            self.log.warning("Task: '{}'".format(task_name))
+
             # Make sure things are running in the correct order
             if priority < prev_priority and priority > 0:
                 raise RuntimeError("Priority for '{}': '{}', less than prev,"
@@ -268,25 +373,122 @@ class Catalog(object):
                                                      mod_name, func_name))
             mod = importlib.import_module('.' + mod_name, package='astrocats')
             self.current_task = task_obj
-            getattr(mod, func_name)(self)
+            self.profiler.start_task(task_name)
+            self.profiler.run(task_name, getattr(mod, func_name), self)
 
             num_events, num_stubs = self.count()
             self.log.warning("Task finished.  Events: {},  Stubs: {}".format(
                 num_events, num_stubs))
-            self.journal_entries()
+            with self.profiler.timer(TASK_STATS.JOURNAL_TIME):
+                self.journal_entries(keep=True)
+                if self.memory.check(force=True):
+                    self.relieve_memory()
+            self.profiler.end_task()
             num_events, num_stubs = self.count()
             self.log.warning("Journal finished.  Events: {}, Stubs: {}".format(
                 num_events, num_stubs))
 
+            completed_tasks.append(task_name)
+            self.save_checkpoint(completed_tasks)
+
             prev_priority = priority
             prev_task_name = task_name
 
+        # All tasks finished, the next run starts from scratch.  The
+        # checkpoints of shards are kept until the final tasks have finished
+        if self.shard is None:
+            checkpoints = [self.PATHS.CHECKPOINT]
+            if coordinate:
+                checkpoints += [self.PATHS.get_checkpoint_file(index)
+                                for index in range(self.args.shards)]
+            for fname in checkpoints:
+                if os.path.exists(fname):
+                    os.remove(fname)
+
         process = psutil.Process(os.getpid())
         memory = process.memory_info().rss
         self.log.warning('Memory used (MBs): '
                          '{:,}'.format(memory / 1024. / 1024.))
+        self.profiler.write_report()
+        return
+
+    def save_checkpoint(self, completed_tasks):
+        """Record the state of the import after the last completed task.
+
+        The checkpoint (the json file `PATHS.CHECKPOINT`) stores the names of
+        the completed tasks, the names of the entries (in order), and the
+        alias index `aliases`.  The entries themselves are not stored: they
+        have been saved to their files by `journal_entries`, so checkpoints
+        are only written when `write_entries` is set.
+
+        Subclasses storing other state between tasks can add it to the
+        dictionary returned by `_checkpoint_data`, and restore it in
+        `restore_checkpoint`.
+        """
+        if not self.args.write_entries:
+            return
+        data = self._checkpoint_data(completed_tasks)
+        # Write to a temporary file first, and then replace the previous
+        # checkpoint in one step, so that an interruption at any point leaves
+        # either the previous or the new checkpoint (never none, or a corrupt
+        # one)
+        fname = self.PATHS.CHECKPOINT
+        temp_fname = fname + '.tmp'
+        with open(temp_fname, 'w') as jfil:
+            json.dump(data, jfil)
+            jfil.flush()
+            os.fsync(jfil.fileno())
+        replace_file(temp_fname, fname)
+        self.log.debug("Saved checkpoint after {} tasks to '{}'".format(
+            len(completed_tasks), fname))
         return
 
+    def _checkpoint_data(self, completed_tasks):
+        """Construct the (json serializable) contents of a checkpoint."""
+        data = OrderedDict()
+        data['version'] = __version__
+        data['completed_tasks'] = list(completed_tasks)
+        data['entries'] = [name for name in self.entries
+                           if name not in self.foreign_entries]
+        data['aliases'] = self.aliases
+        return data
+
+    def load_checkpoint(self):
+        """Load the checkpoint of a previous import, `None` if there is none.
+        """
+        fname = self.PATHS.CHECKPOINT
+        if not os.path.isfile(fname):
+            self.log.warning("No checkpoint '{}' to resume from, running all "
+                             "tasks.".format(fname))
+            return None
+        with open(fname, 'r') as jfil:
+            checkpoint = json.load(jfil, object_pairs_hook=OrderedDict)
+        self.log.warning("Resuming from checkpoint '{}', after tasks: {}"
+                         .format(fname, checkpoint['completed_tasks']))
+        return checkpoint
+
+    def restore_checkpoint(self, checkpoint):
+        """Restore the state recorded in `checkpoint` (see `save_checkpoint`).
+
+        The entry stubs must have been loaded already (`load_stubs`); only
+        those present in the checkpoint are kept, in the same order.
+
+        Returns
+        -------
+        completed_tasks : list of str
+            Names of the tasks which do not need to be run again.
+
+        """
+        names = [name for name in checkpoint['entries']
+                 if name in self.entries]
+        if len(names) < len(checkpoint['entries']):
+            self.log.warning("{} entries in the checkpoint have no file".format(
+                len(checkpoint['entries']) - len(names)))
+        self.entries = OrderedDict(
+            (name, self.entries[name]) for name in names)
+        self.aliases = dict(checkpoint['aliases'])
+        return list(checkpoint['completed_tasks'])
+
     def load_task_list(self):
         """Load the list of tasks in this catalog's 'input/tasks.json' file.
 
@@ -426,12 +628,17 @@ class Catalog(object):
     def load_entry_from_name(self, name, delete=True, merge=True):
         loaded_entry = self.proto.init_from_file(self, name=name, merge=merge)
         if loaded_entry is not None:
+            self.profiler.count(TASK_STATS.ENTRIES_LOADED)
             self.entries[name] = loaded_entry
+            if self.entry_cache.tracking:
+                self.entry_cache.touch(name, loaded_entry)
             self.log.debug("Added '{}', from '{}', to `self.entries`".format(
                 name, loaded_entry.filename))
             # Delete source file, if desired
             if delete:
                 self._delete_entry_file(entry=loaded_entry)
+            if self.memory.check():
+                self.relieve_memory(current=name)
             return name
         return None
 
@@ -459,9 +666,12 @@ class Catalog(object):
             # If this is a stub, we need to continue, possibly load file
             if self.entries[newname]._stub:
                 self.log.debug("'{}' is a stub".format(newname))
+                if load:
+                    self.profiler.count(TASK_STATS.ENTRY_CACHE_MISSES)
             # If a full (non-stub) event exists, return its name
             else:
                 self.log.debug("'{}' is not a stub, returning".format(newname))
+                self._use_cached_entry(newname, delete=delete)
                 return newname
 
         # If entry is alias of another entry in `entries`, find and return that
@@ -471,6 +681,21 @@ class Catalog(object):
                 "`newname`: '{}' (name: '{}') already exists as alias for "
                 "'{}'.".format(newname, name, match_name))
             newname = match_name
+            # A full entry kept from a previous task is already up to date
+            if (newname in self.entry_cache and
+                    not self.entries[newname]._stub):
+                self._use_cached_entry(newname, delete=delete)
+                return newname
+
+        # In a sharded import, entries owned by other shards are never loaded
+        # (or saved): a new entry collects the data added to them, which the
+        # (shard-safe) tasks never read back
+        if not self.owns_entry(newname):
+            if newname in self.entries and not self.entries[newname]._stub:
+                return newname
+            self.foreign_entries.add(newname)
+            load = False
+            match_name = None
 
         # Load entry from file
         if load:
@@ -489,8 +714,106 @@ class Catalog(object):
                      "Created new entry for '{}'".format(newname))
         # Add entry to dictionary
         self.entries[newname] = new_entry
+        if (self.entry_cache.tracking and
+                newname not in self.foreign_entries):
+            self.entry_cache.touch(newname, new_entry)
+        if self.memory.check():
+            self.relieve_memory(current=newname)
         return newname
 
+    def owns_entry(self, name):
+        """Whether this process loads and saves the entry `name`.
+
+        Always `True`, except in a sharded import (see
+        `astrocats.catalog.shard`), where the owning shard is given by the
+        name of the entry's file.
+        """
+        if self.shard is None:
+            return True
+        return self.shard.owns(self.proto.get_filename(name))
+
+    def _use_cached_entry(self, name, delete=True):
+        """Mark the full entry `name` as used by the current task.
+
+        If the entry was kept in memory since it was last saved, this is a
+        cache hit; its file is then deleted (if `delete`), as it would have
+        been when loading the entry from that file.
+        """
+        if (not self.entry_cache.tracking or
+                name in self.foreign_entries):
+            return
+
+        filename = self.entry_cache.touch(name, self.entries[name])
+        if filename is None:
+            return
+
+        self.profiler.count(TASK_STATS.ENTRY_CACHE_HITS)
+        self.log.debug("Using '{}' kept in memory, saved to '{}'".format(
+            name, filename))
+        if delete and self.args.write_entries and os.path.exists(filename):
+            self.log.info("Deleting entry file '{}' of entry '{}'".format(
+                filename, name))
+            os.remove(filename)
+        return
+
+    def relieve_memory(self, current=None):
+        """Convert full entries into stubs until memory use is within budget.
+
+        Entries are converted in the order they were last used (least recent
+        first), in batches of half of the remaining full entries, saving
+        those with changes, until the `memory` governor is satisfied.  The
+        entry named `current` (e.g. the one just loaded) is never converted.
+
+        Entries are only ever converted between tasks otherwise; a task
+        should therefore always use `add_entry` to get an entry, rather than
+        keep using a name from before it loaded another entry.
+        """
+        beg_used = self.memory.used()
+        names = [
+            name for name in self.entry_cache.names()
+            if name != current and name in self.entries and
+            not self.entries[name]._stub
+        ]
+        self.log.warning(
+            "Memory use {:.1f} MB over budget of {:.1f} MB; {} full entries "
+            "can be converted to stubs".format(
+                beg_used, self.memory.max_mb, len(names)))
+
+        num_spilled = 0
+        while not self.memory.relieved():
+            if not names:
+                self.memory.give_up()
+                break
+            batch = names[:max(len(names) // 2, 1)]
+            names = names[len(batch):]
+            self._spill_entries(batch)
+            num_spilled += len(batch)
+            gc.collect()
+
+        end_used = self.memory.used()
+        self.log.warning("Converted {} entries to stubs, memory use {:.1f} "
+                         "MB".format(num_spilled, end_used))
+        if end_used > self.memory.max_mb:
+            log_memory(self.log, "Memory still over budget", logging.WARNING,
+                       raise_flag=False)
+        return
+
+    def _spill_entries(self, names):
+        """Save (if changed) the given entries, and convert them to stubs."""
+        cache = self.entry_cache
+        for name in names:
+            entry = self.entries[name]
+            if self.args.write_entries and not cache.is_clean(name, entry):
+                save_name = entry.save()
+                self.profiler.count(TASK_STATS.ENTRIES_SAVED)
+                self.log.info(
+                    "Saved {} to '{}'.".format(name.ljust(20), save_name))
+            self.profiler.count(TASK_STATS.ENTRIES_SPILLED)
+            cache.discard(name)
+            self.entries[name] = entry.get_stub()
+            self.log.debug("Entry for '{}' converted to stub".format(name))
+        return
+
     def delete_old_entry_files(self):
         if len(self.entries):
             err_str = "`delete_old_entry_files` with `entries` not empty!"
@@ -703,8 +1026,12 @@ class Catalog(object):
                                      "('{}' and '{}'), merging.".format(name1,
                                                                         name2))
 
-                    load1 = self.proto.init_from_file(self, name=name1)
-                    load2 = self.proto.init_from_file(self, name=name2)
+                    # Don't merge while loading, the two entries would be
+                    # merged (and one removed) before they are compared
+                    load1 = self.proto.init_from_file(
+                        self, name=name1, merge=False)
+                    load2 = self.proto.init_from_file(
+                        self, name=name2, merge=False)
                     if load1 is not None and load2 is not None:
                         # Delete old files
                         self._delete_entry_file(entry=load1)
@@ -757,12 +1084,7 @@ class Catalog(object):
         Used in `update` mode.
         """
         # Initialize parameter related to diagnostic output of memory usage
-        if log_mem:
-            import psutil
-            process = psutil.Process(os.getpid())
-            rss = process.memory_info().rss
-            LOG_MEMORY_INT = 1000
-            MEMORY_LIMIT = 1000.0
+        LOG_MEMORY_INT = 1000
 
         def _add_stub_manually(_fname):
             """Create and add a 'stub' by manually loading parameters from
@@ -803,25 +1125,9 @@ class Catalog(object):
 
                 # Remove the outmost dict level
                 data = data[stub_name]
-                # Create a new `Entry` (subclass) instance
-                proto = self.proto
-                stub = proto(catalog=self, name=stub_name, stub=True)
-                # Add stub parameters if they are available
-                if proto._KEYS.ALIAS in data:
-                    stub[proto._KEYS.ALIAS] = data[proto._KEYS.ALIAS]
-                if proto._KEYS.DISTINCT_FROM in data:
-                    stub[proto._KEYS.DISTINCT_FROM] = data[
-                        proto._KEYS.DISTINCT_FROM]
-                if proto._KEYS.RA in data:
-                    stub[proto._KEYS.RA] = data[proto._KEYS.RA]
-                if proto._KEYS.DEC in data:
-                    stub[proto._KEYS.DEC] = data[proto._KEYS.DEC]
-                if proto._KEYS.DISCOVER_DATE in data:
-                    stub[proto._KEYS.DISCOVER_DATE] = data[
-                        proto._KEYS.DISCOVER_DATE]
-                if proto._KEYS.SOURCES in data:
-                    stub[proto._KEYS.SOURCES] = data[
-                        proto._KEYS.SOURCES]
+                # Create a new (compact) stub, with the stub parameters which
+                # are available
+                stub = make_stub(self.proto, self, stub_name, data)
 
             # Store the stub
             self.entries[stub_name] = stub
@@ -829,6 +1135,12 @@ class Catalog(object):
 
         currenttask = 'Loading entry stubs'
         files = self.PATHS.get_repo_output_file_list()
+        # Shards only read their own files, those of others may be changing
+        if self.shard is not None:
+            files = [
+                fname for fname in files
+                if self.shard.owns(os.path.basename(fname).split('.json')[0])
+            ]
         for ii, _fname in enumerate(pbar(files, currenttask)):
             # Run normally
             # _add_stub(_fname)
@@ -836,17 +1148,13 @@ class Catalog(object):
             # Run 'manually' (extract stub parameters directly from JSON)
             _add_stub_manually(_fname)
 
-            if log_mem:
-                rss = process.memory_info().rss / 1024 / 1024
-                if ii % LOG_MEMORY_INT == 0 or rss > MEMORY_LIMIT:
-                    log_memory(self.log, "\nLoaded stub {}".format(ii),
-                               logging.INFO)
-                    if rss > MEMORY_LIMIT:
-                        err = (
-                            "Memory usage {}, has exceeded {} on file {} '{}'".
-                            format(rss, MEMORY_LIMIT, ii, _fname))
-                        self.log.error(err)
-                        raise RuntimeError(err)
+            if log_mem and ii % LOG_MEMORY_INT == 0:
+                log_memory(self.log, "\nLoaded stub {}".format(ii),
+                           logging.INFO)
+
+            # Convert any full entries to stubs if over the memory budget
+            if self.memory.check():
+                self.relieve_memory()
 
         return self.entries
 
@@ -891,7 +1199,8 @@ class Catalog(object):
                         gz=False,
                         bury=False,
                         write_stubs=False,
-                        final=False):
+                        final=False,
+                        keep=False):
         """Write all entries in `entries` to files, and clear.  Depending on
         arguments and `tasks`.
 
@@ -899,7 +1208,14 @@ class Catalog(object):
         and deleting.
         -   If ``clear == True``, then each element of `entries` is deleted,
             and a `stubs` entry is added
+        -   If ``keep == True`` (as between tasks, in `import_data`) and the
+            `entry_cache` is enabled, saved entries are instead kept in
+            memory (unless ``final == True``), and only the least recently
+            used are made into stubs, once the cache is over its budget.
+        -   Kept entries which are unchanged since they were last saved are
+            treated like stubs: they are not saved again.
         """
+        cache = self.entry_cache
 
         # if (self.current_task.priority >= 0 and
         #        self.current_task.priority < self.min_journal_priority):
@@ -909,10 +1225,24 @@ class Catalog(object):
         # NOTE: this needs to use a `list` wrapper to allow modification of
         # dict
         for name in list(self.entries.keys()):
+            # Entries owned by other shards are never saved
+            if name in self.foreign_entries:
+                if clear and not self.entries[name]._stub:
+                    self.entries[name] = self.entries[name].get_stub()
+                continue
+
+            save_name = None
             if self.args.write_entries:
                 # If this is a stub and we aren't writing stubs, skip
                 if self.entries[name]._stub and not write_stubs:
                     continue
+                # Entries unchanged since they were saved are treated as stubs
+                if (cache.is_clean(name, self.entries[name]) and
+                        not write_stubs):
+                    if clear and (final or not keep):
+                        cache.discard(name)
+                        self.entries[name] = self.entries[name].get_stub()
+                    continue
 
                 # Bury non-SN entries here if only claimed type is non-SN type,
                 # or if primary name starts with a non-SN prefix.
@@ -924,6 +1254,7 @@ class Catalog(object):
                 if save_entry:
                     save_name = self.entries[name].save(
                         bury=bury_entry, final=final)
+                    self.profiler.count(TASK_STATS.ENTRIES_SAVED)
                     self.log.info(
                         "Saved {} to '{}'.".format(name.ljust(20), save_name))
                     if (gz and os.path.getsize(save_name) >
@@ -939,9 +1270,25 @@ class Catalog(object):
                                   '.json.gz; cd ' + self.PATHS.PATH_BASE)
 
             if clear:
+                # Keep saved entries in memory, if enabled
+                if (keep and cache.enabled and not final and
+                        save_name is not None and
+                        not self.entries[name]._stub):
+                    cache.store(name, self.entries[name], save_name)
+                    continue
+                cache.discard(name)
                 self.entries[name] = self.entries[name].get_stub()
                 self.log.debug("Entry for '{}' converted to stub".format(name))
 
+        # Convert the least recently used entries to stubs
+        if clear and keep and cache.enabled:
+            for name in cache.evict(keep=self.entries):
+                self.entries[name] = self.entries[name].get_stub()
+                self.log.debug("Entry for '{}' evicted from memory, converted "
+                               "to stub".format(name))
+            self.log.info("{} entries ({:.1f} MB) kept in memory".format(
+                len(cache), cache.total_size / 1024. / 1024.))
+
         return
 
     def entry_exists(self, name):
@@ -1192,6 +1539,7 @@ class Catalog(object):
         # In `archived` mode and task - try to return the cached page
         if archived_mode or (archived_task and not update_mode):
             if file_txt is not None:
+                self.profiler.count(TASK_STATS.CACHE_HITS)
                 return file_txt
 
             # If this flag is set, don't even attempt to download from web
@@ -1235,6 +1583,7 @@ class Catalog(object):
                     return None
                 # Otherwise, return file data
                 self.log.warning("URL download failed, using cached data.")
+                self.profiler.count(TASK_STATS.CACHE_HITS)
                 return file_txt
 
         # Here: `url_txt` exists, `file_txt` may exist or may be None
@@ -1323,6 +1672,7 @@ class Catalog(object):
         _CODE_ERRORS = [500, 307, 404]
         import requests
         session = requests.Session()
+        self.profiler.count(TASK_STATS.URL_FETCHES)
 
         try:
             headers = {
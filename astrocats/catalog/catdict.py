@@ -1,10 +1,11 @@
 # -*- coding: utf-8 -*-
 """Class defitions for `CatDict` and `CatDictError`, data storage classes."""
+import logging
 from collections import OrderedDict
 from copy import deepcopy
 
 from astrocats.catalog.key import KEY_TYPES, Key, KeyCollection
-from astrocats.catalog.utils import listify, uniq_cdl
+from astrocats.catalog.utils import listify, log_lazy, uniq_cdl
 
 try:
     basestring
@@ -110,12 +111,11 @@ class CatDict(OrderedDict):
                 if kiv:
                     key_obj = vals[vals.index(key)]
                 else:
-                    self._log.info('[{}] `{}` not in list of keys for `{}`, '
-                                   'adding anyway as allow unknown keys is '
-                                   '`{}`.'.format(parent[
-                                       parent._KEYS.NAME], key,
-                                       type(self).__name__,
-                                       self._ALLOW_UNKNOWN_KEYS))
+                    log_lazy(self._log, logging.INFO,
+                             '[{}] `{}` not in list of keys for `{}`, '
+                             'adding anyway as allow unknown keys is `{}`.',
+                             parent[parent._KEYS.NAME], key,
+                             type(self).__name__, self._ALLOW_UNKNOWN_KEYS)
                     key_obj = Key(key)
 
                 # Handle Special Cases
@@ -130,9 +130,9 @@ class CatDict(OrderedDict):
                 check_fail = False
                 if not key_obj.check(kwargs[key]):
                     check_fail = True
-                    self._log.info("Value for '{}' is invalid "
-                                   "'{}':'{}'".format(key_obj.pretty(), key,
-                                                      kwargs[key]))
+                    log_lazy(self._log, logging.INFO,
+                             "Value for '{}' is invalid '{}':'{}'",
+                             key_obj.pretty(), key, kwargs[key])
                     # Have the parent log a warning if this is a required key
                     if key in self._req_keys:
                         raise CatDictError(
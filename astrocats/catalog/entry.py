@@ -17,9 +17,11 @@ from astrocats.catalog.model import MODEL, Model
 from astrocats.catalog.photometry import PHOTOMETRY, Photometry
 from astrocats.catalog.quantity import QUANTITY, Quantity
 from astrocats.catalog.source import SOURCE, Source
-from astrocats.catalog.spectrum import SPECTRUM, Spectrum
+from astrocats.catalog.spectrum import (SPECTRUM, Spectrum, SpectrumData,
+                                        SpectrumIndex)
+from astrocats.catalog.stub import make_stub, stub_keys, stub_sort_func
 from astrocats.catalog.utils import (alias_priority, dict_to_pretty_string,
-                                     is_integer, is_number, listify)
+                                     is_integer, is_number, listify, log_lazy)
 from past.builtins import basestring
 from six import string_types
 
@@ -112,6 +114,8 @@ class Entry(OrderedDict):
         +   The `Entry.get_stub` method returns the 'stub' corresponding to the
             Entry instance.  i.e. it returns a *new object* with only the name
             and aliases copied over.
+        +   The elements of stubs are compact, plain `dict` objects (see
+            `astrocats.catalog.stub.make_stub`).
 
     Attributes
     ----------
@@ -149,6 +153,7 @@ class Entry(OrderedDict):
         self.filename = None
         self.dupe_of = []
         self._stub = stub
+        self._spectrum_index = None
         if catalog:
             self._log = catalog.log
         else:
@@ -196,30 +201,42 @@ class Entry(OrderedDict):
 
         return outdir, filename
 
-    def _ordered(self, odict):
-        """Convert the object into a plain OrderedDict."""
+    def _ordered(self, odict, sort_func=None):
+        """Convert the object into a plain OrderedDict.
+
+        `odict` itself is not modified, so the entry remains usable after
+        being saved.  Its keys are sorted with its `sort_func` (if it is a
+        `CatDict` or `Entry`), otherwise with `sort_func`, if given.
+        """
         ndict = OrderedDict()
 
         if isinstance(odict, CatDict) or isinstance(odict, Entry):
             key = odict.sort_func
         else:
-            key = None
+            key = sort_func
 
         nkeys = list(sorted(odict.keys(), key=key))
         for key in nkeys:
-            if isinstance(odict[key], OrderedDict):
-                odict[key] = self._ordered(odict[key])
-            if isinstance(odict[key], list):
-                if (not (odict[key] and
-                         not isinstance(odict[key][0], OrderedDict))):
+            val = odict[key]
+            if isinstance(val, OrderedDict):
+                val = self._ordered(val)
+            elif isinstance(val, SpectrumData):
+                val = val.to_list()
+            if isinstance(val, list):
+                if (not (val and not isinstance(val[0], dict))):
                     nlist = []
-                    for item in odict[key]:
+                    for item in val:
                         if isinstance(item, OrderedDict):
                             nlist.append(self._ordered(item))
+                        elif self._stub and type(item) is dict:
+                            # Elements of stubs are plain `dict`s, sorted as
+                            # the elements of full entries (see `make_stub`)
+                            nlist.append(self._ordered(
+                                item, stub_sort_func(self._KEYS, key)))
                         else:
                             nlist.append(item)
-                    odict[key] = nlist
-            ndict[key] = odict[key]
+                    val = nlist
+            ndict[key] = val
 
         return ndict
 
@@ -284,8 +301,8 @@ class Entry(OrderedDict):
                              gzip=False,
                              filter_on={}):
         # FIX: check for overwrite??"""
-        self._log.debug("_load_data_from_json(): {}\n\t{}".format(self.name(),
-                                                                  fhand))
+        log_lazy(self._log, logging.DEBUG, "_load_data_from_json(): {}\n\t{}",
+                 self.name(), fhand)
         # Store the filename this was loaded from
         self.filename = fhand
 
@@ -304,7 +321,7 @@ class Entry(OrderedDict):
         name = name[0]
         # Remove the outmost dict level
         data = data[name]
-        self._log.debug("Name: {}".format(name))
+        log_lazy(self._log, logging.DEBUG, "Name: {}", name)
 
         # Delete ignored keys
         for key in ignore_keys:
@@ -351,7 +368,8 @@ class Entry(OrderedDict):
                                   compare_to_existing=True,
                                   filter_on={}):
         """Convert `OrderedDict` into `Entry` or its derivative classes."""
-        self._log.debug("_convert_odict_to_classes(): {}".format(self.name()))
+        log_lazy(self._log, logging.DEBUG, "_convert_odict_to_classes(): {}",
+                 self.name())
         self._log.debug("This should be a temporary fix.  Dont be lazy.")
 
         # Setup filters. Currently only used for photometry.
@@ -385,9 +403,9 @@ class Entry(OrderedDict):
         if src_key in data:
             # Remove from `data`
             sources = data.pop(src_key)
-            self._log.debug("Found {} '{}' entries".format(
-                len(sources), src_key))
-            self._log.debug("{}: {}".format(src_key, sources))
+            log_lazy(self._log, logging.DEBUG, "Found {} '{}' entries",
+                     len(sources), src_key)
+            log_lazy(self._log, logging.DEBUG, "{}: {}", src_key, sources)
 
             for src in sources:
                 self.add_source(allow_alias=True, **src)
@@ -397,8 +415,8 @@ class Entry(OrderedDict):
         photo_key = self._KEYS.PHOTOMETRY
         if photo_key in data:
             photoms = data.pop(photo_key)
-            self._log.debug("Found {} '{}' entries".format(
-                len(photoms), photo_key))
+            log_lazy(self._log, logging.DEBUG, "Found {} '{}' entries",
+                     len(photoms), photo_key)
             phcount = 0
             for photo in photoms:
                 skip = False
@@ -413,8 +431,8 @@ class Entry(OrderedDict):
                     compare_to_existing=compare_to_existing,
                     **photo)
                 phcount += 1
-            self._log.debug("Added {} '{}' entries".format(
-                phcount, photo_key))
+            log_lazy(self._log, logging.DEBUG, "Added {} '{}' entries",
+                     phcount, photo_key)
 
         # Handle `spectra`
         # ---------------
@@ -423,8 +441,8 @@ class Entry(OrderedDict):
             # When we are cleaning internal data, we don't always want to
             # require all of the normal spectrum data elements.
             spectra = data.pop(spec_key)
-            self._log.debug("Found {} '{}' entries".format(
-                len(spectra), spec_key))
+            log_lazy(self._log, logging.DEBUG, "Found {} '{}' entries",
+                     len(spectra), spec_key)
             for spec in spectra:
                 self._add_cat_dict(
                     Spectrum,
@@ -437,8 +455,8 @@ class Entry(OrderedDict):
         err_key = self._KEYS.ERRORS
         if err_key in data:
             errors = data.pop(err_key)
-            self._log.debug("Found {} '{}' entries".format(
-                len(errors), err_key))
+            log_lazy(self._log, logging.DEBUG, "Found {} '{}' entries",
+                     len(errors), err_key)
             for err in errors:
                 self._add_cat_dict(Error, self._KEYS.ERRORS, **err)
 
@@ -449,8 +467,8 @@ class Entry(OrderedDict):
             # When we are cleaning internal data, we don't always want to
             # require all of the normal spectrum data elements.
             model = data.pop(model_key)
-            self._log.debug("Found {} '{}' entries".format(
-                len(model), model_key))
+            log_lazy(self._log, logging.DEBUG, "Found {} '{}' entries",
+                     len(model), model_key)
             for mod in model:
                 self._add_cat_dict(
                     Model,
@@ -461,8 +479,8 @@ class Entry(OrderedDict):
         # Handle everything else --- should be `Quantity`s
         # ------------------------------------------------
         if len(data):
-            self._log.debug("{} remaining entries, assuming `Quantity`".format(
-                len(data)))
+            log_lazy(self._log, logging.DEBUG,
+                     "{} remaining entries, assuming `Quantity`", len(data))
             # Iterate over remaining keys
             for key in list(data.keys()):
                 vals = data.pop(key)
@@ -470,7 +488,7 @@ class Entry(OrderedDict):
                 #    E.g. `aliases` is a list of alias quantities
                 if not isinstance(vals, list):
                     vals = [vals]
-                self._log.debug("{}: {}".format(key, vals))
+                log_lazy(self._log, logging.DEBUG, "{}: {}", key, vals)
                 for vv in vals:
                     self._add_cat_dict(
                         Quantity,
@@ -517,8 +535,9 @@ class Entry(OrderedDict):
             new_entry = cat_dict_class(self, key=key_in_self, **kwargs)
         except CatDictError as err:
             if err.warn:
-                self._log.info("'{}' Not adding '{}': '{}'".format(self[
-                    self._KEYS.NAME], key_in_self, str(err)))
+                log_lazy(self._log, logging.INFO,
+                         "'{}' Not adding '{}': '{}'", self[self._KEYS.NAME],
+                         key_in_self, err)
             return None
         return new_entry
 
@@ -533,6 +552,14 @@ class Entry(OrderedDict):
         CatDict only added if initialization succeeds and it
         doesn't already exist within the Entry.
         """
+        # An entry owned by another shard of a sharded import (see
+        # `astrocats.catalog.shard`) only collects the elements of its stub,
+        # used to match names and aliases
+        foreign_entries = getattr(self.catalog, 'foreign_entries', ())
+        foreign = self[self._KEYS.NAME] in foreign_entries
+        if foreign and key_in_self not in stub_keys(self._KEYS):
+            return False
+
         # Make sure that a source is given, and is valid (nor erroneous)
         if cat_dict_class != Error:
             try:
@@ -540,8 +567,9 @@ class Entry(OrderedDict):
                                                      key_in_self, **kwargs)
             except CatDictError as err:
                 if err.warn:
-                    self._log.info("'{}' Not adding '{}': '{}'".format(self[
-                        self._KEYS.NAME], key_in_self, str(err)))
+                    log_lazy(self._log, logging.INFO,
+                             "'{}' Not adding '{}': '{}'",
+                             self[self._KEYS.NAME], key_in_self, err)
                 return False
 
             if source is None:
@@ -571,7 +599,8 @@ class Entry(OrderedDict):
                 possible_dupe = self.catalog.aliases[new_entry[QUANTITY.VALUE]]
                 # print(possible_dupe)
                 if (possible_dupe != self[self._KEYS.NAME] and
-                        possible_dupe in self.catalog.entries):
+                        possible_dupe in self.catalog.entries and
+                        not foreign and possible_dupe not in foreign_entries):
                     self.dupe_of.append(possible_dupe)
             if 'aliases' in dir(self.catalog):
                 self.catalog.aliases[new_entry[QUANTITY.VALUE]] = self[
@@ -813,8 +842,9 @@ class Entry(OrderedDict):
         if new_spectrum is None:
             return None
 
+        index = self._get_spectrum_index()
         is_dupe = False
-        for item in self.get(spec_key, []):
+        for item in index.candidates(new_spectrum):
             # Only the `filename` should be compared for duplicates. If a
             # duplicate is found, that means the previous `exclude` array
             # should be saved to the new object, and the old deleted
@@ -823,13 +853,22 @@ class Entry(OrderedDict):
                     item[SPECTRUM.EXCLUDE] = new_spectrum[SPECTRUM.EXCLUDE]
                 elif SPECTRUM.EXCLUDE in item:
                     item.update(new_spectrum)
+                    index.update(item)
                 is_dupe = True
                 break
 
         if not is_dupe:
-            self.setdefault(spec_key, []).append(new_spectrum)
+            index.append(new_spectrum)
         return
 
+    def _get_spectrum_index(self):
+        """Return the `SpectrumIndex` of the spectra of this entry."""
+        spectra = self.setdefault(self._KEYS.SPECTRA, [])
+        if (self._spectrum_index is None or
+                self._spectrum_index.spectra is not spectra):
+            self._spectrum_index = SpectrumIndex(spectra)
+        return self._spectrum_index
+
     def check(self):
         """Check that the entry has the required fields."""
         # Make sure there is a schema key in dict
@@ -839,7 +878,7 @@ class Entry(OrderedDict):
         if (self._KEYS.NAME not in self or len(self[self._KEYS.NAME]) == 0):
             raise ValueError("Entry name is empty:\n\t{}".format(
                 json.dumps(
-                    self, indent=2)))
+                    self._ordered(self), indent=2)))
         return
 
     def clean_internal(self, data=None):
@@ -904,7 +943,8 @@ class Entry(OrderedDict):
     def get_stub(self):
         """Get a new `Entry` which contains the 'stub' of this one.
 
-        The 'stub' is only the name and aliases.
+        The 'stub' is only the name, aliases, coordinates, discovery date and
+        sources.
 
         Usage:
         -----
@@ -918,20 +958,8 @@ class Entry(OrderedDict):
             The type of the returned object is this instance's type.
 
         """
-        stub = type(self)(self.catalog, self[self._KEYS.NAME], stub=True)
-        if self._KEYS.ALIAS in self:
-            stub[self._KEYS.ALIAS] = self[self._KEYS.ALIAS]
-        if self._KEYS.DISTINCT_FROM in self:
-            stub[self._KEYS.DISTINCT_FROM] = self[self._KEYS.DISTINCT_FROM]
-        if self._KEYS.RA in self:
-            stub[self._KEYS.RA] = self[self._KEYS.RA]
-        if self._KEYS.DEC in self:
-            stub[self._KEYS.DEC] = self[self._KEYS.DEC]
-        if self._KEYS.DISCOVER_DATE in self:
-            stub[self._KEYS.DISCOVER_DATE] = self[self._KEYS.DISCOVER_DATE]
-        if self._KEYS.SOURCES in self:
-            stub[self._KEYS.SOURCES] = self[self._KEYS.SOURCES]
-        return stub
+        return make_stub(type(self), self.catalog, self[self._KEYS.NAME],
+                         self)
 
     def is_erroneous(self, field, sources):
         """Check if attribute has been marked as being erroneous."""
@@ -0,0 +1,162 @@
+"""Least-recently-used bookkeeping of full entries kept between tasks.
+"""
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+from astrocats.catalog.spectrum import SpectrumData
+
+__all__ = ['EntryCache']
+
+
+class EntryCache(object):
+    """Track which full entries are kept in memory after being journaled.
+
+    By default `Catalog.journal_entries` turns every entry back into a stub,
+    so the next task using the same entry must load (and parse) its file
+    again.  With a non-zero budget, journaled entries stay in memory, and
+    only the least recently used ones are converted to stubs once the total
+    size of the kept entries exceeds the budget.
+
+    The size of an entry is taken to be the size of the file it was saved
+    to.  The entries themselves are stored in `Catalog.entries` as usual;
+    this object stores, for each entry name (in order of use), the file the
+    entry was last saved to and its size.  The file is `None` while the
+    entry may have unsaved changes, i.e. after it was used by a task.  The
+    saved `Entry` object is also stored: if `Catalog.entries` holds a
+    different object under the same name (e.g. reloaded while merging), the
+    entry is not considered unchanged.  Finally, a digest of the contents of
+    the entry is stored when it is saved, so that changes made without going
+    through `Catalog.add_entry` (e.g. directly to `Catalog.entries[name]`)
+    are also detected.
+
+    Arguments
+    ---------
+    max_mb : float
+        Budget, in megabytes of saved entry files.  Zero disables the cache.
+    track : bool
+        Record the order in which entries are used even if the cache is
+        disabled (e.g. for `Catalog.relieve_memory`).
+
+    """
+
+    def __init__(self, max_mb=0.0, track=False):
+        self.max_size = int(max_mb * 1024 * 1024)
+        self.track = track
+        self._files = OrderedDict()
+        self._sizes = {}
+        self._saved = {}
+        self._digests = {}
+        self._total = 0
+        return
+
+    def __contains__(self, name):
+        return name in self._files
+
+    def __len__(self):
+        return len(self._files)
+
+    @property
+    def enabled(self):
+        return self.max_size > 0
+
+    @property
+    def tracking(self):
+        """Whether the order in which entries are used is recorded."""
+        return self.enabled or self.track
+
+    @property
+    def total_size(self):
+        """Total size [bytes] of the saved files of the kept entries."""
+        return self._total
+
+    def names(self):
+        """Names of the tracked entries, least recently used first."""
+        return list(self._files.keys())
+
+    def is_clean(self, name, entry):
+        """Whether `entry` is unchanged since it was last saved as `name`."""
+        return (self._files.get(name) is not None and
+                self._saved.get(name) is entry and
+                self._digests.get(name) == _digest(entry))
+
+    def touch(self, name, entry):
+        """Mark entry `name` as most recently used, and as changed.
+
+        Returns
+        -------
+        filename : str or `None`
+            The file the entry was saved to, if it was unchanged since; i.e.
+            `None` unless this is the first use since the entry was saved.
+
+        """
+        clean = self.is_clean(name, entry)
+        filename = self._files.pop(name, None)
+        self._files[name] = None
+        return filename if clean else None
+
+    def store(self, name, entry, filename):
+        """Record that `entry` has been saved, as `name`, to `filename`.
+
+        The order of use is not changed (new entries are most recent).
+        """
+        self._files[name] = filename
+        self._saved[name] = entry
+        self._digests[name] = _digest(entry)
+        size = os.path.getsize(filename)
+        self._total += size - self._sizes.get(name, 0)
+        self._sizes[name] = size
+        return
+
+    def discard(self, name):
+        """Stop tracking entry `name`."""
+        self._files.pop(name, None)
+        self._saved.pop(name, None)
+        self._digests.pop(name, None)
+        self._total -= self._sizes.pop(name, 0)
+        return
+
+    def evict(self, keep=None):
+        """Remove least recently used entries until within the budget.
+
+        Arguments
+        ---------
+        keep : container or `None`
+            If given, entries whose names are not in `keep` (e.g. those
+            which have been merged or deleted) are removed first.
+
+        Returns
+        -------
+        names : list of str
+            Names of the removed entries, which should be made into stubs.
+
+        """
+        names = []
+        if keep is not None:
+            for name in list(self._files.keys()):
+                if name not in keep:
+                    self.discard(name)
+        for name in list(self._files.keys()):
+            if self._total <= self.max_size:
+                break
+            self.discard(name)
+            names.append(name)
+        return names
+
+
+def _digest(entry):
+    """Digest of the contents of `entry`, to detect changes to it."""
+    text = json.dumps(entry, ensure_ascii=False, default=_json_default)
+    return hashlib.md5(text.encode('utf-8')).digest()
+
+
+def _json_default(obj):
+    """Contents of objects which are not json types (for `_digest`).
+
+    The rows of `SpectrumData` (which can be edited in place) are included;
+    other objects are represented by their `repr`.
+    """
+    if isinstance(obj, SpectrumData):
+        return obj.to_list()
+    return repr(obj)
@@ -4,23 +4,34 @@ import os
 import subprocess
 from glob import glob
 
-import git
+# NOTE: `git` (GitPython) is slow to import, and `get_sha_cached` is used at
+#       startup; it is imported by the functions which need it.
 
+# SHAs found by `get_sha_cached`, keyed by (path, short)
+_SHA_CACHE = {}
 
-class MyProgressPrinter(git.RemoteProgress):
-    def update(self, op_code, cur_count, max_count=None, message=''):
-        # print(op_code, cur_count, max_count, message, end="\r")
-        msg = "{} - {}".format(op_code, cur_count)
-        if max_count is not None:
-            msg += "/{}".format(max_count)
-        if len(msg):
-            msg += " - {}".format(message)
-        print(msg + "\r")
+
+def _progress_printer():
+    """Construct a `git.RemoteProgress` which prints the progress."""
+    import git
+
+    class MyProgressPrinter(git.RemoteProgress):
+        def update(self, op_code, cur_count, max_count=None, message=''):
+            # print(op_code, cur_count, max_count, message, end="\r")
+            msg = "{} - {}".format(op_code, cur_count)
+            if max_count is not None:
+                msg += "/{}".format(max_count)
+            if len(msg):
+                msg += " - {}".format(message)
+            print(msg + "\r")
+
+    return MyProgressPrinter()
 
 
 def fetch(repo_name, progress=True, log=None):
+    import git
     repo = git.Repo(repo_name)
-    _progress = MyProgressPrinter() if progress else None
+    _progress = _progress_printer() if progress else None
     for fetch_info in repo.remote().fetch(progress=_progress):
         if log is not None:
             log.debug("Updated {}:{} to {}".format(repo_name, fetch_info.ref,
@@ -56,6 +67,76 @@ def get_sha(path=None, log=None, short=False, timeout=None):
     return sha
 
 
+def get_sha_cached(path=None, log=None, short=False):
+    """Get the SHA of the repository in `path`, only looking it up once.
+
+    The SHA is read directly from the '.git' directory (see `_read_sha`),
+    falling back to `get_sha` (i.e. a `git` subprocess) if that fails.  The
+    result is stored for the rest of the process, so this should only be
+    used for version information: use `get_sha` for repositories that may
+    change (e.g. when pulling or committing).
+    """
+    if path is None:
+        path = os.curdir
+    key = (os.path.abspath(path), short)
+    if key in _SHA_CACHE:
+        return _SHA_CACHE[key]
+
+    sha = _read_sha(key[0])
+    if sha is None:
+        sha = get_sha(path=path, log=log, short=short)
+    elif short:
+        sha = sha[:7]
+    elif log is not None:
+        log.debug("Read SHA '{}' in '{}'".format(sha, key[0]))
+
+    _SHA_CACHE[key] = sha
+    return sha
+
+
+def _read_sha(path):
+    """Read the SHA of `HEAD` from the '.git' directory in `path`.
+
+    Handles a detached `HEAD`, and references stored either as loose files
+    or in 'packed-refs'.  Returns `None` if the SHA cannot be determined
+    this way (e.g. if '.git' is a file, as in worktrees and submodules).
+    """
+    git_dir = os.path.join(path, '.git')
+    try:
+        with open(os.path.join(git_dir, 'HEAD'), 'r') as head_file:
+            head = head_file.read().strip()
+    except (IOError, OSError):
+        return None
+
+    sha = head
+    if head.startswith('ref:'):
+        ref = head[len('ref:'):].strip()
+        sha = None
+        try:
+            with open(os.path.join(git_dir, *ref.split('/')), 'r') as ref_file:
+                sha = ref_file.read().strip()
+        except (IOError, OSError):
+            # Look for the reference in the 'packed-refs' file instead
+            # Each line is either a comment ('#'), a peeled tag ('^'), or
+            # '<SHA> <reference>'
+            try:
+                with open(os.path.join(git_dir, 'packed-refs'), 'r') as pf:
+                    for line in pf:
+                        if line.startswith(('#', '^')):
+                            continue
+                        fields = line.split()
+                        if len(fields) == 2 and fields[1] == ref:
+                            sha = fields[0]
+                            break
+            except (IOError, OSError):
+                return None
+
+    if (sha is None or len(sha) != 40 or
+            any(cc not in '0123456789abcdef' for cc in sha)):
+        return None
+    return sha
+
+
 def git_add_commit_push_all_repos(cat):
     """Add all files in each data repository tree, commit, push.
 
@@ -122,6 +203,7 @@ def git_pull_all_repos(cat, strategy_recursive=True, strategy='theirs'):
 
     > `git pull -s recursive -X theirs`
     """
+    import git
     # raise RuntimeError("THIS DOESNT WORK YET!")
     log = cat.log
     log.debug("gitter.git_pull_all_repos()")
@@ -173,6 +255,7 @@ def git_pull_all_repos(cat, strategy_recursive=True, strategy='theirs'):
 def git_clone_all_repos(cat):
     """Perform a 'git clone' for each data repository that doesnt exist.
     """
+    import git
     log = cat.log
     log.debug("gitter.git_clone_all_repos()")
 
@@ -208,6 +291,7 @@ def git_clone_all_repos(cat):
 def git_reset_all_repos(cat, hard=True, origin=False, clean=True):
     """Perform a 'git reset' in each data repository.
     """
+    import git
     log = cat.log
     log.debug("gitter.git_reset_all_repos()")
 
@@ -287,6 +371,7 @@ def clone(repo, log, depth=1):
         *Absolute* path specification of each target repository.
 
     """
+    import git
     kwargs = {}
     if depth > 0:
         kwargs['depth'] = depth
@@ -0,0 +1,119 @@
+"""Keep the memory use of a catalog import within a budget.
+"""
+import os
+import sys
+
+import psutil
+
+__all__ = ['MemoryGovernor']
+
+
+class MemoryGovernor(object):
+    """Decide when a catalog should free memory, based on its memory use.
+
+    Python rarely returns freed memory to the operating system, so the
+    resident set size (RSS) of the process does not decrease when entries
+    are converted to stubs; the freed memory is instead reused for the next
+    entries loaded.  The memory in use is therefore estimated from the
+    number of blocks allocated by Python (`sys.getallocatedblocks`), scaled
+    to match the RSS the last time that number reached a new maximum, i.e.
+    when any freed memory had been reused.  Where that number is not
+    available (python 2), the RSS itself is used.
+
+    The memory use is only measured every `interval` calls to `check` (or
+    when forced), as that is called for every entry added to the catalog.
+    Once it exceeds `max_mb`, `check` returns `True`, and the catalog should
+    convert entries to stubs until `relieved` (the memory use is below
+    `target` times the budget).
+
+    If the catalog cannot get below the budget (e.g. when only stubs are
+    left), `give_up` should be called: `check` will then only return `True`
+    again once the memory use has grown by a further `regrow` fraction,
+    instead of on every check.
+
+    Arguments
+    ---------
+    log : `logging.Logger` object
+    max_mb : float or `None`
+        Budget for the memory use of this process, in megabytes.  `None` or
+        zero disables the governor.
+    interval : int
+        Number of calls to `check` between measurements.
+    target : float
+        Fraction of `max_mb` to get below when freeing memory.
+    regrow : float
+        Fractional growth of the memory use, after `give_up`, before freeing
+        memory is attempted again.
+
+    """
+
+    def __init__(self, log, max_mb=None, interval=10, target=0.8,
+                 regrow=0.1):
+        self.log = log
+        self.max_mb = max_mb
+        self.interval = interval
+        self.target = target
+        self.regrow = regrow
+        self._calls = 0
+        self._limit_mb = max_mb
+        if self.enabled:
+            self._base_rss = self.rss()
+            self._base_blocks = _allocated_blocks()
+            self._peak_rss = self._base_rss
+            self._peak_blocks = self._base_blocks
+        return
+
+    @property
+    def enabled(self):
+        return bool(self.max_mb)
+
+    def rss(self):
+        """Current resident set size of this process, in megabytes."""
+        return psutil.Process(os.getpid()).memory_info().rss / 1024. / 1024.
+
+    def used(self):
+        """Estimated memory in use by this process, in megabytes."""
+        rss = self.rss()
+        blocks = _allocated_blocks()
+        if blocks is None:
+            return rss
+        if blocks >= self._peak_blocks:
+            self._peak_rss = rss
+            self._peak_blocks = blocks
+            return rss
+
+        num = self._peak_blocks - self._base_blocks
+        if num <= 0:
+            return rss
+        mb_per_block = (self._peak_rss - self._base_rss) / num
+        return self._base_rss + (blocks - self._base_blocks) * mb_per_block
+
+    def check(self, force=False):
+        """Whether memory should be freed now."""
+        if not self.enabled:
+            return False
+        self._calls += 1
+        if not force and self._calls % self.interval:
+            return False
+        return self.used() > self._limit_mb
+
+    def relieved(self):
+        """Whether enough memory has been freed."""
+        used = self.used()
+        if used <= self.max_mb:
+            self._limit_mb = self.max_mb
+        return used <= self.target * self.max_mb
+
+    def give_up(self):
+        """Stop trying to free memory until the memory use grows further."""
+        self._limit_mb = max(self.max_mb, self.used() * (1.0 + self.regrow))
+        return
+
+
+def _allocated_blocks():
+    """Number of memory blocks allocated by Python, or `None` if unknown."""
+    # NOTE: `sys.getallocatedblocks` is only available in python 3.4+
+    getallocatedblocks = getattr(sys, 'getallocatedblocks', None)
+    if getallocatedblocks is None:
+        return None
+    return getallocatedblocks()
@@ -1,8 +1,7 @@
 """
 """
 from astrocats.catalog.utils import is_number
-
-from past.builtins import basestring
+from six import string_types
 
 
 class KeyCollection(object):
@@ -251,10 +250,10 @@ class Key(str):
         elif self.type == KEY_TYPES.STRING:
             # If its a list, check first element
             if is_list:
-                if not isinstance(val[0], basestring):
+                if not isinstance(val[0], string_types):
                     return False
             # Otherwise, check it
-            elif not isinstance(val, basestring):
+            elif not isinstance(val, string_types):
                 return False
         elif self.type == KEY_TYPES.BOOL:
             if is_list and not isinstance(val[0], bool):
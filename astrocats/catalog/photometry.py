@@ -1,13 +1,12 @@
 """Class for representing photometric data."""
 from collections import OrderedDict
 from decimal import Decimal, localcontext
-from random import seed, shuffle
+from random import Random
 
 from astrocats.catalog.catdict import CatDict, CatDictError
 from astrocats.catalog.key import KEY_TYPES, Key, KeyCollection
 from astrocats.catalog.utils import get_sig_digits, listify
-from astropy.time import Time as astrotime
-from palettable import colorbrewer, cubehelix, wesanderson
+from six import string_types
 
 DEFAULT_UL_SIGMA = 5.0
 DEFAULT_ZP = 30.0
@@ -140,6 +139,7 @@ class Photometry(CatDict):
             if (any(x in timestr for x in ['-', '/'])
                     and not timestr.startswith('-')):
                 timestrs[ti] = timestr.replace('/', '-')
+                from astropy.time import Time as astrotime
                 try:
                     timestrs[ti] = str(
                         astrotime(timestrs[ti], format='isot').mjd)
@@ -327,25 +327,49 @@ INSTRUMENT_REPS = {
     'Astrometric': 'Gaia-photometric'
 }
 
-seed(101)
-# bandcolors = ["#%06x" % round(float(x)/float(len(BAND_CODES))*0xFFFEFF)
-# for x in range(len(BAND_CODES))]
-bandcolors = (cubehelix.cubehelix1_16.hex_colors[2:13] +
-              cubehelix.cubehelix2_16.hex_colors[2:13] +
-              cubehelix.cubehelix3_16.hex_colors[2:13])
-shuffle(bandcolors)
-bandcolors2 = cubehelix.perceptual_rainbow_16.hex_colors
-shuffle(bandcolors2)
-bandcolors = bandcolors + bandcolors2
-bandcolordict = dict(list(zip(BAND_CODES, bandcolors)))
+_COLOR_DICTS = None
 
-radiocolors = wesanderson.Zissou_5.hex_colors
-shuffle(radiocolors)
-radiocolordict = dict(list(zip(RADIO_CODES, radiocolors)))
 
-xraycolors = colorbrewer.sequential.Oranges_9.hex_colors[2:]
-shuffle(xraycolors)
-xraycolordict = dict(list(zip(XRAY_CODES, xraycolors)))
+def color_dicts():
+    """Construct (once) the dictionaries of band, radio and x-ray colors.
+
+    `palettable` is slow to import, so it is only imported here.  Returns a
+    dictionary of the color lists and dictionaries which used to be module
+    attributes: 'bandcolors', 'bandcolordict', 'radiocolors',
+    'radiocolordict', 'xraycolors' and 'xraycolordict'.
+    """
+    global _COLOR_DICTS
+    if _COLOR_DICTS is not None:
+        return _COLOR_DICTS
+
+    from palettable import colorbrewer, cubehelix, wesanderson
+
+    rng = Random(101)
+    # bandcolors = ["#%06x" % round(float(x)/float(len(BAND_CODES))*0xFFFEFF)
+    # for x in range(len(BAND_CODES))]
+    bandcolors = (cubehelix.cubehelix1_16.hex_colors[2:13] +
+                  cubehelix.cubehelix2_16.hex_colors[2:13] +
+                  cubehelix.cubehelix3_16.hex_colors[2:13])
+    rng.shuffle(bandcolors)
+    bandcolors2 = cubehelix.perceptual_rainbow_16.hex_colors
+    rng.shuffle(bandcolors2)
+    bandcolors = bandcolors + bandcolors2
+    bandcolordict = dict(list(zip(BAND_CODES, bandcolors)))
+
+    radiocolors = wesanderson.Zissou_5.hex_colors
+    rng.shuffle(radiocolors)
+    radiocolordict = dict(list(zip(RADIO_CODES, radiocolors)))
+
+    xraycolors = colorbrewer.sequential.Oranges_9.hex_colors[2:]
+    rng.shuffle(xraycolors)
+    xraycolordict = dict(list(zip(XRAY_CODES, xraycolors)))
+
+    _COLOR_DICTS = {
+        'bandcolors': bandcolors, 'bandcolordict': bandcolordict,
+        'radiocolors': radiocolors, 'radiocolordict': radiocolordict,
+        'xraycolors': xraycolors, 'xraycolordict': xraycolordict
+    }
+    return _COLOR_DICTS
 
 
 def bandrepf(code):
@@ -357,6 +381,7 @@ def bandrepf(code):
 
 def bandcolorf(code):
     newcode = bandrepf(code)
+    bandcolordict = color_dicts()['bandcolordict']
     if newcode in bandcolordict:
         return bandcolordict[newcode]
     return 'black'
@@ -370,12 +395,14 @@ def instrumentrepf(code):
 
 
 def radiocolorf(code):
+    radiocolordict = color_dicts()['radiocolordict']
     if code in radiocolordict:
         return radiocolordict[code]
     return 'black'
 
 
 def xraycolorf(code):
+    xraycolordict = color_dicts()['xraycolordict']
     if code in xraycolordict:
         return xraycolordict[code]
     return 'black'
@@ -498,3 +525,181 @@ def set_pd_mag_from_flux_density(photodict,
                 (dfd + duefd).log10() - dfd.log10()))
             photodict[PHOTOMETRY.E_LOWER_MAGNITUDE] = str(D25 * (
                 dfd.log10() - (dfd - dlefd).log10()))
+
+
+def set_pd_mags_from_counts(photodicts,
+                            c='',
+                            ec='',
+                            lec='',
+                            uec='',
+                            zp=DEFAULT_ZP,
+                            sig=DEFAULT_UL_SIGMA):
+    """Set photometry dictionaries from counts measurements, in a batch.
+
+    The results are identical to those of `set_pd_mag_from_counts` for each
+    dictionary in `photodicts`, with the corresponding elements of `c`, `ec`,
+    `lec`, `uec`, `zp` and `sig`; each of which is either a sequence of the
+    same length as `photodicts`, or a single value used for all.  The
+    magnitudes are computed together with a `DecimalArray`, and only the
+    few points where that is not certain to be exact are computed with
+    `decimal.Decimal`.
+    """
+    from astrocats.catalog.utils.decimals import DecimalArray
+
+    num = len(photodicts)
+    c, ec, lec, uec, zp, sig = [
+        _batch_values(vals, num) for vals in [c, ec, lec, uec, zp, sig]
+    ]
+    for ii in range(num):
+        if lec[ii] == '' or uec[ii] == '':
+            lec[ii] = ec[ii]
+            uec[ii] = ec[ii]
+    prec = [
+        max(get_sig_digits(str(cc), strip_zeroes=False),
+            get_sig_digits(str(ll), strip_zeroes=False),
+            get_sig_digits(str(uu), strip_zeroes=False)) + 1
+        for cc, ll, uu in zip(c, lec, uec)
+    ]
+    upper = [_upper_limit(cc, ss, uu) for cc, ss, uu in zip(c, sig, uec)]
+
+    def _decimals(vals):
+        return DecimalArray.from_strings([str(vv) for vv in vals], prec)
+
+    dc, dlec, duec, dzp, dsig = [
+        _decimals(vals) for vals in [c, lec, uec, zp, sig]
+    ]
+    d25 = _decimals(['2.5'] * num)
+
+    # Detections
+    logc = dc.log10()
+    mag = dzp - d25 * logc
+    e_upper = d25 * ((dc + duec).log10() - logc)
+    e_lower = d25 * (logc - (dc - dlec).log10())
+    # Upper limits; multiplying by 0.4 gives the value of a division by 2.5
+    ul_mag = dzp - d25 * (dsig * duec).log10()
+    dnec = ((dzp - ul_mag) * _decimals(['0.4'] * num)).pow10()
+    ul_e_upper = d25 * ((dnec + duec).log10() - dnec.log10())
+
+    bad = [
+        True if upper[ii] is None else
+        ul_mag.bad[ii] or ul_e_upper.bad[ii] if upper[ii] else
+        mag.bad[ii] or e_upper.bad[ii] or e_lower.bad[ii]
+        for ii in range(num)
+    ]
+    mag, e_upper, e_lower, ul_mag, ul_e_upper = [
+        vals.to_strings() for vals in [mag, e_upper, e_lower, ul_mag,
+                                       ul_e_upper]
+    ]
+    for ii, photodict in enumerate(photodicts):
+        if bad[ii]:
+            set_pd_mag_from_counts(
+                photodict, c[ii], ec=ec[ii], lec=lec[ii], uec=uec[ii],
+                zp=zp[ii], sig=sig[ii])
+            continue
+        photodict[PHOTOMETRY.ZERO_POINT] = str(zp[ii])
+        if upper[ii]:
+            photodict[PHOTOMETRY.UPPER_LIMIT] = True
+            photodict[PHOTOMETRY.UPPER_LIMIT_SIGMA] = str(sig[ii])
+            photodict[PHOTOMETRY.MAGNITUDE] = ul_mag[ii]
+            photodict[PHOTOMETRY.E_UPPER_MAGNITUDE] = ul_e_upper[ii]
+        else:
+            photodict[PHOTOMETRY.MAGNITUDE] = mag[ii]
+            photodict[PHOTOMETRY.E_UPPER_MAGNITUDE] = e_upper[ii]
+            photodict[PHOTOMETRY.E_LOWER_MAGNITUDE] = e_lower[ii]
+    return
+
+
+def set_pd_mags_from_flux_densities(photodicts,
+                                    fd='',
+                                    efd='',
+                                    lefd='',
+                                    uefd='',
+                                    sig=DEFAULT_UL_SIGMA):
+    """Set photometry dictionaries from flux densities, in a batch.
+
+    The results are identical to those of `set_pd_mag_from_flux_density`
+    for each dictionary in `photodicts`, with the corresponding elements of
+    `fd`, `efd`, `lefd`, `uefd` and `sig` (see `set_pd_mags_from_counts`).
+    """
+    from astrocats.catalog.utils.decimals import DecimalArray
+
+    num = len(photodicts)
+    fd, efd, lefd, uefd, sig = [
+        _batch_values(vals, num) for vals in [fd, efd, lefd, uefd, sig]
+    ]
+    for ii in range(num):
+        if lefd[ii] == '' or uefd[ii] == '':
+            lefd[ii] = efd[ii]
+            uefd[ii] = efd[ii]
+    prec = [
+        max(get_sig_digits(str(ff), strip_zeroes=False),
+            get_sig_digits(str(ll), strip_zeroes=False),
+            get_sig_digits(str(uu), strip_zeroes=False)) + 1
+        for ff, ll, uu in zip(fd, lefd, uefd)
+    ]
+    upper = [
+        _upper_limit(ff, DEFAULT_UL_SIGMA, uu) for ff, uu in zip(fd, uefd)
+    ]
+
+    def _decimals(vals):
+        return DecimalArray.from_strings([str(vv) for vv in vals], prec)
+
+    dfd, dlefd, duefd, dsig = [
+        _decimals(vals) for vals in [fd, lefd, uefd, sig]
+    ]
+    d25 = _decimals(['2.5'] * num)
+    d239 = _decimals(['23.9'] * num)
+
+    logfd = dfd.log10()
+    mag = d239 - d25 * logfd
+    e_upper = d25 * ((dfd + duefd).log10() - logfd)
+    e_lower = d25 * (logfd - (dfd - dlefd).log10())
+    ul_mag = d239 - d25 * (dsig * duefd).log10()
+
+    bad = [
+        True if upper[ii] is None else
+        ul_mag.bad[ii] or bool(fd[ii]) and e_upper.bad[ii] if upper[ii] else
+        mag.bad[ii] or e_upper.bad[ii] or e_lower.bad[ii]
+        for ii in range(num)
+    ]
+    mag, e_upper, e_lower, ul_mag = [
+        vals.to_strings() for vals in [mag, e_upper, e_lower, ul_mag]
+    ]
+    for ii, photodict in enumerate(photodicts):
+        if bad[ii]:
+            set_pd_mag_from_flux_density(
+                photodict, fd[ii], efd=efd[ii], lefd=lefd[ii], uefd=uefd[ii],
+                sig=sig[ii])
+            continue
+        if upper[ii]:
+            photodict[PHOTOMETRY.UPPER_LIMIT] = True
+            photodict[PHOTOMETRY.UPPER_LIMIT_SIGMA] = str(sig[ii])
+            photodict[PHOTOMETRY.MAGNITUDE] = ul_mag[ii]
+            if fd[ii]:
+                photodict[PHOTOMETRY.E_UPPER_MAGNITUDE] = e_upper[ii]
+        else:
+            photodict[PHOTOMETRY.MAGNITUDE] = mag[ii]
+            photodict[PHOTOMETRY.E_UPPER_MAGNITUDE] = e_upper[ii]
+            photodict[PHOTOMETRY.E_LOWER_MAGNITUDE] = e_lower[ii]
+    return
+
+
+def _upper_limit(val, sig, err):
+    """Whether `val` is an upper limit (below `sig` * `err`).
+
+    `None` if any of the values is invalid: those points are computed by the
+    per-point functions, which raise the same errors as for a single point.
+    """
+    try:
+        return val == '' or float(val) < float(sig) * float(err)
+    except (TypeError, ValueError):
+        return None
+
+
+def _batch_values(vals, num):
+    """List of `num` values: `vals` itself, or `vals` repeated if single."""
+    if isinstance(vals, string_types) or not hasattr(vals, '__len__'):
+        return [vals] * num
+    if len(vals) != num:
+        raise ValueError("Expected {} values, got {}".format(num, len(vals)))
+    return list(vals)
@@ -0,0 +1,182 @@
+"""Per-task timing, memory and I/O statistics for catalog imports.
+"""
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import psutil
+
+# `time.process_time` is only available in Python 3.3+
+try:
+    _process_time = time.process_time
+except AttributeError:
+    _process_time = time.clock
+
+__all__ = ['TASK_STATS', 'TaskProfiler']
+
+
+class TASK_STATS:
+    """Names of the statistics recorded for each task."""
+
+    WALL_TIME = 'wall_time'
+    CPU_TIME = 'cpu_time'
+    JOURNAL_TIME = 'journal_time'
+    RSS_START = 'rss_start'
+    RSS_END = 'rss_end'
+    PEAK_RSS_DELTA = 'peak_rss_delta'
+    URL_FETCHES = 'url_fetches'
+    CACHE_HITS = 'cache_hits'
+    ENTRIES_LOADED = 'entries_loaded'
+    ENTRIES_SAVED = 'entries_saved'
+    ENTRY_CACHE_HITS = 'entry_cache_hits'
+    ENTRY_CACHE_MISSES = 'entry_cache_misses'
+    ENTRIES_SPILLED = 'entries_spilled'
+    PROFILE_FILE = 'profile_file'
+
+
+class TaskProfiler(object):
+    """Collect statistics for each task run by `Catalog.import_data`.
+
+    Counters (e.g. URL fetches) can be incremented from anywhere using
+    `count`; they are attributed to the currently running task, and ignored
+    if no task is running.  Memory values are in megabytes, times in seconds.
+
+    Arguments
+    ---------
+    log : `logging.Logger` object
+    outdir : str or `None`
+        Directory in which to save the report and profiling stats.  If `None`,
+        nothing is written.
+    cprofile : bool
+        Run each task under `cProfile`, saving the stats of each to
+        '`outdir`/`task_name`.prof'.
+
+    """
+
+    REPORT_FILENAME = 'import_profile.json'
+
+    def __init__(self, log, outdir=None, cprofile=False):
+        self.log = log
+        self.outdir = outdir
+        self.cprofile = cprofile
+        self.tasks = OrderedDict()
+        self._current = None
+        self._beg_wall = None
+        self._beg_cpu = None
+        self._beg_peak = None
+        return
+
+    def start_task(self, task_name):
+        """Begin recording statistics for the task named `task_name`."""
+        stats = OrderedDict()
+        stats[TASK_STATS.WALL_TIME] = 0.0
+        stats[TASK_STATS.CPU_TIME] = 0.0
+        stats[TASK_STATS.JOURNAL_TIME] = 0.0
+        stats[TASK_STATS.RSS_START] = _get_rss()
+        stats[TASK_STATS.RSS_END] = None
+        stats[TASK_STATS.PEAK_RSS_DELTA] = None
+        stats[TASK_STATS.URL_FETCHES] = 0
+        stats[TASK_STATS.CACHE_HITS] = 0
+        stats[TASK_STATS.ENTRIES_LOADED] = 0
+        stats[TASK_STATS.ENTRIES_SAVED] = 0
+        stats[TASK_STATS.ENTRY_CACHE_HITS] = 0
+        stats[TASK_STATS.ENTRY_CACHE_MISSES] = 0
+        stats[TASK_STATS.ENTRIES_SPILLED] = 0
+        self.tasks[task_name] = stats
+        self._current = stats
+        self._beg_peak = _get_peak_rss()
+        self._beg_cpu = _process_time()
+        self._beg_wall = time.time()
+        return
+
+    def end_task(self):
+        """Finish recording statistics for the current task."""
+        stats = self._current
+        if stats is None:
+            return
+        stats[TASK_STATS.WALL_TIME] = time.time() - self._beg_wall
+        stats[TASK_STATS.CPU_TIME] = _process_time() - self._beg_cpu
+        stats[TASK_STATS.RSS_END] = _get_rss()
+        end_peak = _get_peak_rss()
+        if end_peak is not None and self._beg_peak is not None:
+            stats[TASK_STATS.PEAK_RSS_DELTA] = end_peak - self._beg_peak
+        self._current = None
+        return
+
+    def count(self, key, num=1):
+        """Increment the counter `key` of the current task by `num`."""
+        if self._current is not None:
+            self._current[key] += num
+        return
+
+    @contextmanager
+    def timer(self, key):
+        """Add the time spent within this context to `key` of current task."""
+        beg = time.time()
+        try:
+            yield
+        finally:
+            if self._current is not None:
+                self._current[key] += time.time() - beg
+
+    def run(self, task_name, func, *args, **kwargs):
+        """Call `func`, under `cProfile` if enabled, and return its value."""
+        if not self.cprofile or self.outdir is None:
+            return func(*args, **kwargs)
+
+        import cProfile
+        prof = cProfile.Profile()
+        try:
+            retval = prof.runcall(func, *args, **kwargs)
+        finally:
+            fname = os.path.join(self.outdir, task_name + '.prof')
+            prof.dump_stats(fname)
+            self.log.info("Saved profiling stats to '{}'".format(fname))
+            if self._current is not None:
+                self._current[TASK_STATS.PROFILE_FILE] = fname
+
+        return retval
+
+    def write_report(self, fname=None):
+        """Write the statistics of all tasks to a json file.
+
+        Returns
+        -------
+        fname : str or `None`
+            The filename the report was written to, or `None` if no output
+            directory was given.
+
+        """
+        if fname is None:
+            if self.outdir is None:
+                return None
+            fname = os.path.join(self.outdir, self.REPORT_FILENAME)
+
+        jsonstring = json.dumps(self.tasks, indent='\t',
+                                separators=(',', ':'))
+        with open(fname, 'w') as ff:
+            ff.write(jsonstring)
+        self.log.warning("Wrote task profiling report to '{}'".format(fname))
+        return fname
+
+
+def _get_rss():
+    """Current resident set size of this process, in megabytes."""
+    return psutil.Process(os.getpid()).memory_info().rss / 1024. / 1024.
+
+
+def _get_peak_rss():
+    """Maximum resident set size of this process so far, in megabytes.
+
+    Returns `None` if the `resource` module is unavailable.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Linux returns units in kilobytes; OSX in Bytes
+    unit = 1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / unit
@@ -0,0 +1,142 @@
+"""Split an import between processes, by partitioning the entry names.
+"""
+import multiprocessing
+import os
+import zlib
+from copy import copy
+
+from astrocats.catalog.utils import logger
+
+__all__ = ['Shard', 'can_fork', 'run_shards', 'shard_tasks']
+
+
+class Shard(object):
+    """One of `count` partitions of the entries of a catalog.
+
+    In a sharded import, each shard runs the leading tasks which are declared
+    `shard_safe` (see `shard_tasks`) in its own process, but only loads and
+    saves the entries it owns: those whose file names (see
+    `Entry.get_filename`) hash to its `index`.  The owning shard adds the
+    data of each task to the full entry.  For an entry owned
+    by another shard, only the elements kept by stubs (e.g. aliases) are
+    collected, in a new entry which is converted to a stub (without being
+    saved) when journaled.  The name of an entry is only hashed once it has
+    been matched against the known entries and aliases, so that data added
+    under an alias goes to the entry with that alias where possible.  Entries
+    created under different aliases by different shards are merged by the
+    final tasks (`merge_duplicates`).  Stubs are only loaded for the entries
+    owned, as the files of other shards may be changing.  Once all shards
+    have finished, the remaining tasks are run by a single process, with
+    all entries.
+
+    `zlib.crc32` is used as the hash, as `hash` differs between processes.
+
+    Arguments
+    ---------
+    index : int
+        Index of this shard, from 0 to `count` - 1.
+    count : int
+        Total number of shards.
+
+    """
+
+    def __init__(self, index, count):
+        if count < 1 or not 0 <= index < count:
+            raise ValueError("Invalid shard {} of {}".format(index, count))
+        self.index = index
+        self.count = count
+        return
+
+    def __repr__(self):
+        return "Shard({}, {})".format(self.index, self.count)
+
+    def owns(self, name):
+        """Whether the entry `name` belongs to this shard."""
+        crc = zlib.crc32(name.encode('utf-8')) & 0xffffffff
+        return crc % self.count == self.index
+
+
+def shard_tasks(tasks):
+    """Names of the tasks run by each shard, from the (ordered) dict `tasks`.
+
+    These are the active tasks before the first one which is not declared
+    `shard_safe` (see `Task`), or which is final (with a negative priority).
+    Later tasks may depend on the data added by any task before them, so
+    they are all run by a single process.
+    """
+    names = []
+    for name, task in tasks.items():
+        if not task.active:
+            continue
+        if task.priority < 0 or not task.shard_safe:
+            break
+        names.append(name)
+    return names
+
+
+def _fork_context():
+    """Multiprocessing context which forks new processes (`None` if none).
+    """
+    try:
+        return multiprocessing.get_context('fork')
+    except AttributeError:
+        # python 2 always forks, except on Windows
+        return multiprocessing if os.name == 'posix' else None
+    except ValueError:
+        return None
+
+
+def can_fork():
+    """Whether shards can be run by `run_shards` on this platform."""
+    return _fork_context() is not None
+
+
+def run_shards(catalog):
+    """Run the import of `catalog` in one process for each shard.
+
+    Each process creates a new catalog, of the same type as `catalog`, with
+    `args.shard` set to its index, and runs `import_data`.  Returns once all
+    processes have finished.
+
+    The processes are forked (see `can_fork`), whatever the default start
+    method: they inherit the catalog class, arguments and logger (with its
+    handlers) of this process, which could otherwise not be passed to them.
+    """
+    context = _fork_context()
+    if context is None:
+        raise RuntimeError("Sharded imports need `fork`, which is not "
+                           "available on this platform.")
+    log = catalog.log
+    # Pending records should not be written by every process
+    logger.flush_logger(log)
+
+    procs = []
+    for index in range(catalog.args.shards):
+        args = copy(catalog.args)
+        args.shard = index
+        proc = context.Process(
+            target=_run_shard,
+            args=(type(catalog), args, log),
+            name='shard-{}'.format(index))
+        proc.start()
+        procs.append(proc)
+    log.warning("Started {} import processes".format(len(procs)))
+
+    for proc in procs:
+        proc.join()
+    failed = [proc.name for proc in procs if proc.exitcode != 0]
+    if len(failed):
+        err_str = "Import failed in: {}".format(', '.join(failed))
+        logger.log_raise(log, err_str)
+
+    log.warning("All {} import processes finished".format(len(procs)))
+    return
+
+
+def _run_shard(catalog_class, args, log):
+    """Import the entries of shard `args.shard`, in a new process."""
+    logger.restart_listener(log)
+    catalog = catalog_class(args, log)
+    catalog.import_data()
+    logger.flush_logger(log)
+    return
@@ -1,7 +1,16 @@
 """Class for representing spectra."""
+from itertools import chain
+
+try:
+    from collections.abc import MutableSequence
+except ImportError:
+    # python 2
+    from collections import MutableSequence
+
 from astrocats.catalog.catdict import CatDict
 from astrocats.catalog.key import KEY_TYPES, Key, KeyCollection
 from astrocats.catalog.utils import trim_str_arr
+from six import string_types
 
 
 class SPECTRUM(KeyCollection):
@@ -47,11 +56,212 @@ class SPECTRUM(KeyCollection):
                              compare=False)
 
 
+def _all_strings(values):
+    """Whether all of `values` are strings."""
+    return all(issubclass(tt, string_types) for tt in set(map(type, values)))
+
+
+class SpectrumData(MutableSequence):
+    """The `data` of a spectrum, stored compactly.
+
+    The rows of a spectrum (wavelength, flux and optionally error) are
+    normally lists of strings, which take several times the memory of the
+    characters themselves.  Here the values are stored in a single string
+    (row by row, separated by newlines), so that they are written out
+    exactly as given, and rows are only split off (once, and then kept) as
+    they are accessed: as the leading rows are often the only ones used
+    (e.g. by `Spectrum.is_duplicate_of`), the rest of the text is only split
+    when needed.  Otherwise this behaves as the list of rows (lists of
+    `str`): rows can be edited in place, and rows assigned, deleted or
+    inserted (which splits all of the rows).  `to_list` returns a copy of
+    the whole list (e.g. to be saved as json), without splitting the rows
+    which are still stored as text.  The numeric values of each column are
+    returned as NumPy arrays by `column` (or `wavelengths`, `fluxes` and
+    `errors`).
+
+    Use `from_rows` or `from_columns` to create one, which return the given
+    data unchanged if it cannot be stored this way.
+
+    Arguments
+    ---------
+    text : str
+        All values, separated by newlines.
+    num_cols : int
+        Number of values in each row.
+
+    """
+
+    _SEP = '\n'
+    # Minimum number of rows split off at a time
+    _HEAD_ROWS = 16
+
+    def __init__(self, text, num_cols):
+        self.num_cols = num_cols
+        # Rows split off so far, and the text (and number) of the others
+        self._head = []
+        self._text = text
+        self._num_rest = (text.count(self._SEP) + 1) // num_cols
+        return
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Create from a list of rows (each a list of strings).
+
+        `rows` itself is returned if it is not a non-empty list of
+        (non-empty) rows of equal length, which only contain strings without
+        newlines.
+        """
+        if isinstance(rows, cls):
+            return rows
+        if not isinstance(rows, list) or not rows:
+            return rows
+        # Check the types with `map` over all values, as it is much faster
+        lens = set(map(len, rows)) if set(map(type, rows)) == {list} else ()
+        if (len(lens) != 1 or not rows[0] or
+                not _all_strings(chain.from_iterable(rows))):
+            return rows
+        data = cls._from_values(chain.from_iterable(rows), len(rows[0]))
+        return rows if data is None else data
+
+    @classmethod
+    def from_columns(cls, columns):
+        """Create from a list of columns (each a list of strings).
+
+        If the columns cannot be stored as a `SpectrumData` (see
+        `from_rows`), a list of rows is returned instead.
+        """
+        if (len(set(map(len, columns))) == 1 and len(columns[0]) and
+                _all_strings(chain.from_iterable(columns))):
+            data = cls._from_values(
+                chain.from_iterable(zip(*columns)), len(columns))
+            if data is not None:
+                return data
+        return cls.from_rows([list(row) for row in zip(*columns)])
+
+    @classmethod
+    def _from_values(cls, values, num_cols):
+        """Create from all `values`, `None` if any contain a newline."""
+        values = list(values)
+        text = cls._SEP.join(values)
+        if text.count(cls._SEP) != len(values) - 1:
+            return None
+        return cls(text, num_cols)
+
+    def __len__(self):
+        return len(self._head) + self._num_rest
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step < 0:
+                self._split(len(self))
+                return self._head[index]
+            self._split(stop)
+            return self._head[start:stop:step]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("Row {} out of range".format(index))
+        self._split(index + 1)
+        return self._head[index]
+
+    def __setitem__(self, index, value):
+        self._split(len(self))
+        self._head[index] = value
+
+    def __delitem__(self, index):
+        self._split(len(self))
+        del self._head[index]
+
+    def insert(self, index, value):
+        self._split(len(self))
+        self._head.insert(index, value)
+
+    def __iter__(self):
+        index = 0
+        while index < len(self):
+            self._split(index + 1)
+            yield self._head[index]
+            index += 1
+
+    def __eq__(self, other):
+        if isinstance(other, SpectrumData):
+            other = other.to_list()
+        return self.to_list() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return "{}({} rows)".format(type(self).__name__, len(self))
+
+    def _split(self, stop):
+        """Split off the rows of the text, until there are `stop` rows.
+
+        At least as many rows as have been split so far are split off, so
+        that the rest of the text is only copied a few times.
+        """
+        if stop <= len(self._head) or not self._num_rest:
+            return
+        num = min(max(stop - len(self._head), len(self._head),
+                      self._HEAD_ROWS), self._num_rest)
+        if num == self._num_rest:
+            values = self._text.split(self._SEP)
+            self._text = None
+        else:
+            values = self._text.split(self._SEP, num * self.num_cols)
+            self._text = values.pop()
+        values = iter(values)
+        self._head.extend(
+            list(row) for row in zip(*[values] * self.num_cols))
+        self._num_rest -= num
+        return
+
+    def _rest_values(self):
+        """The values of the rows which have not been split off yet."""
+        if self._text is None:
+            return []
+        return self._text.split(self._SEP)
+
+    def to_list(self):
+        """A copy of the data, as a list of rows (lists of strings)."""
+        values = iter(self._rest_values())
+        return ([list(row) for row in self._head] +
+                [list(row) for row in zip(*[values] * self.num_cols)])
+
+    def column(self, index):
+        """NumPy array of the (float) values in column `index`."""
+        import numpy as np
+        values = [row[index] for row in self._head]
+        values += self._rest_values()[index::self.num_cols]
+        return np.array(values, dtype=float)
+
+    @property
+    def wavelengths(self):
+        return self.column(0)
+
+    @property
+    def fluxes(self):
+        return self.column(1)
+
+    @property
+    def errors(self):
+        """Array of the errors, `None` if there is no error column."""
+        if self.num_cols < 3:
+            return None
+        return self.column(2)
+
+
 class Spectrum(CatDict):
     """Class for storing a single spectrum."""
 
     _KEYS = SPECTRUM
 
+    # Number of leading rows compared by `is_duplicate_of`
+    _DUPE_ROWS = 11
+    # Number of those rows which must match for a duplicate
+    _DUPE_MATCHES = 5
+
     def __init__(self, parent, **kwargs):
         """Initialize spectrum."""
         self._REQ_KEY_SETS = [
@@ -69,7 +279,9 @@ class Spectrum(CatDict):
         # If `data` is not given, construct it from wavelengths, fluxes
         # [errors] `errors` is optional, but if given, then `errorunit` is also
         # req'd
-        if SPECTRUM.DATA not in self:
+        if SPECTRUM.DATA in self:
+            self[SPECTRUM.DATA] = SpectrumData.from_rows(self[SPECTRUM.DATA])
+        else:
             try:
                 wavelengths = self[SPECTRUM.WAVELENGTHS]
                 fluxes = self[SPECTRUM.FLUXES]
@@ -94,7 +306,7 @@ class Spectrum(CatDict):
             else:
                 data = [trim_str_arr(wavelengths), trim_str_arr(fluxes)]
 
-            self[SPECTRUM.DATA] = [list(i) for i in zip(*data)]
+            self[SPECTRUM.DATA] = SpectrumData.from_columns(data)
             if SPECTRUM.WAVELENGTHS in self:
                 del self[SPECTRUM.WAVELENGTHS]
             if SPECTRUM.FLUXES in self:
@@ -140,7 +352,7 @@ class Spectrum(CatDict):
         for ri, row in enumerate(self.get(self._KEYS.DATA, [])):
             lambda1, flux1 = tuple(row[0:2])
             if (self._KEYS.DATA not in other or
-                    ri > len(other[self._KEYS.DATA])):
+                    ri >= len(other[self._KEYS.DATA])):
                 break
             lambda2, flux2 = tuple(other[self._KEYS.DATA][ri][0:2])
             minlambdalen = min(len(lambda1), len(lambda2))
@@ -150,13 +362,30 @@ class Spectrum(CatDict):
                     float(flux1[:minfluxlen + 1]) != 0.0):
                 row_matches += 1
             # Five row matches should be enough to be sure spectrum is a dupe.
-            if row_matches >= 5:
+            if row_matches >= self._DUPE_MATCHES:
                 return True
             # Matches need to happen in the first 10 rows.
-            if ri >= 10:
+            if ri >= self._DUPE_ROWS - 1:
                 break
         return False
 
+    def fingerprint(self):
+        """Return the keys under which duplicates of this spectrum are found.
+
+        A spectrum can only be a duplicate of another (see `is_duplicate_of`)
+        if both have the same values of the `compare` keys, or if at least
+        `_DUPE_MATCHES` of their first `_DUPE_ROWS` rows are the same.  The
+        first element of the returned list is the tuple of the `compare`
+        values; each of the others is a row number with its wavelength and
+        flux.
+        """
+        keys = [(type(self), ) + tuple(
+            (key in self, self.get(key)) for key in self._KEYS.compare_vals())]
+        data = self.get(self._KEYS.DATA, [])
+        for ri, row in enumerate(data[:self._DUPE_ROWS]):
+            keys.append((ri, ) + tuple(row[0:2]))
+        return keys
+
     def sort_func(self, key):
         """Logic for sorting keys in a `Spectrum` relative to one another."""
         if key == self._KEYS.TIME:
@@ -166,3 +395,100 @@ class Spectrum(CatDict):
         if key == self._KEYS.SOURCE:
             return 'zzz'
         return key
+
+
+class SpectrumIndex(object):
+    """Lookup of the spectra of an entry by their fingerprints.
+
+    Comparing a new spectrum against every existing one, to find
+    duplicates, is quadratic in the number of spectra.  Instead, the
+    `Spectrum.fingerprint` keys of each spectrum are stored, and `candidates`
+    returns only the spectra sharing the `compare` values or enough rows
+    with the new one, i.e. those which can be duplicates; `is_duplicate_of`
+    then only has to be checked for those.
+
+    The spectra are referred to by their position in `spectra` (the list
+    stored in the entry), and should only be added through `append`, and
+    `update` called if one is changed.  The index is rebuilt if the list
+    has been changed otherwise (as far as can be detected cheaply: a change
+    of its length or last element, or the candidates having moved).
+
+    Arguments
+    ---------
+    spectra : list of `Spectrum`
+
+    """
+
+    def __init__(self, spectra):
+        self.spectra = spectra
+        self._rebuild()
+        return
+
+    def _rebuild(self):
+        self._items = []
+        self._fingerprints = []
+        self._positions = {}
+        for spectrum in self.spectra:
+            self._add(spectrum)
+        return
+
+    def is_current(self):
+        """Whether the index still matches the list of spectra."""
+        return (len(self._items) == len(self.spectra) and
+                (not self._items or self.spectra[-1] is self._items[-1]))
+
+    def append(self, spectrum):
+        """Append `spectrum` to the list of spectra, and index it."""
+        if not self.is_current():
+            self._rebuild()
+        self.spectra.append(spectrum)
+        self._add(spectrum)
+        return
+
+    def update(self, spectrum):
+        """Index `spectrum` again, after its contents were changed."""
+        pos = next(pp for pp, item in enumerate(self._items)
+                   if item is spectrum)
+        self._remove(pos)
+        self._fingerprints[pos] = spectrum.fingerprint()
+        for key in self._fingerprints[pos]:
+            self._positions.setdefault(key, []).append(pos)
+        return
+
+    def candidates(self, spectrum):
+        """Return the spectra that `spectrum` may be a duplicate of, in order.
+        """
+        if not self.is_current():
+            self._rebuild()
+        keys = spectrum.fingerprint()
+        found = set(self._positions.get(keys[0], []))
+        counts = {}
+        for key in keys[1:]:
+            for pos in self._positions.get(key, []):
+                counts[pos] = counts.get(pos, 0) + 1
+        found.update(pos for pos, num in counts.items()
+                     if num >= spectrum._DUPE_MATCHES)
+        items = []
+        for pos in sorted(found):
+            if self.spectra[pos] is not self._items[pos]:
+                # The list has been reordered
+                self._rebuild()
+                return self.candidates(spectrum)
+            items.append(self._items[pos])
+        return items
+
+    def _add(self, spectrum):
+        pos = len(self._items)
+        self._items.append(spectrum)
+        self._fingerprints.append(spectrum.fingerprint())
+        for key in self._fingerprints[pos]:
+            self._positions.setdefault(key, []).append(pos)
+        return
+
+    def _remove(self, pos):
+        for key in self._fingerprints[pos]:
+            positions = self._positions[key]
+            positions.remove(pos)
+            if not positions:
+                del self._positions[key]
+        return
@@ -0,0 +1,103 @@
+"""Compact contents of entry 'stubs'.
+"""
+from functools import partial
+
+from six import get_unbound_function, string_types
+from six.moves import intern
+
+from astrocats.catalog.quantity import Quantity
+from astrocats.catalog.source import SOURCE, Source
+
+__all__ = ['make_stub', 'stub_keys', 'stub_sort_func']
+
+# The fields of sources kept in stubs: those identifying the source (and its
+# alias, referred to by the other elements), and whether it is private
+STUB_SOURCE_KEYS = [SOURCE.NAME, SOURCE.BIBCODE, SOURCE.ARXIVID, SOURCE.DOI,
+                    SOURCE.ALIAS, SOURCE.PRIVATE]
+
+
+def _compact(value):
+    """Intern strings, so that repeated values are only stored once."""
+    if isinstance(value, string_types):
+        # `intern` only accepts `str` (not e.g. `unicode` in python 2)
+        try:
+            return intern(value)
+        except TypeError:
+            return value
+    return value
+
+
+def _compact_item(item, fields=None):
+    """Copy a dict-like element (e.g. `Quantity`) to a plain `dict`.
+
+    Keys and (string) values are interned.  Only the keys in `fields` are
+    kept, if given.  Elements which are not dict-like are returned unchanged.
+    """
+    if not isinstance(item, dict):
+        return _compact(item)
+    return dict((_compact(key), _compact(val)) for key, val in item.items()
+                if fields is None or key in fields)
+
+
+def stub_keys(keys):
+    """The keys (of the `KeyCollection` `keys`) of the elements of a stub.
+    """
+    return [keys.ALIAS, keys.DISTINCT_FROM, keys.RA, keys.DEC,
+            keys.DISCOVER_DATE, keys.SOURCES]
+
+
+def stub_sort_func(keys, key):
+    """Function sorting the keys of the elements of `key` in a stub.
+
+    The elements are sorted as the `Source` (for the sources) or `Quantity`
+    elements of full entries, when saved.
+
+    Arguments
+    ---------
+    keys : `KeyCollection`
+        The keys of the entry (its `_KEYS`).
+    key : str
+        One of the `stub_keys`.
+
+    """
+    cat_dict_class = Source if key == keys.SOURCES else Quantity
+    return partial(get_unbound_function(cat_dict_class.sort_func),
+                   cat_dict_class)
+
+
+def make_stub(proto, catalog, name, data):
+    """Create the stub of entry `name` from its (dict-like) `data`.
+
+    A stub only holds the name of an entry and the few elements needed for
+    cross referencing and duplicate removal (see `stub_keys`).  The stub is
+    an instance of `proto`, with `Entry._stub` set, as any other entry.  Its
+    elements are plain `dict` objects, rather than `CatDict` (or
+    `OrderedDict`) objects, which take about twice the memory, and refer to
+    their parent entry; their keys and values are interned, so that repeated
+    strings (e.g. of sources) are only stored once.  Sources only keep the
+    `STUB_SOURCE_KEYS`.  The keys of elements are sorted when saved, as
+    those of full entries (see `stub_sort_func`), so their order is
+    irrelevant.
+
+    Arguments
+    ---------
+    proto : `astrocats.catalog.entry.Entry` (sub)class
+        The class of the entry which this is a stub of.
+    catalog : `astrocats.catalog.catalog.Catalog` instance
+        The parent catalog object of which this entry belongs.
+    name : str
+        The name of the entry.
+    data : dict-like
+        Either a full `Entry`, or the contents of its json file.
+
+    Returns
+    -------
+    stub : `proto` instance
+
+    """
+    stub = proto(catalog=catalog, name=_compact(name), stub=True)
+    for key in stub_keys(proto._KEYS):
+        if key in data:
+            fields = STUB_SOURCE_KEYS if key == proto._KEYS.SOURCES else None
+            stub[key] = [_compact_item(item, fields) for item in data[key]]
+    return stub
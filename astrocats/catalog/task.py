@@ -32,6 +32,13 @@ class Task():
         Function to execute when carrying out this task.
     priority : int
         Order in which tasks should be executed
+    always_journal : bool
+        Whether entries should always be journaled from this task onwards.
+    shard_safe : bool
+        Whether this task can be run by each shard of a sharded import (see
+        `astrocats.catalog.shard`).  Each shard only holds the entries it
+        owns, so the task must only add data (from its own input) to entries,
+        and never read data back from them, or depend on the other entries.
 
     """
 
@@ -52,6 +59,7 @@ class Task():
         self.function = ''
         self.priority = None
         self.always_journal = False
+        self.shard_safe = False
 
         for key, val in kwargs.items():
             if hasattr(self, key):
@@ -67,11 +75,11 @@ class Task():
     def __repr__(self):
         retval = ("Task(name='{}', nice_name='{}', active='{}', update='{}', "
                   "archived='{}', module='{}', function='{}', repo='{}', "
-                  "priority='{}', always_journal='{}'")
+                  "priority='{}', always_journal='{}', shard_safe='{}'")
         retval = retval.format(self.name, self.nice_name, self.active,
                                self.update, self.archived, self.module,
                                self.function, self.repo, self.priority,
-                               self.always_journal)
+                               self.always_journal, self.shard_safe)
         return retval
 
     def current_task(self, args):
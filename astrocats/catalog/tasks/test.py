@@ -1,11 +1,23 @@
 """
 """
+import json
 import os
-
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import astrocats
 from astrocats.catalog.catalog import ENTRY
+from astrocats.catalog.entrycache import EntryCache
 from astrocats.catalog.source import SOURCE
 from astrocats.catalog.quantity import QUANTITY
-from astrocats.catalog.photometry import PHOTOMETRY, set_pd_mag_from_counts
+from astrocats.catalog.spectrum import SPECTRUM
+from astrocats.catalog.photometry import (
+    PHOTOMETRY, set_pd_mag_from_counts, set_pd_mag_from_flux_density,
+    set_pd_mags_from_counts, set_pd_mags_from_flux_densities)
 from astrocats.catalog.utils import tprint, tq, pbar_strings
 
 FAKE_ALIAS_1 = 'EN-TEST-AA'
@@ -13,6 +25,7 @@ FAKE_ALIAS_2 = 'PS-TEST-AB'
 FAKE_ALIAS_3 = 'PTF-TEST-BA'
 FAKE_ALIAS_4 = 'SN2020abc'
 FAKE_ALIAS_5 = 'AT2016omg'
+FAKE_ALIAS_6 = 'EN-TEST-CACHE'
 
 FAKE_NAME_1 = 'Private et al. 2025'
 FAKE_BIBCODE_1 = '2025Tst...123..456Z'
@@ -26,6 +39,41 @@ FAKE_BIBCODE_3 = '2001PASJ..547..364C'
 FAKE_REDZ_1 = '1.123'
 FAKE_REDZ_2 = '0.987'
 
+FAKE_FLUX_1 = '9.9'
+
+# Slow packages which must not be imported when the command line starts
+SLOW_MODULES = ['astropy', 'git', 'matplotlib', 'palettable', 'seaborn']
+
+# Counts (or flux densities) and errors for comparing the batch and single
+# point photometry conversions: powers of ten and values whose logarithms
+# lie on (or next to) rounding boundaries, zero, negative and empty values,
+# and some with many digits
+PHOT_VALUES = ['1', '10', '100.0', '0.001', '1e5', '2.5', '3.16227766',
+               '3.162277660168379', '31.6227', '39.810717', '1.00001',
+               '9.99999', '12345.678', '0', '0.0', '-10', '-0.5', '']
+PHOT_ERRORS = ['1', '0.1', '2.5', '0', '-1', '0.31622777']
+PHOT_INVALID = [('abc', '1'), ('10', 'x'), ('10', ''), ('inf', '1')]
+
+# Replies of the stub SDSS and SkyView servers for the host image test: the
+# SDSS cutout is a host image, the 'missing' image (outside the footprint),
+# or an error; SkyView lists a DSS image for a position or not
+HOST_SDSS = {'10.0': b'sdss image', '20.0': b'missing', '30.0': b'missing',
+             '40.0': None}
+HOST_SKYVIEW = {'dss': '<img alt="Quicklook RGB image" src="x/dss.jpg">',
+                'none': '<img alt="Other image" src="x/other.jpg">'}
+HOST_DSS = b'dss image'
+# Events, with the arguments of `fetch_host_image`, and the expected sources
+HOST_JOBS = [('A', '10.0', '1.0', 'dss', 'SDSS'),
+             ('B', '20.0', '2.0', 'dss', 'DSS'),
+             ('C', '30.0', '3.0', 'none', 'None'),
+             ('D', '40.0', '4.0', 'dss', 'DSS')]
+
+# Entries added by the shard-safe test task, with an alias each; some data
+# is added under the aliases of other entries
+SHARD_ENTRIES = 40
+SHARD_NAME = 'EN-SHARD-{:03d}'
+SHARD_ALIAS = 'PS-SHARD-{:03d}'
+
 
 def do_test(catalog):
     log = catalog.log
@@ -43,6 +91,22 @@ def do_test(catalog):
 
     test_load_url(catalog)
 
+    # Test that startup does not import slow packages
+    # -----------------------------------------------
+    test_import_time(catalog)
+
+    # Test that batch photometry conversions match the single point ones
+    # -------------------------------------------------------------------
+    test_photometry_batch(catalog)
+
+    # Test fetching host images (by `webcat`) from a local stub server
+    # ----------------------------------------------------------------
+    test_host_images(catalog)
+
+    # Test that edits to entries kept in memory (`--entry-cache-mb`) are saved
+    # -------------------------------------------------------------------------
+    test_entry_cache_edits(catalog)
+
     # Test repo path functions
     # ------------------------
     paths = catalog.PATHS.get_all_repo_folders()
@@ -455,6 +519,260 @@ def test_load_url(catalog):
     return
 
 
+def test_import_time(catalog):
+    """Make sure starting `astrocats.main` does not import slow packages.
+
+    The import (and the version lookup done at startup) is done in a fresh
+    interpreter, as this one has already imported everything.
+    """
+    log = catalog.log
+    log.info("Testing imports of `astrocats.main`.")
+    code = ("import sys, astrocats.main; astrocats.main.get_git(); "
+            "print(' '.join(sys.modules))")
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.path.dirname(
+        os.path.dirname(os.path.abspath(astrocats.__file__)))
+    beg = time.time()
+    modules = subprocess.check_output(
+        [sys.executable, '-c', code], env=env).decode('utf-8').split()
+    log.info("Importing `astrocats.main` took {:.3f} s".format(
+        time.time() - beg))
+    slow = [mod for mod in SLOW_MODULES if mod in modules]
+    if slow:
+        err_str = "Importing `astrocats.main` imported: '{}'".format(
+            "', '".join(slow))
+        log_raise(err_str, log)
+    return
+
+
+def test_photometry_batch(catalog):
+    """Compare the batch photometry conversions with the single point ones.
+
+    The batch functions must give identical results, and raise the same
+    errors for invalid values.
+    """
+    log = catalog.log
+    log.info("Testing batch photometry conversions.")
+    pairs = [(val, err) for val in PHOT_VALUES for err in PHOT_ERRORS]
+    funcs = [(set_pd_mag_from_counts, set_pd_mags_from_counts),
+             (set_pd_mag_from_flux_density, set_pd_mags_from_flux_densities)]
+    for single, batch in funcs:
+        # Valid values, in one batch
+        expected = []
+        valid = []
+        for val, err in pairs:
+            photodict = {}
+            try:
+                single(photodict, val, err)
+            except Exception:
+                continue
+            expected.append(photodict)
+            valid.append((val, err))
+        photodicts = [{} for _ in valid]
+        batch(photodicts, [val for val, err in valid],
+              [err for val, err in valid])
+        for (val, err), exp, res in zip(valid, expected, photodicts):
+            if res != exp:
+                err_str = "`{}('{}', '{}')` gave {}, expected {}".format(
+                    batch.__name__, val, err, res, exp)
+                log_raise(err_str, log)
+
+        # Invalid values
+        for val, err in PHOT_INVALID:
+            errors = []
+            for func, arg in [(single, {}), (batch, [{}])]:
+                try:
+                    func(arg, val, err)
+                except Exception as exc:
+                    errors.append(type(exc))
+                else:
+                    errors.append(None)
+            if errors[0] is None or errors[0] != errors[1]:
+                err_str = ("`{}('{}', '{}')` raised {}, `{}` raised "
+                           "{}").format(batch.__name__, val, err, errors[1],
+                                        single.__name__, errors[0])
+                log_raise(err_str, log)
+    log.info("Compared {} values".format(len(pairs)))
+    return
+
+
+def test_host_images(catalog):
+    """Fetch host images from stub SDSS and SkyView servers.
+
+    `webcat` does not collect host images in test mode, so the downloads
+    (`astrocats.scripts.hostimages`) are checked here, against a local
+    server.  Only run in python 3, as are the scripts.
+    """
+    log = catalog.log
+    if sys.version_info[0] < 3:
+        log.info("Skipping host images test in python 2.")
+        return
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from urllib.parse import parse_qs, urlsplit
+    from astrocats.scripts.hostimages import collect_host_images
+
+    log.info("Testing host image downloads.")
+    # The first request for the first event fails, as `fetch_url` should
+    # try again
+    requested = set()
+
+    class StubHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            query = parse_qs(url.query)
+            if url.path.startswith('/sdss/'):
+                body = HOST_SDSS[query['ra'][0]]
+            elif url.path.startswith('/skyview/current/'):
+                body = HOST_SKYVIEW[query['Position'][0]].encode('utf-8')
+            elif url.path == '/skyview/tempspace/fits/dss.jpg':
+                body = HOST_DSS
+            else:
+                body = None
+            retry = query.get('ra') == [HOST_JOBS[0][1]]
+            if body is None or (retry and self.path not in requested):
+                requested.add(self.path)
+                self.send_error(500)
+                return
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            return
+
+    server = HTTPServer(('127.0.0.1', 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    url = 'http://127.0.0.1:{}/'.format(server.server_address[1])
+    tempdir = tempfile.mkdtemp()
+    try:
+        missingfile = os.path.join(tempdir, 'missing.jpg')
+        with open(missingfile, 'wb') as f:
+            f.write(b'missing')
+        jobs = [(name, ra, dec, position, os.path.join(tempdir, name))
+                for name, ra, dec, position, _ in HOST_JOBS]
+        sources = collect_host_images(
+            jobs, missingfile, threads=2, interval=0.0,
+            sdss_url=url + 'sdss/', skyview_url=url + 'skyview/')
+        images = {'SDSS': HOST_SDSS['10.0'], 'DSS': HOST_DSS}
+        for name, _, _, _, expected in HOST_JOBS:
+            if sources.get(name) != expected:
+                err_str = "Host image of '{}' from '{}', expected '{}'".format(
+                    name, sources.get(name), expected)
+                log_raise(err_str, log)
+            if expected not in images:
+                continue
+            with open(os.path.join(tempdir, name), 'rb') as f:
+                if f.read() != images[expected]:
+                    err_str = "Wrong host image saved for '{}'".format(name)
+                    log_raise(err_str, log)
+        if list(sources) != [job[0] for job in HOST_JOBS]:
+            log_raise("Host image sources not in order of events", log)
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(tempdir)
+    return
+
+
+def test_entry_cache_edits(catalog):
+    """Edit a spectrum row of an entry kept by the entry cache, in place.
+
+    Entries kept in memory between tasks after being saved (see
+    `--entry-cache-mb`) are only saved again if they have changed; this
+    checks that an edit made directly to the data of a spectrum is detected,
+    and saved.
+    """
+    log = catalog.log
+    log.info("Testing edits of entries kept by the entry cache.")
+    entry_cache = catalog.entry_cache
+    catalog.entry_cache = EntryCache(max_mb=100.0)
+    try:
+        name = catalog.add_entry(FAKE_ALIAS_6)
+        source = catalog.entries[name].add_source(
+            name=FAKE_NAME_1, bibcode=FAKE_BIBCODE_1)
+        wavelengths = [str(1.0*x) for x in range(1000, 9000, 100)]
+        catalog.entries[name].add_spectrum(
+            u_wavelengths='Angstrom', u_fluxes='erg/s/cm^2/Angstrom',
+            wavelengths=wavelengths, fluxes=wavelengths, source=source)
+        catalog.journal_entries(keep=True)
+        entry = catalog.entries[name]
+        if entry._stub:
+            log_raise("Entry '{}' was not kept after saving".format(name),
+                      log)
+
+        entry[ENTRY.SPECTRA][0][SPECTRUM.DATA][0][1] = FAKE_FLUX_1
+        catalog.journal_entries(keep=True)
+        outdir, filename = entry._get_save_path()
+        save_name = os.path.join(outdir, filename + '.json')
+        with open(save_name, 'r') as ff:
+            saved = json.load(ff)[name]
+        flux = saved[ENTRY.SPECTRA][0][SPECTRUM.DATA][0][1]
+        if flux != FAKE_FLUX_1:
+            err_str = "Saved flux '{}' of '{}', expected '{}'".format(
+                flux, name, FAKE_FLUX_1)
+            log_raise(err_str, log)
+    finally:
+        catalog.entry_cache = entry_cache
+
+    # Remove the entry, so the rest of the test starts without entries
+    catalog._delete_entry_file(entry_name=name)
+    del catalog.entries[name]
+    return
+
+
+def do_test_shard(catalog):
+    """Shard-safe test task (see `astrocats.catalog.shard`).
+
+    Only adds data of its own, so that the output of a sharded import
+    (`--shards`, or each `--shard` and then `--merge-shards`) can be compared
+    with that of an unsharded one.
+    """
+    log = catalog.log
+    log.info("do_test_shard()")
+    for ii in range(SHARD_ENTRIES):
+        name = catalog.add_entry(SHARD_NAME.format(ii))
+        source = catalog.entries[name].add_source(
+            name='Shard et al. {}'.format(2000 + ii % 3),
+            bibcode='{}ApJ...{:03d}..1S'.format(2000 + ii % 3, ii % 3))
+        catalog.entries[name].add_quantity(
+            ENTRY.ALIAS, SHARD_ALIAS.format(ii), source)
+        catalog.entries[name].add_quantity(
+            ENTRY.RA, '10:00:{:02d}'.format(ii), source)
+        for jj in range(3):
+            catalog.entries[name].add_photometry(**{
+                PHOTOMETRY.TIME: str(55000 + jj),
+                PHOTOMETRY.MAGNITUDE: str(17 + ii / 10. + jj),
+                PHOTOMETRY.BAND: 'V', PHOTOMETRY.SOURCE: source})
+        if ii % 5 == 0:
+            # Data under the alias of another entry (possibly of another
+            # shard)
+            name = catalog.add_entry(SHARD_ALIAS.format(ii // 2))
+            source = catalog.entries[name].add_source(
+                name=FAKE_NAME_2, bibcode=FAKE_BIBCODE_2)
+            catalog.entries[name].add_quantity(
+                ENTRY.REDSHIFT, '0.{}'.format(ii + 1), source)
+    catalog.journal_entries()
+    return
+
+
+def do_test_resume(catalog):
+    """Test task failing unless the import is resumed (with `--resume`).
+
+    Run after another task, an import with this task fails once, after
+    saving a checkpoint; the resumed import must then skip the completed
+    tasks, and give the same output as an import which did not fail.
+    """
+    log = catalog.log
+    log.info("do_test_resume()")
+    if not getattr(catalog.args, 'resume', False):
+        log_raise("Failing until resumed, with `--resume`.", log)
+    return
+
+
 def log_raise(err_str, log):
     log.error(err_str)
     raise RuntimeError(err_str)
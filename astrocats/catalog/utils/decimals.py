@@ -0,0 +1,216 @@
+"""Arrays of decimal numbers with the arithmetic of `decimal.Decimal`.
+"""
+from decimal import Decimal
+
+import numpy as np
+
+__all__ = ['DecimalArray']
+
+# Powers of ten which fit in 64 bit integers
+_POW10 = 10**np.arange(19, dtype=np.int64)
+# Largest precision handled: results must be exact as 64 bit floats
+_MAX_PREC = 15
+# Relative error of floating point values and operations (a few ulp)
+_FLOAT_ERR = 4.0 * np.finfo(float).eps
+
+
+class DecimalArray(object):
+    """Array of decimal numbers, computed as `decimal.Decimal` would.
+
+    Each element is stored as an integer coefficient and exponent, i.e.
+    ``coef * 10**exp``, and every operation rounds its result to the
+    precision of that element (`prec`), as `decimal.Decimal` does within a
+    `decimal.localcontext` of that precision (with the default, half-even,
+    rounding).  The results of addition, subtraction and multiplication are
+    computed with integers, and are identical to those of `decimal.Decimal`.
+    `log10` and `pow10` use floating point numbers; their results are the
+    correctly rounded ones, unless they are too close to a rounding boundary
+    (or could be exact) to be certain.  Those elements, and those which do
+    not fit in 64 bit integers, are flagged in `bad`, and should be computed
+    with `decimal.Decimal` instead.
+
+    Arguments
+    ---------
+    coef : array_like of int
+    exp : array_like of int
+    prec : array_like of int
+        Precision (number of significant digits) used for each element.
+    bad : array_like of bool or `None`
+        Elements whose values are not valid.
+
+    """
+
+    def __init__(self, coef, exp, prec, bad=None):
+        self.coef = np.asarray(coef, dtype=np.int64)
+        self.exp = np.asarray(exp, dtype=np.int64)
+        self.prec = np.asarray(prec, dtype=np.int64)
+        if bad is None:
+            bad = self.prec > _MAX_PREC
+        self.bad = np.asarray(bad, dtype=bool)
+        return
+
+    @classmethod
+    def from_strings(cls, strings, prec):
+        """Create from strings of numbers (exactly, as `decimal.Decimal`).
+
+        Empty strings (or others which cannot be converted) are flagged in
+        `bad`.
+        """
+        num = len(strings)
+        # Numbers are often repeated (e.g. zero points), parse each once
+        parsed = {}
+        values = []
+        for string in strings:
+            if string not in parsed:
+                parsed[string] = _parse(string)
+            values.append(parsed[string])
+        bad = np.array([value is None for value in values], dtype=bool)
+        bad |= np.asarray(prec, dtype=np.int64) > _MAX_PREC
+        values = [(0, 0) if value is None else value for value in values]
+        coef, exp = np.array(values, dtype=np.int64).reshape(num, 2).T
+        return cls(coef, exp, np.broadcast_to(prec, (num, )), bad)
+
+    def __len__(self):
+        return len(self.coef)
+
+    def to_floats(self):
+        """Values of the elements, as floats.
+
+        Elements beyond the range of floats are infinite (or `nan`).
+        """
+        with np.errstate(over='ignore', invalid='ignore'):
+            return self.coef * np.power(10.0, self.exp)
+
+    def to_strings(self):
+        """The elements as `str(decimal.Decimal)` would write them.
+
+        Elements flagged in `bad` are `None`.
+        """
+        return [
+            None if bb else str(Decimal('{}E{}'.format(cc, ee)))
+            for cc, ee, bb in zip(self.coef, self.exp, self.bad)
+        ]
+
+    # Exact operations
+    # ----------------
+
+    def __add__(self, other):
+        exp = np.minimum(self.exp, other.exp)
+        shift1 = self.exp - exp
+        shift2 = other.exp - exp
+        # The aligned coefficients must fit into 64 bit integers
+        bad = (self.bad | other.bad |
+               (_num_digits(self.coef) + shift1 > 18) |
+               (_num_digits(other.coef) + shift2 > 18))
+        shift1 = np.where(bad, 0, shift1)
+        shift2 = np.where(bad, 0, shift2)
+        coef = self.coef * _POW10[shift1] + other.coef * _POW10[shift2]
+        return self._rounded(coef, exp, bad)
+
+    def __neg__(self):
+        return DecimalArray(-self.coef, self.exp, self.prec, self.bad)
+
+    def __sub__(self, other):
+        return self + (-other)
+
+    def __mul__(self, other):
+        bad = (self.bad | other.bad |
+               (_num_digits(self.coef) + _num_digits(other.coef) > 18))
+        coef = np.where(bad, 0, self.coef) * np.where(bad, 0, other.coef)
+        return self._rounded(coef, self.exp + other.exp, bad)
+
+    def _rounded(self, coef, exp, bad):
+        """Round the exact result of an operation to the precision.
+
+        Zero results are flagged in `bad`, as their sign and exponent follow
+        additional rules.
+        """
+        prec = self.prec
+        sign = np.sign(coef)
+        coef = np.abs(coef)
+        shift = np.clip(_num_digits(coef) - prec, 0, None)
+        scale = _POW10[shift]
+        quot, rem = np.divmod(coef, scale)
+        # Round half to even
+        half = scale // 2
+        up = (shift > 0) & ((rem > half) | ((rem == half) & (quot % 2 == 1)))
+        quot = quot + up
+        # Rounding up to the next power of ten gives an extra (zero) digit
+        carry = _num_digits(quot) > prec
+        quot = np.where(carry, quot // 10, quot)
+        exp = exp + shift + carry
+        bad = bad | (coef == 0)
+        return DecimalArray(sign * quot, exp, prec, bad)
+
+    # Inexact operations
+    # ------------------
+
+    def log10(self):
+        """Base ten logarithm of each element."""
+        bad = self.bad | (self.coef <= 0)
+        vals = np.where(bad, 1.0, self.to_floats())
+        res = np.log10(vals)
+        # Errors from the conversion to float, and from `log10`
+        err = _FLOAT_ERR * (1.0 + np.abs(res))
+        return self._from_floats(res, err, bad)
+
+    def pow10(self):
+        """Ten to the power of each element (i.e. ``Decimal('10') ** x``).
+        """
+        vals = np.where(self.bad, 0.0, self.to_floats())
+        bad = self.bad | (np.abs(vals) > 300)
+        vals = np.where(bad, 0.0, vals)
+        res = np.power(10.0, vals)
+        # Errors from the conversion to float, and from `power`
+        err = _FLOAT_ERR * res * (1.0 + np.log(10.0) * np.abs(vals))
+        return self._from_floats(res, err, bad)
+
+    def _from_floats(self, vals, err, bad):
+        """Round the floats `vals`, with absolute errors `err`, to precision.
+
+        Elements whose rounding is uncertain are flagged in `bad`; including
+        those which could be exact, as their exponent then follows other
+        rules.
+        """
+        prec = self.prec
+        bad = bad | (vals == 0.0) | ~np.isfinite(vals)
+        vals = np.where(bad, 1.0, vals)
+        sign = np.sign(vals).astype(np.int64)
+        vals = np.abs(vals)
+        exp = np.floor(np.log10(vals)).astype(np.int64) - prec + 1
+        scaled = vals * np.power(10.0, -exp)
+        # Correct the exponent if `log10` was off near a power of ten
+        for _ in range(2):
+            high = scaled >= _POW10[np.clip(prec, 0, 18)]
+            low = scaled < _POW10[np.clip(prec - 1, 0, 18)]
+            exp = exp + high - low
+            scaled = vals * np.power(10.0, -exp)
+        err = err * np.power(10.0, -exp) + _FLOAT_ERR * scaled
+        quot = np.floor(scaled)
+        frac = scaled - quot
+        bad = (bad | (frac < err) | (frac > 1.0 - err) |
+               (np.abs(frac - 0.5) < err))
+        quot = np.where(bad, 0.0, quot).astype(np.int64) + (frac > 0.5)
+        carry = _num_digits(quot) > prec
+        quot = np.where(carry, quot // 10, quot)
+        exp = exp + carry
+        return DecimalArray(sign * quot, exp, prec, bad)
+
+
+def _parse(string):
+    """Coefficient and exponent of the number `string`, `None` if invalid.
+    """
+    try:
+        sign, digits, exp = Decimal(string).as_tuple()
+    except Exception:
+        return None
+    if not isinstance(exp, int) or len(digits) > 18:
+        return None
+    coef = int(''.join(map(str, digits)))
+    return -coef if sign else coef, exp
+
+
+def _num_digits(coef):
+    """Number of digits in each (integer) coefficient, one for zero."""
+    digits = np.searchsorted(_POW10, np.abs(coef), side='right')
+    return np.maximum(digits, 1)
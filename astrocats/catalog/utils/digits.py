@@ -3,54 +3,93 @@
 
 from math import floor, log10
 
-from past.builtins import basestring
+from six import string_types
 
 __all__ = [
     'get_sig_digits', 'is_integer', 'is_number', 'pretty_num', 'round_sig',
     'zpad'
 ]
 
+# Results of `is_integer` and `is_number` for strings, as the same strings
+# (e.g. source aliases, and the values of repeated fields) are checked again
+# and again.  Each is cleared once it holds `_CACHE_SIZE` strings.
+_INTEGER_CACHE = {}
+_NUMBER_CACHE = {}
+_CACHE_SIZE = 100000
+
 
 def get_sig_digits(x, strip_zeroes=True):
-    tstr = ''.join(x.split('.'))
     if strip_zeroes:
-        tstr = tstr.strip('0')
-    return len(tstr)
+        return len(x.replace('.', '').strip('0'))
+    return len(x) - x.count('.')
 
 
 def is_integer(s):
-    if isinstance(s, list) and not isinstance(s, basestring):
-        try:
-            [int(x) for x in s]
-            return True
-        except ValueError:
-            return False
-    else:
+    if isinstance(s, list) and not isinstance(s, string_types):
+        return all(_is_integer(x) for x in s)
+    return _is_integer(s)
+
+
+def _is_integer(s):
+    """Whether `int` accepts the single value `s`."""
+    if not isinstance(s, string_types):
         try:
             int(s)
             return True
         except ValueError:
             return False
 
+    try:
+        return _INTEGER_CACHE[s]
+    except KeyError:
+        pass
+    try:
+        int(s)
+        result = True
+    except ValueError:
+        result = False
+    if len(_INTEGER_CACHE) >= _CACHE_SIZE:
+        _INTEGER_CACHE.clear()
+    _INTEGER_CACHE[s] = result
+    return result
+
 
 def is_number(s):
-    if isinstance(s, list) and not isinstance(s, basestring):
+    if isinstance(s, list) and not isinstance(s, string_types):
+        # Any string with a space fails, before any conversion is tried
+        if any(isinstance(x, string_types) and ' ' in x for x in s):
+            return False
+        return all(_is_number(x) for x in s)
+    return _is_number(s)
+
+
+def _is_number(s):
+    """Whether the single value `s` is a number (without spaces)."""
+    if isinstance(s, (float, int)):
+        return True
+    if not isinstance(s, string_types):
         try:
-            for x in s:
-                if isinstance(x, basestring) and ' ' in x:
-                    raise ValueError
-            [float(x) for x in s]
+            float(s)
             return True
         except ValueError:
             return False
+
+    try:
+        return _NUMBER_CACHE[s]
+    except KeyError:
+        pass
+    if ' ' in s:
+        result = False
     else:
         try:
-            if isinstance(s, basestring) and ' ' in s:
-                raise ValueError
             float(s)
-            return True
+            result = True
         except ValueError:
-            return False
+            result = False
+    if len(_NUMBER_CACHE) >= _CACHE_SIZE:
+        _NUMBER_CACHE.clear()
+    _NUMBER_CACHE[s] = result
+    return result
 
 
 def pretty_num(x, sig=4):
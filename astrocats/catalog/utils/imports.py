@@ -7,7 +7,7 @@ from collections import OrderedDict
 from .digits import is_number
 
 __all__ = ['compress_gz', 'convert_aq_output', 'read_json_dict',
-           'read_json_arr', 'uncompress_gz']
+           'read_json_arr', 'replace_file', 'uncompress_gz']
 
 
 def convert_aq_output(row):
@@ -60,6 +60,28 @@ def compress_gz(fname):
     return comp_fname
 
 
+def replace_file(src, dst):
+    """Rename the file `src` to `dst`, atomically replacing any existing `dst`.
+
+    `os.replace` is used where available (python 3.3+).  Otherwise
+    `os.rename` is used, which also replaces `dst` atomically on POSIX
+    systems; only where it refuses to overwrite an existing file (Windows) is
+    `dst` removed first.
+    """
+    try:
+        replace = os.replace
+    except AttributeError:
+        try:
+            os.rename(src, dst)
+        except OSError:
+            if not os.path.exists(dst):
+                raise
+            os.remove(dst)
+            os.rename(src, dst)
+        return
+    replace(src, dst)
+
+
 def uncompress_gz(fname):
     import shutil
     import gzip
@@ -1,18 +1,26 @@
 """Logging submodule and related functions.
 """
 
+import atexit
 import inspect
 import logging
+import logging.handlers
+import sys
 from logging import DEBUG, INFO, WARNING
 
-import numpy as np
+try:
+    import queue
+except ImportError:
+    import Queue as queue
 
 _FILE_LEVEL_DEF = DEBUG
 _STREAM_LEVEL_DEF = WARNING
 _LOADED_LEVEL = INFO
+_BATCH_SIZE_DEF = 100
 
 
-__all__ = ["get_logger", "log_raise", "DEBUG", "WARNING", "INFO", "log_memory"]
+__all__ = ["get_logger", "log_raise", "DEBUG", "WARNING", "INFO", "log_memory",
+           "log_lazy", "flush_logger", "restart_listener"]
 
 
 class IndentFormatter(logging.Formatter):
@@ -25,10 +33,14 @@ class IndentFormatter(logging.Formatter):
         self.baseline = None
 
     def format(self, rec):
-        stack = inspect.stack()
+        # Records passed through a queue carry the depth of the stack where
+        # they were created; otherwise measure it here.
+        depth = getattr(rec, 'stack_depth', None)
+        if depth is None:
+            depth = len(inspect.stack())
         if self.baseline is None:
-            self.baseline = len(stack)
-        indent = (len(stack) - self.baseline)
+            self.baseline = depth
+        indent = (depth - self.baseline)
         addSpace = ((indent > 0) & (not rec.msg.startswith(" -")))
         rec.indent = ' -' * indent + ' ' * addSpace
         out = logging.Formatter.format(self, rec)
@@ -36,9 +48,50 @@ class IndentFormatter(logging.Formatter):
         return out
 
 
+# `QueueHandler` and `QueueListener` (with `respect_handler_level`) require
+# Python 3.5+; without them, queued loggers fall back to direct handlers.
+QUEUE_LOGGING = sys.version_info >= (3, 5)
+
+if QUEUE_LOGGING:
+    class IndentQueueHandler(logging.handlers.QueueHandler):
+        """Queue handler which records the stack depth of each record.
+
+        Formatting happens in the listener thread, where the stack of the
+        logging call is no longer available, so the depth used by
+        `IndentFormatter` is stored on the record before it is enqueued.
+        """
+
+        def prepare(self, rec):
+            frame = sys._getframe()
+            depth = 0
+            while frame is not None:
+                depth += 1
+                frame = frame.f_back
+            rec = logging.handlers.QueueHandler.prepare(self, rec)
+            rec.stack_depth = depth
+            return rec
+
+    class IndentQueueListener(logging.handlers.QueueListener):
+        """Queue listener which keeps track of whether it is running.
+        """
+
+        def __init__(self, queue, *handlers, **kwargs):
+            logging.handlers.QueueListener.__init__(
+                self, queue, *handlers, **kwargs)
+            self.running = False
+
+        def start(self):
+            logging.handlers.QueueListener.start(self)
+            self.running = True
+
+        def stop(self):
+            logging.handlers.QueueListener.stop(self)
+            self.running = False
+
+
 def get_logger(name=None, stream_fmt=None, file_fmt=None, date_fmt=None,
                stream_level=None, file_level=None,
-               tofile=None, tostr=True):
+               tofile=None, tostr=True, queued=False, batch_size=None):
     """Create a standard logger object which logs to file and or stdout stream.
 
     If a logger has already been created in this session, it is returned
@@ -64,6 +117,14 @@ def get_logger(name=None, stream_fmt=None, file_fmt=None, date_fmt=None,
         Filename to log to (turned off if `None`).
     tostr : bool,
         Log to stdout stream.
+    queued : bool,
+        Hand records to a `QueueHandler` and emit them from a background
+        `QueueListener` thread, so that stream and file I/O happen off of the
+        calling thread.  Requires Python 3.5+ (see `QUEUE_LOGGING`); otherwise
+        the handlers are attached to the logger directly.
+    batch_size : int or `None`,
+        When `queued`, the number of records buffered before being written to
+        the file handler.  If `None`, default settings are used.
 
     Returns
     -------
@@ -97,12 +158,20 @@ def get_logger(name=None, stream_fmt=None, file_fmt=None, date_fmt=None,
         file_level = _FILE_LEVEL_DEF
     if stream_level is None:
         stream_level = _STREAM_LEVEL_DEF
-    # Logger object must be at minimum level
-    logger.setLevel(int(np.min([file_level, stream_level])))
+    # Logger object must be at minimum level of the handlers actually in use,
+    # so that `logger.isEnabledFor` reflects whether a message will be emitted
+    levels = []
+    if tofile is not None:
+        levels.append(file_level)
+    if tostr:
+        levels.append(stream_level)
+    logger.setLevel(min(levels))
 
     if date_fmt is None:
         date_fmt = '%Y/%m/%d %H:%M:%S'
 
+    handlers = []
+
     # Log to file
     # -----------
     if tofile is not None:
@@ -114,7 +183,14 @@ def get_logger(name=None, stream_fmt=None, file_fmt=None, date_fmt=None,
         fileHandler = logging.FileHandler(tofile, 'w')
         fileHandler.setFormatter(fileFormatter)
         fileHandler.setLevel(file_level)
-        logger.addHandler(fileHandler)
+        if queued:
+            # Write to file in batches (errors are written immediately)
+            if batch_size is None:
+                batch_size = _BATCH_SIZE_DEF
+            fileHandler = logging.handlers.MemoryHandler(
+                batch_size, flushLevel=logging.ERROR, target=fileHandler)
+            fileHandler.setLevel(file_level)
+        handlers.append(fileHandler)
         #     Store output filename to `logger` object
         logger.filename = tofile
 
@@ -128,11 +204,89 @@ def get_logger(name=None, stream_fmt=None, file_fmt=None, date_fmt=None,
         strHandler = logging.StreamHandler()
         strHandler.setFormatter(strFormatter)
         strHandler.setLevel(stream_level)
-        logger.addHandler(strHandler)
+        handlers.append(strHandler)
+
+    # Attach handlers, directly or through a queue
+    # --------------------------------------------
+    if queued and QUEUE_LOGGING:
+        log_queue = queue.Queue(-1)
+        logger.addHandler(IndentQueueHandler(log_queue))
+        listener = IndentQueueListener(
+            log_queue, *handlers, respect_handler_level=True)
+        listener.start()
+        #     Store listener to `logger` object so that it can be flushed
+        logger._listener = listener
+        atexit.register(_stop_listener, logger)
+    else:
+        for handler in handlers:
+            logger.addHandler(handler)
 
     return logger
 
 
+def flush_logger(log):
+    """Make sure all pending log records have been written.
+
+    For queued loggers (see `get_logger`) this waits for the listener to
+    process every enqueued record before flushing its handlers.
+
+    Arguments
+    ---------
+    log : `logging.Logger` object
+
+    """
+    listener = getattr(log, '_listener', None)
+    if listener is not None:
+        # Stopping the listener processes all records already in the queue
+        if listener.running:
+            listener.stop()
+            listener.start()
+        handlers = listener.handlers
+    else:
+        handlers = log.handlers
+
+    for handle in handlers:
+        handle.flush()
+    return
+
+
+def restart_listener(log):
+    """Start a new listener thread for a queued logger, in a child process.
+
+    A process created by forking (e.g. with `multiprocessing`) has a copy of
+    the queue of a queued logger (see `get_logger`), but not of the thread
+    emitting its records.
+
+    Arguments
+    ---------
+    log : `logging.Logger` object
+
+    """
+    listener = getattr(log, '_listener', None)
+    if listener is None:
+        return
+    # The thread of the inherited listener does not exist in this process, so
+    # it cannot be stopped; replace the listener instead
+    listener = IndentQueueListener(
+        listener.queue, *listener.handlers,
+        respect_handler_level=listener.respect_handler_level)
+    listener.start()
+    log._listener = listener
+    return
+
+
+def _stop_listener(log):
+    """Stop the queue listener of `log` and flush its handlers, at exit."""
+    listener = getattr(log, '_listener', None)
+    if listener is None:
+        return
+    if listener.running:
+        listener.stop()
+    for handle in listener.handlers:
+        handle.flush()
+    return
+
+
 def log_raise(log, err_str, err_type=RuntimeError):
     """Log an error message and raise an error.
 
@@ -148,12 +302,35 @@ def log_raise(log, err_str, err_type=RuntimeError):
     log.error(err_str)
     # Make sure output is flushed
     # (happens automatically to `StreamHandlers`, but not `FileHandlers`)
-    for handle in log.handlers:
-        handle.flush()
+    flush_logger(log)
     # Raise given error
     raise err_type(err_str)
 
 
+def log_lazy(log, lvl, msg, *args, **kwargs):
+    """Log a message, only formatting it if `lvl` is enabled for `log`.
+
+    Building messages with `str.format` in hot loops is costly when they
+    include large objects (e.g. lists of sources or photometry points), and
+    wasted when the level is disabled.  The message is only constructed, as
+    ``msg.format(*args, **kwargs)``, if it will actually be emitted.
+
+    Arguments
+    ---------
+    log : `logging.Logger` object
+    lvl : int
+        Logging level of the message.
+    msg : str
+        Message format string, in `str.format` style.
+    *args, **kwargs
+        Arguments passed to `msg.format`.
+
+    """
+    if log.isEnabledFor(lvl):
+        log.log(lvl, msg.format(*args, **kwargs))
+    return
+
+
 def log_memory(log, pref=None, lvl=logging.DEBUG, raise_flag=True):
     """Log the current memory usage.
     """
@@ -164,7 +341,7 @@ def log_memory(log, pref=None, lvl=logging.DEBUG, raise_flag=True):
     if pref is not None:
         cyc_str += "{}: ".format(pref)
 
-    # Linux returns units in Bytes; OSX in kilobytes
+    # `resource`: Linux returns units in kilobytes; OSX in Bytes
     UNIT = KB*KB if sys.platform == 'darwin' else KB
 
     good = False
@@ -192,7 +369,7 @@ def log_memory(log, pref=None, lvl=logging.DEBUG, raise_flag=True):
         mem_perc = process.memory_percent()
         num_thr = process.num_threads()
         _str = "; RSS: {:7.2f} [MB], {:7.2f}%; Threads: {:3d}, CPU: {:7.2f}%".format(
-            rss/UNIT, mem_perc, num_thr, cpu_perc)
+            rss/KB/KB, mem_perc, num_thr, cpu_perc)
         cyc_str += _str
     except Exception as err:
         log.log(lvl, "psutil.Process failed.  '{}'".format(str(err)))
@@ -2,14 +2,14 @@
 '''
 
 from collections import OrderedDict
-from random import seed, shuffle
-from matplotlib.colors import rgb2hex
-import seaborn as sns
+from random import Random
 
-from palettable import colorbrewer, cubehelix, wesanderson
+# NOTE: `matplotlib`, `seaborn` and `palettable` are slow to import, and only
+#       needed for colors; they are imported when colors are first requested.
 
 __all__ = [
-    'bandrepf', 'bandcolorf', 'radiocolorf', 'xraycolorf', 'bandaliasf',
+    'color_dicts', 'bandrepf', 'bandcolorf', 'radiocolorf', 'xraycolorf',
+    'bandaliasf',
     'bandshortaliasf', 'bandwavef', 'bandmetaf', 'bandcodes',
     'bandwavelengths',
     'bandgroupf'
@@ -157,27 +157,52 @@ xraycodes = [
     "0.5 - 8"
 ]
 
-seed(101)
-# bandcolors = ["#%06x" % round(float(x)/float(len(bandcodes))*0xFFFEFF)
-# for x in range(len(bandcodes))]
-bandcolors = (cubehelix.cubehelix1_16.hex_colors[2:13] +
-              cubehelix.cubehelix2_16.hex_colors[2:13] +
-              cubehelix.cubehelix3_16.hex_colors[2:13])
-shuffle(bandcolors)
-bandcolors2 = cubehelix.perceptual_rainbow_16.hex_colors
-shuffle(bandcolors2)
-bandcolors3 = cubehelix.jim_special_16.hex_colors
-shuffle(bandcolors3)
-bandcolors = bandcolors + bandcolors2 + bandcolors3
-bandcolordict = dict(list(zip(bandcodes, bandcolors)))
-
-radiocolors = wesanderson.Zissou_5.hex_colors
-shuffle(radiocolors)
-radiocolordict = dict(list(zip(radiocodes, radiocolors)))
-
-xraycolors = colorbrewer.sequential.Oranges_9.hex_colors[2:]
-shuffle(xraycolors)
-xraycolordict = dict(list(zip(xraycodes, xraycolors)))
+_COLOR_DICTS = None
+
+
+def color_dicts():
+    """Construct (once) the dictionaries of band, radio and x-ray colors.
+
+    Returns a dictionary of the color lists and dictionaries which were
+    module attributes before the color packages were imported lazily:
+    'bandcolors', 'bandcolordict', 'radiocolors', 'radiocolordict',
+    'xraycolors' and 'xraycolordict'.
+    """
+    global _COLOR_DICTS
+    if _COLOR_DICTS is not None:
+        return _COLOR_DICTS
+
+    from palettable import colorbrewer, cubehelix, wesanderson
+
+    # Use a separate generator, so that the global random state is untouched
+    rng = Random(101)
+    # bandcolors = ["#%06x" % round(float(x)/float(len(bandcodes))*0xFFFEFF)
+    # for x in range(len(bandcodes))]
+    bandcolors = (cubehelix.cubehelix1_16.hex_colors[2:13] +
+                  cubehelix.cubehelix2_16.hex_colors[2:13] +
+                  cubehelix.cubehelix3_16.hex_colors[2:13])
+    rng.shuffle(bandcolors)
+    bandcolors2 = cubehelix.perceptual_rainbow_16.hex_colors
+    rng.shuffle(bandcolors2)
+    bandcolors3 = cubehelix.jim_special_16.hex_colors
+    rng.shuffle(bandcolors3)
+    bandcolors = bandcolors + bandcolors2 + bandcolors3
+    bandcolordict = dict(list(zip(bandcodes, bandcolors)))
+
+    radiocolors = wesanderson.Zissou_5.hex_colors
+    rng.shuffle(radiocolors)
+    radiocolordict = dict(list(zip(radiocodes, radiocolors)))
+
+    xraycolors = colorbrewer.sequential.Oranges_9.hex_colors[2:]
+    rng.shuffle(xraycolors)
+    xraycolordict = dict(list(zip(xraycodes, xraycolors)))
+
+    _COLOR_DICTS = {
+        'bandcolors': bandcolors, 'bandcolordict': bandcolordict,
+        'radiocolors': radiocolors, 'radiocolordict': radiocolordict,
+        'xraycolors': xraycolors, 'xraycolordict': xraycolordict
+    }
+    return _COLOR_DICTS
 
 
 def bandrepf(code):
@@ -189,18 +214,22 @@ def bandrepf(code):
 
 def bandcolorf(code):
     newcode = bandrepf(code)
+    bandcolordict = color_dicts()['bandcolordict']
     if newcode in bandcolordict:
         return bandcolordict[newcode]
     return 'black'
 
 
 def radiocolorf(freq):
+    import seaborn as sns
+    from matplotlib.colors import rgb2hex
     ffreq = (float(freq) - 1.0)/(45.0 - 1.0)
     pal = sns.diverging_palette(200, 60, l=80, as_cmap=True, center="dark")
     return rgb2hex(pal(ffreq))
 
 
 def xraycolorf(code):
+    xraycolordict = color_dicts()['xraycolordict']
     if code in xraycolordict:
         return xraycolordict[code]
     return 'black'
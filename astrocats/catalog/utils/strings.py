@@ -48,9 +48,18 @@ def utf8(x):
 
 def dict_to_pretty_string(odict):
     jsonstring = json.dumps(
-        odict, indent=4, separators=(',', ':'), ensure_ascii=False)
+        odict, indent=4, separators=(',', ':'), ensure_ascii=False,
+        default=_to_list)
     return jsonstring
 
 
+def _to_list(obj):
+    """Serialize list-like objects (e.g. `SpectrumData`) as lists for json.
+    """
+    if hasattr(obj, 'to_list'):
+        return obj.to_list()
+    raise TypeError("{!r} is not JSON serializable".format(obj))
+
+
 def get_entry_filename(name):
     return (name.replace('/', '_'))
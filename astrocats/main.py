@@ -217,6 +217,20 @@ def load_command_line_args(clargs=None):
         dest='log_filename',
         default=None,
         help='Filename to which to store logging information.')
+    parser.add_argument(
+        '--log-queue',
+        dest='log_queue',
+        default=False,
+        action='store_true',
+        help=('Write log messages from a background thread, through a queue, '
+              'instead of from the main thread.'))
+    parser.add_argument(
+        '--log-batch-size',
+        dest='log_batch_size',
+        default=None,
+        type=int,
+        help=('With `--log-queue`, number of messages buffered before being '
+              'written to the log file.'))
 
     # If output files should be written or not
     # ----------------------------------------
@@ -266,7 +280,8 @@ def load_log(args):
     ---------
     args : `argparse.Namespace` object
         Namespace containing required settings:
-        {`args.debug`, `args.verbose`, and `args.log_filename`}.
+        {`args.debug`, `args.verbose`, `args.log_filename`, `args.log_queue`
+        and `args.log_batch_size`}.
 
     Returns
     -------
@@ -284,21 +299,32 @@ def load_log(args):
 
     # Create log
     log = logger.get_logger(
-        stream_level=log_stream_level, tofile=args.log_filename)
+        stream_level=log_stream_level, tofile=args.log_filename,
+        queued=args.log_queue, batch_size=args.log_batch_size)
     log._verbose = args.verbose
     log._debug = args.debug
     return log
 
 
 def get_git():
-    """Get a string representing the current git status (tag and commit hash).
+    """Get a string representing the current git status (commit hash).
+
+    The SHA of the `astrocats` repository is read once per process (see
+    `astrocats.catalog.gitter.get_sha_cached`).  'N/A' is returned if
+    `astrocats` is not in a git repository.
 
     Returns
     -------
     git_vers : str
     """
-    import subprocess
-    git_vers = subprocess.check_output(["git", "describe", "--always"]).strip()
+    from astrocats.catalog import gitter
+    path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if not os.path.exists(os.path.join(path, '.git')):
+        return 'N/A'
+    try:
+        git_vers = gitter.get_sha_cached(path=path, short=True)
+    except Exception:
+        git_vers = 'N/A'
     return git_vers
 
 
@@ -27,9 +27,10 @@ from astrocats.catalog.utils import (bandaliasf, bandcodes, bandcolorf,
                                      bandwavelengths, get_sig_digits,
                                      is_number, pretty_num, radiocolorf,
                                      round_sig, tq, xraycolorf)
-from astrocats.scripts.events import get_event_filename, get_event_text
+from astrocats.scripts.events import get_event_filename
 from astrocats.scripts.repos import (get_rep_folder, get_rep_folders,
                                      repo_file_list)
+from astrocats.scripts.scanner import EntryScanner
 from astropy import units as un
 from astropy.coordinates import SkyCoord as coord
 from astropy.time import Time as astrotime
@@ -330,7 +331,8 @@ if os.path.isfile(outdir + cachedir + 'md5s.json'):
 else:
     md5dict = {}
 
-for fcnt, eventfile in enumerate(tq(sorted(files, key=lambda s: s.lower()))):
+scanner = EntryScanner(files)
+for fcnt, eventfile in enumerate(tq(scanner.files)):
     fileeventname = os.path.splitext(os.path.basename(eventfile))[0].replace(
         '.json', '')
     if args.eventlist and fileeventname not in args.eventlist:
@@ -345,9 +347,7 @@ for fcnt, eventfile in enumerate(tq(sorted(files, key=lambda s: s.lower()))):
         entry_changed = True
         md5dict[eventfile] = checksum
 
-    filetext = get_event_text(eventfile)
-
-    catalog.update(json.loads(filetext, object_pairs_hook=OrderedDict))
+    catalog.update(scanner.load(eventfile))
     entry = next(reversed(catalog))
 
     eventname = entry
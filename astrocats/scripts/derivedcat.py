@@ -0,0 +1,61 @@
+#!/usr/local/bin/python3.5
+"""Generate several derived files of a catalog in one pass over its entries.
+
+Each entry file is read and parsed once, for all of the chosen outputs:
+'hosts' (see `hostcat`), 'biblio' (see `bibliocat`) and 'locations' (see
+`hammertime`).  The output is the same as that of the separate scripts.
+"""
+import argparse
+
+from astrocats.scripts.scanner import scan
+
+OUTPUTS = ['hosts', 'biblio', 'locations']
+
+parser = argparse.ArgumentParser(
+    description='Generate derived files of AstroCats data, reading the '
+    'entries once.'
+)
+parser.add_argument(
+    '--catalog',
+    '-c',
+    dest='catalog',
+    help='Select which catalog to generate',
+    default='sne',
+    type=str)
+parser.add_argument(
+    '--outputs',
+    '-o',
+    dest='outputs',
+    help='Derived files to generate',
+    nargs='+',
+    default=OUTPUTS,
+    choices=OUTPUTS)
+parser.add_argument(
+    '--processes',
+    '-p',
+    dest='processes',
+    help='Number of processes reading the entry files',
+    default=1,
+    type=int)
+
+
+def consumer(output, catalog):
+    """Consumer (see `scan`) generating `output` (one of `OUTPUTS`)."""
+    # The scripts are only imported when needed, for their dependencies
+    if output == 'hosts':
+        from astrocats.scripts.hostcat import HostCatalog
+        return HostCatalog(catalog)
+    if output == 'biblio':
+        from astrocats.scripts.bibliocat import Bibliography
+        return Bibliography(catalog)
+    if output == 'locations':
+        from astrocats.scripts.hammertime import SkyMap
+        return SkyMap(catalog)
+    raise ValueError('Unknown output!')
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    consumers = [consumer(output, args.catalog)
+                 for output in OUTPUTS if output in args.outputs]
+    scan(consumers, processes=args.processes, desc='Reading entries')
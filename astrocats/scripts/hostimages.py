@@ -0,0 +1,165 @@
+"""Collect images of the hosts of events, from SDSS or (failing that) DSS.
+"""
+import filecmp
+import threading
+import time
+import urllib.parse
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from bs4 import BeautifulSoup
+
+__all__ = ['RateLimiter', 'fetch_url', 'fetch_host_image',
+           'collect_host_images']
+
+SDSS_URL = 'http://skyserver.sdss.org/'
+SKYVIEW_URL = 'http://skyview.gsfc.nasa.gov/'
+
+# Angular sizes of the images; at the moment, there is no way to check if a
+# host is in the SDSS footprint without comparing to an empty image, which is
+# only possible at a fixed angular resolution.
+SDSS_IMAGE_SCALE = 0.3
+DSS_IMAGE_SCALE = 0.13889 * SDSS_IMAGE_SCALE
+
+
+class RateLimiter(object):
+    """Space out the requests made (by any thread) to each server.
+
+    Arguments
+    ---------
+    interval : float
+        Minimum time [seconds] between the starts of two requests to the same
+        server (network location).
+
+    """
+
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self._next = {}
+        self._lock = threading.Lock()
+        return
+
+    def wait(self, url):
+        """Wait until a request can be made to the server of `url`."""
+        netloc = urllib.parse.urlsplit(url).netloc
+        with self._lock:
+            now = time.time()
+            start = max(now, self._next.get(netloc, now))
+            self._next[netloc] = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+        return
+
+
+def fetch_url(url, limiter=None, retries=2, timeout=60):
+    """Return the contents of `url`, trying again `retries` times if failing.
+
+    The delay between attempts doubles each time, starting at one second.
+    The exception of the last attempt is raised if all fail.
+    """
+    for attempt in range(retries + 1):
+        if limiter is not None:
+            limiter.wait(url)
+        try:
+            with urllib.request.urlopen(url, timeout=timeout) as response:
+                return response.read()
+        except (KeyboardInterrupt, SystemExit):
+            raise
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(2.0**attempt)
+
+
+def fetch_host_image(ra, dec, position, imgfile, missingfile, limiter=None,
+                     sdss_url=SDSS_URL, skyview_url=SKYVIEW_URL):
+    """Save an image of the host at (`ra`, `dec`) [degrees] to `imgfile`.
+
+    The SDSS cutout is used, unless it is identical to `missingfile` (outside
+    of the footprint), in which case the DSS image is obtained from SkyView,
+    queried with `position` (e.g. the sexagesimal coordinates).
+
+    Returns
+    -------
+    source : str
+        'SDSS' or 'DSS', the source of the saved image; or 'None' if no image
+        could be obtained.
+
+    """
+    try:
+        image = fetch_url(
+            sdss_url + 'dr13/SkyServerWS/ImgCutout/getjpeg?ra=' + str(ra) +
+            '&dec=' + str(dec) + '&scale=' + str(SDSS_IMAGE_SCALE) +
+            '&width=500&height=500&opt=G', limiter)
+    except (KeyboardInterrupt, SystemExit):
+        raise
+    except Exception:
+        pass
+    else:
+        with open(imgfile, 'wb') as f:
+            f.write(image)
+        if not filecmp.cmp(imgfile, missingfile, shallow=False):
+            return 'SDSS'
+
+    url = (
+        skyview_url + "current/cgi/runquery.pl?Position=" +
+        str(urllib.parse.quote_plus(position)) +
+        "&coordinates=J2000&coordinates=&projection=Tan&pixels=500&size=" +
+        str(DSS_IMAGE_SCALE) + "&float=on&scaling=Log&resolver=SIMBAD-NED" +
+        "&Sampler=_skip_&Deedger=_skip_&rotation=&Smooth=&lut=colortables%2Fb-w-linear.bin&PlotColor=&grid=_skip_&gridlabels=1"
+        +
+        "&catalogurl=&CatalogIDs=on&RGB=1&survey=DSS2+IR&survey=DSS2+Red&survey=DSS2+Blue&IOSmooth=&contour=&contourSmooth=&ebins=null"
+    )
+    try:
+        bandsoup = BeautifulSoup(fetch_url(url, limiter), "html5lib")
+        imgname = ''
+        for image in bandsoup.findAll('img'):
+            if "Quicklook RGB image" in image.get('alt', ''):
+                imgname = image.get('src', '').split('/')[-1]
+        if not imgname:
+            return 'None'
+        image = fetch_url(skyview_url + 'tempspace/fits/' + imgname, limiter)
+    except (KeyboardInterrupt, SystemExit):
+        raise
+    except Exception:
+        return 'None'
+    with open(imgfile, 'wb') as f:
+        f.write(image)
+    return 'DSS'
+
+
+def collect_host_images(jobs, missingfile, threads=4, interval=1.0,
+                        **kwargs):
+    """Fetch the host images of several events concurrently.
+
+    Arguments
+    ---------
+    jobs : list of tuple
+        For each event: its name, and the arguments `ra`, `dec`, `position`
+        and `imgfile` of `fetch_host_image`.
+    missingfile : str
+        Image returned by SDSS outside of its footprint.
+    threads : int
+        Number of images fetched at the same time.
+    interval : float
+        Minimum time [seconds] between requests to the same server.
+    kwargs : dict
+        Passed to `fetch_host_image` (e.g. the server URLs).
+
+    Returns
+    -------
+    sources : `OrderedDict`
+        The source of the image of each event (see `fetch_host_image`), in
+        the order of `jobs`.
+
+    """
+    limiter = RateLimiter(interval)
+
+    def fetch(job):
+        return fetch_host_image(*job[1:], missingfile=missingfile,
+                                limiter=limiter, **kwargs)
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        sources = list(executor.map(fetch, jobs))
+    return OrderedDict(zip([job[0] for job in jobs], sources))
@@ -0,0 +1,138 @@
+"""Columns of the photometry of an event, for plotting its light curves.
+"""
+from statistics import mean
+
+import numpy as np
+
+from astrocats.catalog.utils import bandaliasf
+
+__all__ = ['MagnitudeColumns']
+
+
+def _source_ids(source):
+    """Sorted, comma separated, source ID(s) of a row of photometry."""
+    return ', '.join(str(j) for j in sorted(int(i) for i in source.split(',')))
+
+
+class MagnitudeColumns(object):
+    """The magnitudes of an event (excluding model realizations), in columns.
+
+    The photometry is converted once, in a single pass, to one column per
+    quantity: numerical columns are `numpy` arrays, the others lists.  The
+    rows of each glyph of the light curve (band, correction and kind of
+    point) are then selected with boolean masks, see `select`.
+
+    Arguments
+    ---------
+    photometry : list of dict
+        The photometry of the event (`catalog[entry]['photometry']`).
+
+    """
+
+    def __init__(self, photometry):
+        rows = [
+            x for x in photometry
+            if 'magnitude' in x and 'realization' not in x
+        ]
+        time = []
+        time_lower = []
+        time_upper = []
+        mag_lower = []
+        mag_upper = []
+        self.band = []
+        self.instrument = []
+        self.source = []
+        self.upperlimit = []
+        self.corr = []
+        for x in rows:
+            if isinstance(x['time'], list):
+                time.append(mean([float(y) for y in x['time']]))
+            else:
+                time.append(float(x['time']))
+            if 'e_lower_time' in x and 'e_upper_time' in x:
+                time_lower.append(float(x['e_lower_time']))
+                time_upper.append(float(x['e_upper_time']))
+            else:
+                err = float(x['e_time']) if 'e_time' in x else 0.
+                time_lower.append(err)
+                time_upper.append(err)
+            err = float(x['e_magnitude']) if 'e_magnitude' in x else 0.
+            mag_lower.append(
+                float(x['e_lower_magnitude'])
+                if 'e_lower_magnitude' in x else err)
+            mag_upper.append(
+                float(x['e_upper_magnitude'])
+                if 'e_upper_magnitude' in x else err)
+            self.band.append(bandaliasf(x['band']) if 'band' in x else '?')
+            self.instrument.append(x.get('instrument', ''))
+            self.source.append(_source_ids(x['source']))
+            self.upperlimit.append(x.get('upperlimit', False))
+            self.corr.append('kcorr' if 'kcorrected' in x else 'scorr'
+                             if 'scorrected' in x else 'raw')
+
+        self.time = np.array(time, dtype=float)
+        self.time_lower = np.array(time_lower, dtype=float)
+        self.time_upper = np.array(time_upper, dtype=float)
+        self.mag = np.array(
+            [float(x['magnitude']) for x in rows], dtype=float)
+        self.mag_lower = np.array(mag_lower, dtype=float)
+        self.mag_upper = np.array(mag_upper, dtype=float)
+
+        self._bands = np.array(self.band, dtype=object)
+        self._corrs = np.array(self.corr, dtype=object)
+        self._limits = np.array([bool(x) for x in self.upperlimit],
+                                dtype=bool)
+        self._noerrs = (self.time_lower == 0.) & (self.mag_upper == 0.)
+        self._errs = (self.time_lower > 0.) | (self.mag_upper > 0.)
+        return
+
+    def __len__(self):
+        return len(self.time)
+
+    def select(self, band, corr):
+        """Rows of `band` with correction `corr`, for each kind of point.
+
+        Returns
+        -------
+        limits : `numpy.ndarray` of int
+            Indices of the upper limits.
+        noerrs : `numpy.ndarray` of int
+            Indices of the detections without errors (in time or magnitude).
+        errs : `numpy.ndarray` of int
+            Indices of the detections with errors.
+
+        """
+        rows = (self._bands == band) & (self._corrs == corr)
+        detections = rows & ~self._limits
+        return (np.flatnonzero(rows & self._limits),
+                np.flatnonzero(detections & self._noerrs),
+                np.flatnonzero(detections & self._errs))
+
+    def data(self, ind, distancemod=None, timeerrs=False):
+        """Data of the rows `ind`, for a `ColumnDataSource`.
+
+        Arguments
+        ---------
+        ind : array_like of int
+            Indices of the rows.
+        distancemod : float or `None`
+            If given, absolute magnitudes ('yabs') are added.
+        timeerrs : bool
+            Whether to add the errors in time ('xle' and 'xue').
+
+        """
+        ind = np.asarray(ind, dtype=int)
+        data = dict(
+            x=self.time[ind].tolist(),
+            y=self.mag[ind].tolist(),
+            lerr=self.mag_lower[ind].tolist(),
+            uerr=self.mag_upper[ind].tolist(),
+            desc=[self.band[i] for i in ind],
+            instr=[self.instrument[i] for i in ind],
+            src=[self.source[i] for i in ind])
+        if distancemod is not None:
+            data['yabs'] = (self.mag[ind] - distancemod).tolist()
+        if timeerrs:
+            data['xle'] = self.time_lower[ind].tolist()
+            data['xue'] = self.time_upper[ind].tolist()
+        return data
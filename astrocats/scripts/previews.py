@@ -0,0 +1,172 @@
+"""Downsampled previews of spectra, for plotting, cached between runs.
+"""
+import hashlib
+import json
+import marshal
+import os
+from math import ceil, isnan
+
+import numpy as np
+
+from astrocats.catalog.utils import is_number, replace_file
+
+__all__ = ['SpectrumPreviews']
+
+
+class SpectrumPreviews(object):
+    """Wavelengths and fluxes of spectra, as plotted on the event pages.
+
+    A preview is computed from the data of a spectrum by keeping at most
+    `max_points` rows, dropping rows whose flux is not a number, converting
+    to observer frame wavelengths (in Angstroms), and removing the excluded
+    wavelength ranges.  Previews are saved, as `numpy` arrays, in a file per
+    spectrum named by a hash of everything the preview depends on (including
+    its data), so that a spectrum is only converted once.  Previews which
+    are no longer used (e.g. of spectra since changed) can be removed with
+    `prune`.
+
+    Arguments
+    ---------
+    cache_dir : str or `None`
+        Directory of the saved previews; `None` to not save them.
+    max_points : int
+        Maximum number of rows in a preview.
+    decimation : str
+        How rows are chosen when a spectrum has more than `max_points`:
+        'stride' keeps every n-th row; 'minmax' keeps the rows with the
+        lowest and highest flux in each of `max_points` / 2 bins, so that
+        narrow features are preserved.
+
+    """
+
+    DECIMATIONS = ['stride', 'minmax']
+
+    def __init__(self, cache_dir=None, max_points=10000, decimation='stride'):
+        if decimation not in self.DECIMATIONS:
+            raise ValueError("Unknown decimation '{}'".format(decimation))
+        self.cache_dir = cache_dir
+        self.max_points = max_points
+        self.decimation = decimation
+        if cache_dir is not None and not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        return
+
+    def get(self, spectrum, redshift=None, used=None):
+        """The preview of `spectrum` (a dict, as in an event file).
+
+        Arguments
+        ---------
+        spectrum : dict
+        redshift : float or `None`
+            Redshift of the event, used if the spectrum is deredshifted.
+        used : list or `None`
+            If given, the key of the preview is appended to it (see `prune`).
+
+        Returns
+        -------
+        wave : list of float
+        flux : list of float
+
+        """
+        if not (spectrum.get('deredshifted') and redshift is not None):
+            redshift = None
+        key = self.key(spectrum, redshift)
+        if used is not None:
+            used.append(key)
+        fname = None
+        if self.cache_dir is not None:
+            fname = os.path.join(self.cache_dir, key + '.npz')
+            if os.path.isfile(fname):
+                with np.load(fname) as arrays:
+                    return arrays['wave'].tolist(), arrays['flux'].tolist()
+
+        wave, flux = self.compute(spectrum, redshift)
+        if fname is not None:
+            # Write to a temporary file first, as other processes may read
+            # (or write) the same preview
+            tmpname = '{}.{}.tmp.npz'.format(fname[:-4], os.getpid())
+            np.savez(tmpname, wave=wave, flux=flux)
+            replace_file(tmpname, fname)
+        return wave.tolist(), flux.tolist()
+
+    def prune(self, keep):
+        """Remove the saved previews whose key is not in `keep`.
+
+        Temporary files left by interrupted writes are removed as well.
+
+        Returns
+        -------
+        removed : int
+            Number of files removed.
+
+        """
+        if self.cache_dir is None:
+            return 0
+        keep = set(keep)
+        removed = 0
+        for fname in os.listdir(self.cache_dir):
+            if not fname.endswith('.npz') or fname[:-4] in keep:
+                continue
+            try:
+                os.remove(os.path.join(self.cache_dir, fname))
+            except OSError:
+                continue
+            removed += 1
+        return removed
+
+    def key(self, spectrum, redshift):
+        """Hash of the data and parameters which the preview depends on."""
+        hash_md5 = hashlib.md5()
+        params = [self.max_points, self.decimation, redshift,
+                  spectrum.get('u_wavelengths'), spectrum.get('exclude')]
+        hash_md5.update(json.dumps(params).encode('utf-8'))
+        # `marshal` is much faster than `json`; its version 2 format does not
+        # depend on which objects are shared
+        try:
+            data = marshal.dumps(spectrum['data'], 2)
+        except ValueError:
+            data = json.dumps(spectrum['data']).encode('utf-8')
+        hash_md5.update(data)
+        return hash_md5.hexdigest()
+
+    def compute(self, spectrum, redshift=None):
+        """Compute the preview of `spectrum`, as arrays (see `get`)."""
+        data = spectrum['data']
+        if self.decimation == 'stride':
+            data = data[::ceil(float(len(data)) / self.max_points)]
+        data = [x for x in data if is_number(x[1]) and not isnan(float(x[1]))]
+        wave = np.array([float(x[0]) for x in data], dtype=float)
+        flux = np.array([float(x[1]) for x in data], dtype=float)
+        if self.decimation == 'minmax' and len(flux) > self.max_points:
+            keep = _minmax_indices(flux, self.max_points // 2)
+            wave = wave[keep]
+            flux = flux[keep]
+
+        if redshift is not None:
+            wave = wave * (1.0 + redshift)
+        # Convert microns to angstroms for both labeled and unlabeled spectra
+        if wave.max() < 10.0 or spectrum.get('u_wavelengths').lower() in [
+                'micron', 'µm'
+        ]:
+            wave = 1.0e4 * wave
+
+        exclude = np.zeros(len(wave), dtype=bool)
+        for exclusion in spectrum.get('exclude', []):
+            if 'below' in exclusion:
+                exclude |= wave <= float(exclusion['below'])
+            elif 'above' in exclusion:
+                exclude |= wave >= float(exclusion['above'])
+        return wave[~exclude], flux[~exclude]
+
+
+def _minmax_indices(values, num_bins):
+    """Sorted indices of the minimum and maximum `values` in each bin."""
+    size = int(ceil(float(len(values)) / num_bins))
+    num_bins = int(ceil(float(len(values)) / size))
+    padded = np.full(num_bins * size, np.nan)
+    padded[:len(values)] = values
+    padded = padded.reshape(num_bins, size)
+    starts = np.arange(num_bins) * size
+    return np.unique(
+        np.concatenate([starts + np.nanargmin(padded, axis=1),
+                        starts + np.nanargmax(padded, axis=1)]))
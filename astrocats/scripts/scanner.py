@@ -0,0 +1,131 @@
+"""Read and parse the entry files of a catalog, in the scripts' order.
+
+`scan` passes once over the files, for several consumers producing derived
+files (e.g. `hostcat.HostCatalog`, `hammertime.SkyMap`).
+"""
+import json
+import multiprocessing
+import os
+from collections import OrderedDict
+
+from astrocats.catalog.utils import pbar
+from astrocats.scripts.events import get_event_text
+
+__all__ = ['EntryScanner', 'load_entry', 'scan']
+
+
+def load_entry(eventfile):
+    """Contents of the (possibly gzipped) entry file `eventfile`."""
+    return json.loads(get_event_text(eventfile), object_pairs_hook=OrderedDict)
+
+
+def _load_item(eventfile):
+    return eventfile, load_entry(eventfile)
+
+
+class EntryScanner(object):
+    """Pass over the entry files of a catalog, parsing each file once.
+
+    The files are scanned in (case insensitive) alphabetical order, as by the
+    catalog scripts, by iterating over the scanner, which yields each file
+    with its parsed contents (the `OrderedDict` holding the entry).
+
+    Files can be parsed by a pool of `processes`, which is mainly worthwhile
+    for compressed files, as the parsed entries are sent back to this
+    process.  Files which no longer exist are skipped.
+
+    Entries loaded with `keep` (see `load`) are kept until they are loaded
+    again, e.g. by a later stage of a script, instead of being parsed twice.
+
+    Arguments
+    ---------
+    files : list of str
+        The entry files (e.g. from `repo_file_list`).
+    processes : int
+        Number of processes parsing the files; one parses them in this
+        process.
+    cache_size : int or `None`
+        Maximum number of entries kept between `load` calls (the least
+        recently kept are discarded first); `None` for no limit.
+
+    """
+
+    def __init__(self, files, processes=1, cache_size=None):
+        self.files = sorted(files, key=lambda s: s.lower())
+        self.processes = processes
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        return
+
+    def __len__(self):
+        return len(self.files)
+
+    def __iter__(self):
+        """Yield the name and parsed contents of each file, in order."""
+        files = [x for x in self.files if os.path.isfile(x)]
+        if self.processes <= 1:
+            for eventfile in files:
+                yield eventfile, self.load(eventfile)
+            return
+
+        pool = multiprocessing.Pool(self.processes)
+        try:
+            for item in pool.imap(_load_item, files, chunksize=8):
+                yield item
+        finally:
+            pool.terminate()
+            pool.join()
+        return
+
+    def load(self, eventfile, keep=False):
+        """Parsed contents of `eventfile`, parsing it if not kept before.
+
+        Arguments
+        ---------
+        eventfile : str
+        keep : bool
+            Keep the entry until it is next loaded.  The entry is discarded
+            if the file is changed in the meantime.
+
+        """
+        stat = os.stat(eventfile)
+        key = (stat.st_mtime_ns, stat.st_size)
+        cached = self._cache.pop(eventfile, None)
+        if cached is not None and cached[0] == key:
+            data = cached[1]
+        else:
+            data = load_entry(eventfile)
+        if keep and self.cache_size != 0:
+            self._cache[eventfile] = (key, data)
+            while (self.cache_size is not None and
+                   len(self._cache) > self.cache_size):
+                self._cache.popitem(last=False)
+        return data
+
+
+def scan(consumers, processes=1, desc=''):
+    """Pass once over the entry files of all `consumers`, parsing each once.
+
+    Each consumer lists the entry files it reads in its `files`, and is
+    called as ``consumer.add(eventfile, data)`` for each of them, in the
+    order of `EntryScanner`, and then as ``consumer.finish()``.  The parsed
+    `data` is shared between consumers, which must not modify it.
+
+    Arguments
+    ---------
+    consumers : list
+    processes : int
+        Number of processes parsing the files (see `EntryScanner`).
+    desc : str
+        Description shown by the progress bar.
+
+    """
+    wanted = [set(consumer.files) for consumer in consumers]
+    scanner = EntryScanner(set().union(*wanted), processes=processes)
+    for eventfile, data in pbar(scanner, desc, total=len(scanner)):
+        for consumer, files in zip(consumers, wanted):
+            if eventfile in files:
+                consumer.add(eventfile, data)
+    for consumer in consumers:
+        consumer.finish()
+    return
@@ -1,9 +1,9 @@
 import argparse
 import csv
-import filecmp
 import gzip
 import hashlib
 import json
+import multiprocessing
 import operator
 import os
 import re
@@ -17,7 +17,7 @@ from collections import OrderedDict
 from copy import deepcopy
 from decimal import Decimal
 from glob import glob
-from math import ceil, isnan, pi
+from math import pi
 from statistics import mean
 
 import inflect
@@ -26,15 +26,20 @@ import requests
 from astrocats.catalog.utils import (bandaliasf, bandcodes, bandcolorf,
                                      bandgroupf, bandshortaliasf, bandwavef,
                                      bandwavelengths, get_sig_digits,
-                                     is_number, pretty_num, radiocolorf,
-                                     round_sig, tq, xraycolorf, listify)
-from astrocats.scripts.events import get_event_filename, get_event_text
+                                     is_number, pbar, pretty_num, radiocolorf,
+                                     round_sig, xraycolorf, listify)
+from astrocats.scripts.events import get_event_filename
+from astrocats.scripts.hostimages import collect_host_images
+from astrocats.scripts.lightcurves import MagnitudeColumns
+from astrocats.scripts.previews import SpectrumPreviews
 from astrocats.scripts.repos import (get_rep_folder, get_rep_folders,
                                      repo_file_list)
+from astrocats.scripts.scanner import EntryScanner
 from astropy import units as un
 from astropy.coordinates import SkyCoord as coord
 from astropy.time import Time as astrotime
 from bokeh.core.properties import value
+from bokeh.document import Document
 from bokeh.embed import file_html
 from bokeh.layouts import row as bokehrow
 from bokeh.layouts import column, layout
@@ -43,7 +48,6 @@ from bokeh.models import (ColumnDataSource, CustomJS, DatetimeAxis, HoverTool,
 from bokeh.models.widgets import Select
 from bokeh.plotting import Figure, reset_output
 from bokeh.resources import CDN
-from bs4 import BeautifulSoup
 from palettable import cubehelix
 from past.builtins import basestring
 
@@ -71,6 +75,38 @@ parser.add_argument(
     help='Don\'t collect host galaxy images',
     default=True,
     action='store_false')
+parser.add_argument(
+    '--host-threads',
+    '-ht',
+    dest='hostthreads',
+    help='Number of host galaxy images downloaded at the same time',
+    default=4,
+    type=int)
+parser.add_argument(
+    '--kept-entries',
+    '-ke',
+    dest='keptentries',
+    help='Maximum number of entries read when finding host images which are '
+    'kept, rather than read again, for generating their pages (only when '
+    'these are generated one by one)',
+    default=10000,
+    type=int)
+parser.add_argument(
+    '--spectrum-decimation',
+    '-sd',
+    dest='spectrumdecimation',
+    help='How to downsample long spectra for plotting: keep every n-th point '
+    '("stride") or the extremes of each bin ("minmax")',
+    default='stride',
+    choices=SpectrumPreviews.DECIMATIONS)
+parser.add_argument(
+    '--plot-json',
+    '-pj',
+    dest='plotjson',
+    help='Write the plots of each event as a Bokeh document (JSON), loaded '
+    'by a script shared by all pages, instead of a standalone page',
+    default=False,
+    action='store_true')
 parser.add_argument(
     '--force-html',
     '-fh',
@@ -135,6 +171,14 @@ parser.add_argument(
     help='Use copied JSON files when generating catalog',
     default=False,
     action='store_true')
+parser.add_argument(
+    '--processes',
+    '-p',
+    dest='processes',
+    help='Number of processes generating event pages (default: one per CPU; '
+    'pages are generated one by one where processes cannot be forked)',
+    default=None,
+    type=int)
 args = parser.parse_args()
 
 infl = inflect.engine()
@@ -178,6 +222,7 @@ outdir = "astrocats/" + moduledir + "/output/"
 cachedir = "cache/"
 jsondir = "json/"
 htmldir = "html/"
+plotloader = "event-plot.js"
 
 travislimit = 100
 
@@ -193,6 +238,28 @@ linkdir = "https://" + moduleurl + "/" + modulename + "/"
 
 testsuffix = '.test' if args.test else ''
 
+# Page of an event when its plots are in a separate document (`--plot-json`),
+# given the name of the event, the BokehJS resources and the document's URL
+eventshell = ('<!DOCTYPE html>\n<html lang="en">\n<head>\n'
+              '<meta charset="utf-8">\n<title>{}</title>\n{}\n</head>\n'
+              '<body>\n<div class="bk-root" id="event-plot" data-plot="{}">'
+              '</div>\n<script type="text/javascript" src="' + plotloader +
+              '"></script>\n</body>\n</html>\n')
+
+# Script shared by the pages of `eventshell`, embedding the plot document
+plotloaderjs = '''(function() {
+  var elem = document.getElementById('event-plot');
+  var request = new XMLHttpRequest();
+  request.onload = function() {
+    var docs_json = {plot: JSON.parse(request.responseText)};
+    Bokeh.embed.embed_items(docs_json, [{docid: 'plot',
+                                         elementid: 'event-plot'}]);
+  };
+  request.open('GET', elem.getAttribute('data-plot'));
+  request.send();
+})();
+'''
+
 mycolors = cubehelix.perceptual_rainbow_16.hex_colors[:14]
 
 columnkey = [
@@ -305,6 +372,12 @@ def event_filename(name):
 
 coldict = dict(list(zip(list(range(len(columnkey))), columnkey)))
 
+# Fields of rows which are not required in the main catalog file
+prunedtags = set([
+    'source', 'u_value', 'e_value', 'e_upper_value', 'e_lower_value',
+    'derived'
+])
+
 
 def touch(fname, times=None):
     with open(fname, 'a'):
@@ -350,6 +423,59 @@ def md5file(fname):
     return hash_md5.hexdigest()
 
 
+def pruned_entry(entry):
+    """Copy of the catalog `entry` without the fields of its rows (e.g.
+    'source') not required for the main catalog file.
+
+    Only the rows with pruned fields are copied, the rest is shared with
+    `entry`.
+    """
+    pruned = OrderedDict()
+    for col, value in entry.items():
+        if isinstance(value, list):
+            value = [
+                OrderedDict((key, val) for key, val in row.items()
+                            if key not in prunedtags)
+                if isinstance(row, dict) and not prunedtags.isdisjoint(row)
+                else row for row in value
+            ]
+        pruned[col] = value
+    return pruned
+
+
+def write_catalog_json(entries, prefix):
+    """Write the list of `entries` to `prefix` + '.json', '.min.json' and
+    '.min.json.gz', one entry at a time.
+
+    The files are the same as those written by `json.dumps` of the whole
+    list (indented by tabs, and minified); but only one entry is converted
+    to a string at once, and the three are written in a single pass.
+    """
+    with open(prefix + '.json' + testsuffix, 'w') as f_full, open(
+            prefix + '.min.json' + testsuffix, 'w') as f_min, gzip.open(
+                prefix + '.min.json.gz' + testsuffix, 'wt') as f_gz:
+        for ee, entry in enumerate(entries):
+            # Indent each entry by one more level, as an element of the list;
+            # JSON strings cannot contain line breaks, so all are indented.
+            full = json.dumps(entry, indent='\t', separators=(',', ':'))
+            full = ('[\n\t' if ee == 0 else ',\n\t') + full.replace(
+                '\n', '\n\t')
+            mini = ('[' if ee == 0 else ',') + json.dumps(
+                entry, separators=(',', ':'))
+            f_full.write(full)
+            f_min.write(mini)
+            f_gz.write(mini)
+        if entries:
+            f_full.write('\n]')
+            f_min.write(']')
+            f_gz.write(']')
+        else:
+            f_full.write('[]')
+            f_min.write('[]')
+            f_gz.write('[]')
+    return
+
+
 catalog = OrderedDict()
 catalogcopy = OrderedDict()
 csvpages = [[
@@ -388,31 +514,108 @@ if os.path.isfile(outdir + cachedir + 'md5s.json'):
 else:
     md5dict = {}
 
-for fcnt, eventfile in enumerate(tq(sorted(files, key=lambda s: s.lower()))):
+# Checksums of the event files of this run, computed once for all stages
+checksums = {}
+
+
+def event_checksum(eventfile):
+    """MD5 checksum of `eventfile`, computed the first time it is needed."""
+    if eventfile not in checksums:
+        checksums[eventfile] = md5file(eventfile)
+    return checksums[eventfile]
+
+# Results of `process_event` for the events unchanged since the last run (see
+# `cached_result`), and those of this run, to be saved for the next one.
+if (os.path.isfile(outdir + cachedir + 'rows.json') and not args.forcehtml and
+        not args.test):
+    with open(outdir + cachedir + 'rows.json', 'r') as f:
+        filetext = f.read()
+    rowdict = json.loads(filetext, object_pairs_hook=OrderedDict)
+else:
+    rowdict = {}
+newrowdict = OrderedDict()
+
+# Downsampled spectra, saved in the cache for the next runs
+spectrumpreviews = SpectrumPreviews(
+    outdir + cachedir + 'spectra/', decimation=args.spectrumdecimation)
+# Keys of the previews used in this run (including those of unchanged events,
+# see `cached_result`); the others are removed from the cache at the end
+usedpreviews = set()
+
+
+def cached_result(eventfile, fileeventname, checksum):
+    """The result of `process_event` from the last run, if still valid.
+
+    An event is only skipped if its file has the same checksum as when its
+    result was cached, and its page exists (so it would not be regenerated);
+    `None` is returned otherwise.  The cache is ignored with `--forcehtml`,
+    which should be used after changing this script.
+    """
+    if not args.writecatalog or args.eventlist or eventfile not in rowdict:
+        return None
+    if rowdict[eventfile]['checksum'] != checksum:
+        return None
+    if not os.path.isfile(outdir + htmldir + fileeventname + ".html"):
+        return None
+    return rowdict[eventfile]
+
+
+def process_event(fcnt, eventfile):
+    """Generate the page of one event, and its row of the catalog.
+
+    Run in a separate process (see `--processes`), so nothing global is
+    changed: everything to be added to the catalog-wide data (`catalogcopy`,
+    `md5dict`, `hostimgdict`, `csvpages`, `sourcedict`, `usedpreviews` and
+    the counts of events and data) is returned instead, and merged in order
+    by `merge_event_result`.  If the event fails, the result has whatever was
+    collected before the failure, as was added by the serial loop.  Events
+    unchanged since the last run are not processed again: their result from
+    that run is returned (see `cached_result`).
+    """
+    result = {
+        'eventfile': eventfile,
+        'checksum': None,
+        'failed': False,
+        'catalog': OrderedDict(),
+        'md5s': OrderedDict(),
+        'hostimgs': OrderedDict(),
+        'csvpages': [],
+        'sources': OrderedDict(),
+        'lcspye': [],
+        'lconly': [],
+        'sponly': [],
+        'lcspno': [],
+        'hasalc': [],
+        'hasasp': [],
+        'totalphoto': 0,
+        'totalspectra': 0,
+        'previews': [],
+        'stop': False
+    }
     try:
         fileeventname = os.path.splitext(os.path.basename(eventfile))[0].replace(
             '.json', '')
         if args.eventlist and fileeventname not in args.eventlist:
-            continue
-
-        if args.travis and fcnt >= travislimit:
-            break
+            return result
 
         entry_changed = False
-        checksum = md5file(eventfile)
+        checksum = event_checksum(eventfile)
         if eventfile not in md5dict or md5dict[eventfile] != checksum:
             entry_changed = True
-            md5dict[eventfile] = checksum
-
-        filetext = get_event_text(eventfile)
+            result['md5s'][eventfile] = checksum
+        else:
+            cached = cached_result(eventfile, fileeventname, checksum)
+            if cached is not None:
+                return cached
+        result['checksum'] = checksum
 
-        catalog.update(json.loads(filetext, object_pairs_hook=OrderedDict))
+        catalog.update(scanner.load(eventfile))
         entry = next(reversed(catalog))
 
         eventname = entry
 
         if args.eventlist and eventname not in args.eventlist:
-            continue
+            return result
 
         if args.verbose:
             print(eventname)
@@ -754,61 +957,18 @@ for fcnt, eventfile in enumerate(tq(sorted(files, key=lambda s: s.lower()))):
                     mmphototime, mmphototimelowererrs))])
 
         if photoavail and dohtml and args.writehtml:
-            phototime = [
-                mean([float(y) for y in listify(x['time'])]) for x in catalog[entry]['photometry']
-                if 'magnitude' in x and 'realization' not in x
-            ]
-            phototimelowererrs = [
-                float(x['e_lower_time'])
-                if ('e_lower_time' in x and 'e_upper_time' in x) else
-                (float(x['e_time']) if 'e_time' in x else 0.)
-                for x in catalog[entry]['photometry'] if 'magnitude' in x
-                and 'realization' not in x
-            ]
-            phototimeuppererrs = [
-                float(x['e_upper_time'])
-                if ('e_lower_time' in x and 'e_upper_time' in x) else
-                (float(x['e_time']) if 'e_time' in x else 0.)
-                for x in catalog[entry]['photometry'] if 'magnitude' in x
-                and 'realization' not in x
-            ]
-            photoAB = [
-                float(x['magnitude']) for x in catalog[entry]['photometry']
-                if 'magnitude' in x and 'realization' not in x
-            ]
-            photoABlowererrs = [
-                float(x['e_lower_magnitude'])
-                if ('e_lower_magnitude' in x) else (float(x['e_magnitude'])
-                                                    if 'e_magnitude' in x else 0.)
-                for x in catalog[entry]['photometry'] if 'magnitude' in x
-                and 'realization' not in x
-            ]
-            photoABuppererrs = [
-                float(x['e_upper_magnitude'])
-                if ('e_upper_magnitude' in x) else (float(x['e_magnitude'])
-                                                    if 'e_magnitude' in x else 0.)
-                for x in catalog[entry]['photometry'] if 'magnitude' in x
-                and 'realization' not in x
-            ]
-            photoband = [(bandaliasf(x['band']) if 'band' in x else '?')
-                         for x in catalog[entry]['photometry'] if 'magnitude' in x
-                         and 'realization' not in x]
-            photoinstru = [(x['instrument'] if 'instrument' in x else '')
-                           for x in catalog[entry]['photometry']
-                           if 'magnitude' in x and 'realization' not in x]
-            photosource = [
-                ', '.join(
-                    str(j)
-                    for j in sorted(int(i) for i in x['source'].split(',')))
-                for x in catalog[entry]['photometry'] if 'magnitude' in x
-                and 'realization' not in x
-            ]
-            phototype = [(x['upperlimit'] if 'upperlimit' in x else False)
-                         for x in catalog[entry]['photometry'] if 'magnitude' in x
-                         and 'realization' not in x]
-            photocorr = [('kcorr' if 'kcorrected' in x else 'scorr' if 'scorrected' in x else 'raw')
-                         for x in catalog[entry]['photometry'] if 'magnitude' in x
-                         and 'realization' not in x]
+            photocols = MagnitudeColumns(catalog[entry]['photometry'])
+            phototime = photocols.time.tolist()
+            phototimelowererrs = photocols.time_lower.tolist()
+            phototimeuppererrs = photocols.time_upper.tolist()
+            photoAB = photocols.mag.tolist()
+            photoABlowererrs = photocols.mag_lower.tolist()
+            photoABuppererrs = photocols.mag_upper.tolist()
+            photoband = photocols.band
+            photoinstru = photocols.instrument
+            photosource = photocols.source
+            phototype = photocols.upperlimit
+            photocorr = photocols.corr
 
             isdetection = phototype.count(False)
 
@@ -1038,6 +1198,8 @@ for fcnt, eventfile in enumerate(tq(sorted(files, key=lambda s: s.lower()))):
                 err_xs.append((x - xlowerr, x + xupperr))
                 err_ys.append((y - yupperr, y + ylowerr))
 
+            absmags = ('maxabsmag' in catalog[entry] and
+                       'maxappmag' in catalog[entry])
             sources = []
             corrects = ['raw', 'kcorr', 'scorr']
             glyphs = [[] for x in range(len(corrects))]
@@ -1045,39 +1207,10 @@ for fcnt, eventfile in enumerate(tq(sorted(files, key=lambda s: s.lower()))):
             for ci, corr in enumerate(corrects):
                 for band in bandset:
                     bandname = bandaliasf(band)
-                    indb = [i for i, j in enumerate(photoband) if j == band]
-                    indt = [i for i, j in enumerate(phototype) if not j]
-                    indnex = [
-                        i for i, j in enumerate(phototimelowererrs) if j == 0.
-                    ]
-                    indyex = [
-                        i for i, j in enumerate(phototimelowererrs) if j > 0.
-                    ]
-                    indney = [i for i, j in enumerate(photoABuppererrs) if j == 0.]
-                    indyey = [i for i, j in enumerate(photoABuppererrs) if j > 0.]
-                    indc = [i for i, j in enumerate(photocorr) if j == corr]
-                    indne = set(indb).intersection(indt).intersection(
-                        indc).intersection(indney).intersection(indnex)
-                    indye = set(indb).intersection(indt).intersection(
-                        indc).intersection(set(indyey).union(indyex))
-
-                    indt = [i for i, j in enumerate(phototype) if j]
-                    ind = set(indb).intersection(indt).intersection(indc)
-                    if ind:
-                        data = dict(
-                            x=[phototime[i] for i in ind],
-                            y=[photoAB[i] for i in ind],
-                            lerr=[photoABlowererrs[i] for i in ind],
-                            uerr=[photoABuppererrs[i] for i in ind],
-                            desc=[photoband[i] for i in ind],
-                            instr=[photoinstru[i] for i in ind],
-                            src=[photosource[i] for i in ind])
-                        if 'maxabsmag' in catalog[
-                                entry] and 'maxappmag' in catalog[entry]:
-                            data['yabs'] = [photoAB[i] - distancemod for i in ind]
-                        if hastimeerrs:
-                            data['xle'] = [phototimelowererrs[i] for i in ind]
-                            data['xue'] = [phototimeuppererrs[i] for i in ind]
+                    ind, indne, indye = photocols.select(band, corr)
+                    if len(ind):
+                        data = photocols.data(
+                            ind, distancemod if absmags else None, hastimeerrs)
 
                         sources.append(ColumnDataSource(data))
                         # Currently Bokeh doesn't support tooltips for
@@ -1102,25 +1235,11 @@ for fcnt, eventfile in enumerate(tq(sorted(files, key=lambda s: s.lower()))):
                             p1.inverted_triangle([None], [None], **uppdict))
                         ttglyphs[ci].append(glyphs[ci][-1])
 
-                    if indne:
+                    if len(indne):
                         noerrorlegend = value(bandname)
 
-                        data = dict(
-                            x=[phototime[i] for i in indne],
-                            y=[photoAB[i] for i in indne],
-                            lerr=[photoABlowererrs[i] for i in indne],
-                            uerr=[photoABuppererrs[i] for i in indne],
-                            desc=[photoband[i] for i in indne],
-                            instr=[photoinstru[i] for i in indne],
-                            src=[photosource[i] for i in indne])
-                        if 'maxabsmag' in catalog[
-                                entry] and 'maxappmag' in catalog[entry]:
-                            data['yabs'] = [
-                                photoAB[i] - distancemod for i in indne
-                            ]
-                        if hastimeerrs:
-                            data['xle'] = [phototimelowererrs[i] for i in indne]
-                            data['xue'] = [phototimeuppererrs[i] for i in indne]
+                        data = photocols.data(
+                            indne, distancemod if absmags else None, hastimeerrs)
 
                         sources.append(ColumnDataSource(data))
                         glyphs[ci].append(
@@ -1134,23 +1253,9 @@ for fcnt, eventfile in enumerate(tq(sorted(files, key=lambda s: s.lower()))):
                                 size=4))
                         ttglyphs[ci].append(glyphs[ci][-1])
 
-                    if indye:
-                        data = dict(
-                            x=[phototime[i] for i in indye],
-                            y=[photoAB[i] for i in indye],
-                            lerr=[photoABlowererrs[i] for i in indye],
-                            uerr=[photoABuppererrs[i] for i in indye],
-                            desc=[photoband[i] for i in indye],
-                            instr=[photoinstru[i] for i in indye],
-                            src=[photosource[i] for i in indye])
-                        if 'maxabsmag' in catalog[
-                                entry] and 'maxappmag' in catalog[entry]:
-                            data['yabs'] = [
-                                photoAB[i] - distancemod for i in indye
-                            ]
-                        if hastimeerrs:
-                            data['xle'] = [phototimelowererrs[i] for i in indye]
-                            data['xue'] = [phototimeuppererrs[i] for i in indye]
+                    if len(indye):
+                        data = photocols.data(
+                            indye, distancemod if absmags else None, hastimeerrs)
 
                         sources.append(ColumnDataSource(data))
                         glyphs[ci].append(
@@ -1253,9 +1358,6 @@ for fcnt, eventfile in enumerate(tq(sorted(files, key=lambda s: s.lower()))):
                 photochecks = ''
 
         if spectraavail and dohtml and args.writehtml:
-            spectrumwave = []
-            spectrumflux = []
-            spectrumerrs = []
             spectrummjdmax = []
             hasepoch = True
             if 'redshift' in catalog[entry]:
@@ -1264,38 +1366,14 @@ for fcnt, eventfile in enumerate(tq(sorted(files, key=lambda s: s.lower()))):
                 filter(None, [
                     x if 'data' in x else None for x in catalog[entry]['spectra']
                 ]))
+            prunedwave = []
+            prunedflux = []
             for spectrum in catalog[entry]['spectra']:
-                spectrumdata = deepcopy(spectrum['data'])
-                oldlen = len(spectrumdata)
-                specslice = ceil(float(len(spectrumdata)) / 10000)
-                spectrumdata = spectrumdata[::specslice]
-                spectrumdata = [
-                    x for x in spectrumdata
-                    if is_number(x[1]) and not isnan(float(x[1]))
-                ]
-                specrange = range(len(spectrumdata))
-
-                if 'deredshifted' in spectrum and spectrum[
-                        'deredshifted'] and 'redshift' in catalog[entry]:
-                    spectrumwave.append([
-                        float(spectrumdata[x][0]) * (1.0 + z) for x in specrange
-                    ])
-                else:
-                    spectrumwave.append(
-                        [float(spectrumdata[x][0]) for x in specrange])
-
-                # Convert microns to angstroms for both labeled and unlabeled spectra
-                if max(spectrumwave[-1]) < 10.0 or spectrum.get('u_wavelengths').lower() in ['micron', 'µm']:
-                    spectrumwave[-1] = [1.0e4 * x for x in spectrumwave[-1]]
-
-                spectrumflux.append([float(spectrumdata[x][1]) for x in specrange])
-                if 'errorunit' in spectrum:
-                    spectrumerrs.append(
-                        [float(spectrumdata[x][2]) for x in specrange])
-                    spectrumerrs[-1] = [
-                        x if is_number(x) and not isnan(float(x)) else 0.
-                        for x in spectrumerrs[-1]
-                    ]
+                wave, flux = spectrumpreviews.get(
+                    spectrum, z if 'redshift' in catalog[entry] else None,
+                    used=result['previews'])
+                prunedwave.append(wave)
+                prunedflux.append(flux)
 
                 if 'u_time' not in spectrum or 'time' not in spectrum:
                     hasepoch = False
@@ -1308,29 +1386,6 @@ for fcnt, eventfile in enumerate(tq(sorted(files, key=lambda s: s.lower()))):
 
             nspec = len(catalog[entry]['spectra'])
 
-            prunedwave = []
-            prunedflux = []
-            for i in reversed(range(nspec)):
-                ri = nspec - i - 1
-                prunedwave.append([])
-                prunedflux.append([])
-                for wi, wave in enumerate(spectrumwave[i]):
-                    exclude = False
-                    if 'exclude' in catalog[entry]['spectra'][i]:
-                        for exclusion in catalog[entry]['spectra'][i]['exclude']:
-                            if 'below' in exclusion:
-                                if wave <= float(exclusion['below']):
-                                    exclude = True
-                            elif 'above' in exclusion:
-                                if wave >= float(exclusion['above']):
-                                    exclude = True
-                    if not exclude:
-                        prunedwave[ri].append(wave)
-                        prunedflux[ri].append(spectrumflux[i][wi])
-
-            prunedwave = list(reversed(prunedwave))
-            prunedflux = list(reversed(prunedflux))
-
             prunedscaled = deepcopy(prunedflux)
             for f, flux in enumerate(prunedscaled):
                 std = np.std(flux)
@@ -2282,84 +2337,22 @@ for fcnt, eventfile in enumerate(tq(sorted(files, key=lambda s: s.lower()))):
 
                 imgsrc = ''
                 hasimage = True
+                # Images are fetched beforehand, by `collect_host_images`
                 if eventname in hostimgdict:
                     imgsrc = hostimgdict[eventname]
-                elif args.collecthosts:
-                    try:
-                        response = urllib.request.urlopen(
-                            'http://skyserver.sdss.org/dr13/SkyServerWS/ImgCutout/getjpeg?ra='
-                            + str(c.ra.deg) + '&dec=' + str(c.dec.deg) + '&scale='
-                            + str(sdssimagescale) + '&width=500&height=500&opt=G',
-                            timeout=60)
-                        resptxt = response.read()
-                    except (KeyboardInterrupt, SystemExit):
-                        raise
-                    except Exception:
-                        hasimage = False
-                    else:
-                        with open(outdir + htmldir + fileeventname + '-host.jpg',
-                                  'wb') as f:
-                            f.write(resptxt)
-                        imgsrc = 'SDSS'
-
-                    if hasimage and filecmp.cmp(
-                            outdir + htmldir + fileeventname + '-host.jpg',
-                            'astrocats/' + moduledir + '/input/missing.jpg'):
-                        hasimage = False
-
-                    if not hasimage:
-                        hasimage = True
-                        url = (
-                            "http://skyview.gsfc.nasa.gov/current/cgi/runquery.pl?Position="
-                            + str(urllib.parse.quote_plus(snra + " " + sndec)) +
-                            "&coordinates=J2000&coordinates=&projection=Tan&pixels=500&size="
-                            + str(dssimagescale) +
-                            "&float=on&scaling=Log&resolver=SIMBAD-NED" +
-                            "&Sampler=_skip_&Deedger=_skip_&rotation=&Smooth=&lut=colortables%2Fb-w-linear.bin&PlotColor=&grid=_skip_&gridlabels=1"
-                            +
-                            "&catalogurl=&CatalogIDs=on&RGB=1&survey=DSS2+IR&survey=DSS2+Red&survey=DSS2+Blue&IOSmooth=&contour=&contourSmooth=&ebins=null"
-                        )
-
-                        try:
-                            response = urllib.request.urlopen(url, timeout=60)
-                            bandsoup = BeautifulSoup(response, "html5lib")
-                        except (KeyboardInterrupt, SystemExit):
-                            raise
-                        except Exception:
-                            hasimage = False
-                        else:
-                            images = bandsoup.findAll('img')
-                            imgname = ''
-                            for image in images:
-                                if "Quicklook RGB image" in image.get('alt', ''):
-                                    imgname = image.get('src', '').split('/')[-1]
-
-                            if imgname:
-                                try:
-                                    response = urllib.request.urlopen(
-                                        'http://skyview.gsfc.nasa.gov/tempspace/fits/'
-                                        + imgname)
-                                    with open(outdir + htmldir + fileeventname +
-                                              '-host.jpg', 'wb') as f:
-                                        f.write(response.read())
-                                    imgsrc = 'DSS'
-                                except (KeyboardInterrupt, SystemExit):
-                                    raise
-                                except Exception:
-                                    hasimage = False
-                            else:
-                                hasimage = False
+                else:
+                    hasimage = False
 
             if hasimage:
                 if imgsrc == 'SDSS':
-                    hostimgdict[eventname] = 'SDSS'
+                    result['hostimgs'][eventname] = 'SDSS'
                     skyhtml = (
                         '<a href="http://skyserver.sdss.org/DR13/en/tools/chart/navi.aspx?opt=G&ra='
                         + str(c.ra.deg) + '&dec=' + str(c.dec.deg) +
                         '&scale=0.15"><img src="' + urllib.parse.quote(
                             fileeventname) + '-host.jpg" width=250></a>')
                 elif imgsrc == 'DSS':
-                    hostimgdict[eventname] = 'DSS'
+                    result['hostimgs'][eventname] = 'DSS'
                     url = (
                         "http://skyview.gsfc.nasa.gov/current/cgi/runquery.pl?Position="
                         + str(urllib.parse.quote_plus(snra + " " + sndec)) +
@@ -2374,7 +2367,7 @@ for fcnt, eventfile in enumerate(tq(sorted(files, key=lambda s: s.lower()))):
                                urllib.parse.quote(fileeventname) +
                                '-host.jpg" width=250></a>')
             else:
-                hostimgdict[eventname] = 'None'
+                result['hostimgs'][eventname] = 'None'
 
         if dohtml and args.writehtml:
             # if (photoavail and spectraavail) and dohtml and args.writehtml:
@@ -2400,7 +2393,20 @@ for fcnt, eventfile in enumerate(tq(sorted(files, key=lambda s: s.lower()))):
                 toolbar_location=None)
 
             html = '<html><head><title>' + eventname + '</title>'
-            if photoavail or spectraavail or radioavail or xrayavail:
+            if ((photoavail or spectraavail or radioavail or xrayavail) and
+                    args.plotjson):
+                # Only the document of the plots is written for each event,
+                # the page loads it with the shared `plotloader`
+                plotdoc = Document()
+                plotdoc.add_root(p)
+                with gzip.open(outdir + htmldir + fileeventname +
+                               "-plot.json.gz", 'wt') as fff:
+                    touch(outdir + htmldir + fileeventname + "-plot.json")
+                    fff.write(plotdoc.to_json_string())
+                html = eventshell.format(
+                    eventname, CDN.render_css() + CDN.render_js(),
+                    urllib.parse.quote(fileeventname) + '-plot.json')
+            elif photoavail or spectraavail or radioavail or xrayavail:
                 html = file_html(p, CDN, eventname)
                 # html = html + '''<link href="https://cdn.pydata.org/bokeh/release/bokeh-0.11.0.min.css" rel="stylesheet" type="text/css">
                 #    <script src="https://cdn.pydata.org/bokeh/release/bokeh-0.11.0.min.js"></script>''' + script + '</head><body>'
@@ -2680,7 +2686,7 @@ for fcnt, eventfile in enumerate(tq(sorted(files, key=lambda s: s.lower()))):
             # Things David wants in this file: names (aliases), max mag, max mag
             # date (gregorian), type, redshift (helio), redshift (host), r.a.,
             # dec., # obs., link
-            csvpages.append([
+            result['csvpages'].append([
                 entry, ",".join(
                     [x['value'] for x in catalog[entry].get('alias', [{'value': entry}])]),
                 get_first_value(entry, 'maxappmag'),
@@ -2704,10 +2710,10 @@ for fcnt, eventfile in enumerate(tq(sorted(files, key=lambda s: s.lower()))):
                             'bibcode': sourcerow['bibcode'],
                             'count': 0
                         }
-                    if strippedname in sourcedict:
-                        sourcedict[strippedname] += 1
+                    if strippedname in result['sources']:
+                        result['sources'][strippedname] += 1
                     else:
-                        sourcedict[strippedname] = 1
+                        result['sources'][strippedname] = 1
 
                 for key in catalog[entry].keys():
                     if isinstance(catalog[entry][key], list):
@@ -2729,45 +2735,178 @@ for fcnt, eventfile in enumerate(tq(sorted(files, key=lambda s: s.lower()))):
                     catalog[entry]['references'] = ','.join(
                         [y['bibcode'] for y in ssources[:5]])
 
-            lcspye.append(catalog[entry]['numphoto'] >= 5 and
-                          catalog[entry]['numspectra'] > 0)
-            lconly.append(catalog[entry]['numphoto'] >= 5 and
-                          catalog[entry]['numspectra'] == 0)
-            sponly.append(catalog[entry]['numphoto'] < 5 and
-                          catalog[entry]['numspectra'] > 0)
-            lcspno.append(catalog[entry]['numphoto'] < 5 and
-                          catalog[entry]['numspectra'] == 0)
+            result['lcspye'].append(catalog[entry]['numphoto'] >= 5 and
+                                    catalog[entry]['numspectra'] > 0)
+            result['lconly'].append(catalog[entry]['numphoto'] >= 5 and
+                                    catalog[entry]['numspectra'] == 0)
+            result['sponly'].append(catalog[entry]['numphoto'] < 5 and
+                                    catalog[entry]['numspectra'] > 0)
+            result['lcspno'].append(catalog[entry]['numphoto'] < 5 and
+                                    catalog[entry]['numspectra'] == 0)
 
-            hasalc.append(catalog[entry]['numphoto'] >= 5)
-            hasasp.append(catalog[entry]['numspectra'] > 0)
+            result['hasalc'].append(catalog[entry]['numphoto'] >= 5)
+            result['hasasp'].append(catalog[entry]['numspectra'] > 0)
 
-            totalphoto += catalog[entry]['numphoto']
-            totalspectra += catalog[entry]['numspectra']
+            result['totalphoto'] += catalog[entry]['numphoto']
+            result['totalspectra'] += catalog[entry]['numspectra']
 
             # Delete unneeded data from catalog, add blank entries when data
             # missing.
-            catalogcopy[entry] = OrderedDict()
+            result['catalog'][entry] = OrderedDict()
             for col in columnkey:
                 if col in catalog[entry]:
-                    catalogcopy[entry][col] = deepcopy(catalog[entry][col])
+                    result['catalog'][entry][col] = deepcopy(
+                        catalog[entry][col])
 
         del catalog[entry]
 
         if args.test and spectraavail and photoavail:
-            break
+            result['stop'] = True
     except Exception as ex:
         print('"{}" failed to generate an HTML page.'.format(eventfile))
         traceback.print_exc()
+        result['failed'] = True
+
+    return result
+
+
+def _process_event(item):
+    return process_event(*item)
+
+
+def merge_event_result(result):
+    """Add the `result` of `process_event` to the catalog-wide data."""
+    global totalphoto, totalspectra
+
+    catalogcopy.update(result['catalog'])
+    md5dict.update(result['md5s'])
+    hostimgdict.update(result['hostimgs'])
+    csvpages.extend(result['csvpages'])
+    for source, count in result['sources'].items():
+        sourcedict[source] = sourcedict.get(source, 0) + count
+    lcspye.extend(result['lcspye'])
+    lconly.extend(result['lconly'])
+    sponly.extend(result['sponly'])
+    lcspno.extend(result['lcspno'])
+    hasalc.extend(result['hasalc'])
+    hasasp.extend(result['hasasp'])
+    totalphoto += result['totalphoto']
+    totalspectra += result['totalspectra']
+    # Results cached by older versions of this script have no previews
+    usedpreviews.update(result.get('previews', []))
+    if args.writecatalog and result['checksum'] and not result['failed']:
+        newrowdict[result['eventfile']] = result
+    return
+
+
+def host_image_job(eventfile):
+    """The arguments of `collect_host_images` for the event in `eventfile`.
+
+    `None` if the event does not need a host image: if its page will not be
+    generated (see `cached_result`), if it already has one, or if it has no
+    valid coordinates.
+    """
+    fileeventname = os.path.splitext(os.path.basename(eventfile))[0].replace(
+        '.json', '')
+    if args.eventlist and fileeventname not in args.eventlist:
+        return None
+    checksum = event_checksum(eventfile)
+    if (md5dict.get(eventfile) == checksum and
+            cached_result(eventfile, fileeventname, checksum) is not None):
+        return None
+    # Kept to be used again by `process_event`
+    event = scanner.load(eventfile, keep=True)
+    eventname = next(reversed(event))
+    if eventname in hostimgdict or (args.eventlist and
+                                    eventname not in args.eventlist):
+        return None
+    if 'ra' not in event[eventname] or 'dec' not in event[eventname]:
+        return None
+    snra = event[eventname]['ra'][0]['value']
+    sndec = event[eventname]['dec'][0]['value']
+    try:
+        c = coord(ra=snra, dec=sndec, unit=(un.hourangle, un.deg))
+    except (KeyboardInterrupt, SystemExit):
+        raise
+    except Exception:
+        return None
+    return (eventname, c.ra.deg, c.dec.deg, snra + " " + sndec,
+            outdir + htmldir + fileeventname + '-host.jpg')
+
+
+if args.plotjson and args.writehtml:
+    with open(outdir + htmldir + plotloader, 'w') as f:
+        f.write(plotloaderjs)
+
+# Events are processed in parallel, but their results are merged in order,
+# so that the output is the same as when processing them one by one.  In
+# test mode processing stops at the first event with photometry and spectra,
+# so events are processed one by one.  The worker processes are forked, as
+# they use the state set up above (arguments, caches, the scanner); where
+# processes cannot be forked (e.g. on Windows), events are processed one by
+# one.
+try:
+    forkcontext = multiprocessing.get_context('fork')
+except ValueError:
+    forkcontext = None
+    if args.processes != 1:
+        print('Processes cannot be forked, generating pages one by one.')
+onebyone = args.processes == 1 or args.test or forkcontext is None
+
+# Entries read when finding host images are only kept for generating their
+# pages in this process: forked workers would each get a copy of them all
+scanner = EntryScanner(
+    files, cache_size=args.keptentries if onebyone else 0)
+eventfiles = list(enumerate(scanner.files))
+if args.travis:
+    eventfiles = eventfiles[:travislimit]
+
+# Host images are downloaded before the pages are generated, several at a
+# time (but with at most one request a second to each server).
+if args.collecthosts and not args.test:
+    hostjobs = [host_image_job(x[1]) for x in pbar(eventfiles, 'Finding hosts')]
+    hostjobs = [x for x in hostjobs if x is not None]
+    if hostjobs:
+        hostimgdict.update(collect_host_images(
+            hostjobs, 'astrocats/' + moduledir + '/input/missing.jpg',
+            threads=args.hostthreads))
+
+if onebyone:
+    pool = None
+    results = (process_event(*x) for x in eventfiles)
+else:
+    pool = forkcontext.Pool(args.processes)
+    results = pool.imap(_process_event, eventfiles)
+
+for result in pbar(results, total=len(eventfiles)):
+    merge_event_result(result)
+    if result['stop']:
+        break
+
+if pool is not None:
+    pool.close()
+    pool.join()
 
 # Write it all out at the end
 if args.writecatalog and not args.eventlist:
-    catalog = deepcopy(catalogcopy)
+    catalog = catalogcopy
 
     # Write the MD5 checksums
     jsonstring = json.dumps(md5dict, indent='\t', separators=(',', ':'))
     with open(outdir + cachedir + 'md5s.json' + testsuffix, 'w') as f:
         f.write(jsonstring)
 
+    # Write the results of the events, to skip the unchanged ones next time
+    if not args.test:
+        jsonstring = json.dumps(newrowdict, separators=(',', ':'))
+        with open(outdir + cachedir + 'rows.json', 'w') as f:
+            f.write(jsonstring)
+
+    # Remove the spectrum previews which were not used, unless only some
+    # events were processed
+    if args.writehtml and not args.test and not args.travis:
+        spectrumpreviews.prune(usedpreviews)
+
     # Write the host image info
     if args.collecthosts:
         jsonstring = json.dumps(
@@ -2857,37 +2996,16 @@ if args.writecatalog and not args.eventlist:
         # Ping Google to let them know sitemap has been updated
         response = urllib.request.urlopen(googlepingurl)
 
-    # Prune extraneous fields not required for main catalog file
-    catalogcopy = OrderedDict()
-    for entry in catalog:
-        catalogcopy[entry] = OrderedDict()
-        for col in catalog[entry]:
-            catalogcopy[entry][col] = deepcopy(catalog[entry][col])
-            if catalogcopy[entry][col]:
-                for row in catalogcopy[entry][col]:
-                    for tag in [
-                            'source', 'u_value', 'e_value', 'e_upper_value',
-                            'e_lower_value', 'derived'
-                    ]:
-                        if tag in row:
-                            del row[tag]
-    catalog = deepcopy(catalogcopy)
-
-    # Convert to array since that's what datatables expects
-    catalog = list(catalog.values())
+    # Prune extraneous fields not required for main catalog file, and
+    # convert to array since that's what datatables expects
+    catalog = [pruned_entry(entry) for entry in catalog.values()]
 
     if args.boneyard:
         catprefix = 'bones'
     else:
         catprefix = 'catalog'
 
-    jsonstring = json.dumps(catalog, separators=(',', ':'))
-    with open(outdir + catprefix + '.min.json' + testsuffix, 'w') as f:
-        f.write(jsonstring)
-
-    jsonstring = json.dumps(catalog, indent='\t', separators=(',', ':'))
-    with open(outdir + catprefix + '.json' + testsuffix, 'w') as f:
-        f.write(jsonstring)
+    write_catalog_json(catalog, outdir + catprefix)
 
     with open(outdir + htmldir + 'table-templates/' + catprefix + '.html' +
               testsuffix, 'w') as f:
@@ -2910,10 +3028,6 @@ if args.writecatalog and not args.eventlist:
         f.write('\t</tfoot>\n')
         f.write('</table>\n')
 
-    with open(outdir + catprefix + '.min.json', 'rb') as f_in, gzip.open(
-            outdir + catprefix + '.min.json.gz', 'wb') as f_out:
-        shutil.copyfileobj(f_in, f_out)
-
     names = OrderedDict()
     for ev in catalog:
         names[ev['name']] = [x['value']